@@ -0,0 +1,112 @@
+import logging
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from BBDD_create.database import VersionDatos, InformeCache
+
+# ------------------------------------------------------------------------
+# Cache de informes semanales
+#
+# Un informe se identifica por (usuario, clave del periodo, version de sus datos); la clave
+# del semanal es la semana ISO y el día ('AAAA-Www@AAAA-MM-DD'). La version
+# aumenta con cada cambio en las acciones o los habitos del usuario, así que un informe
+# guardado sigue siendo válido ese día mientras no cambie nada. En un acierto se reenvía el file_id
+# de Telegram de la foto ya subida: no hay consultas de puntos, ni renderizado, ni subida.
+# ------------------------------------------------------------------------
+
+
+def semana_iso(fecha: datetime = None) -> str:
+    """
+    Retorna la semana ISO de la fecha (por defecto hoy) con formato 'AAAA-Www'.
+    """
+    anio, semana, _ = (fecha or datetime.now()).isocalendar()
+    return f"{anio}-W{semana:02d}"
+
+
+def marcar_cambio(db: Session, user_id: int):
+    """
+    Aumenta la version de los datos del usuario (invalida sus informes guardados) y hace commit.
+    """
+    try:
+        db.execute(
+            text(
+                "INSERT INTO versiones_datos (user_id, version, actualizado) VALUES (:user_id, 1, now()) "
+                "ON CONFLICT (user_id) DO UPDATE SET version = versiones_datos.version + 1, actualizado = now()"
+            ),
+            {"user_id": user_id}
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error al actualizar la version de datos del usuario {user_id}: {e}")
+
+
+def get_version(db: Session, user_id: int) -> int:
+    """
+    Retorna la version actual de los datos del usuario (0 si nunca ha cambiado).
+    """
+    version = db.query(VersionDatos.version).filter(VersionDatos.user_id == user_id).scalar()
+    return version or 0
+
+
+def buscar_informe(db: Session, user_id: int, semana: str, version: int):
+    """
+    Retorna el informe guardado si corresponde a esa semana y version, o None.
+    """
+    informe = db.query(InformeCache).filter(
+        InformeCache.user_id == user_id, InformeCache.semana == semana
+    ).first()
+    if informe is None or informe.version != version:
+        return None
+    return informe
+
+
+def guardar_informe(db: Session, user_id: int, semana: str, version: int, n_bytes: int, file_id: str = None, png: bytes = None):
+    """
+    Guarda (o sustituye) el informe de la semana del usuario.
+    Las claves terminan en el día ('...@AAAA-MM-DD'): se borran los informes del usuario de otros días,
+    que ya no se pueden volver a pedir.
+    """
+    db.merge(InformeCache(
+        user_id=user_id, semana=semana, version=version, file_id=file_id, png=png,
+        bytes=n_bytes, creado=datetime.utcnow()
+    ))
+    if "@" in semana:
+        db.query(InformeCache).filter(
+            InformeCache.user_id == user_id, ~InformeCache.semana.like(f"%@{semana.split('@')[-1]}")
+        ).delete(synchronize_session=False)
+    db.commit()
+
+
+class EstadisticasCache:
+    """
+    Contadores de aciertos/fallos y bytes que no se han vuelto a subir (por proceso).
+    """
+
+    def __init__(self):
+        self.aciertos = 0
+        self.fallos = 0
+        self.bytes_ahorrados = 0
+
+    def acierto(self, n_bytes: int):
+        self.aciertos += 1
+        self.bytes_ahorrados += n_bytes
+        self.informar()
+
+    def fallo(self):
+        self.fallos += 1
+        self.informar()
+
+    def tasa_aciertos(self) -> float:
+        total = self.aciertos + self.fallos
+        return self.aciertos / total if total else 0.0
+
+    def informar(self):
+        logging.info(
+            f"Cache de informes: {self.aciertos} aciertos / {self.aciertos + self.fallos} peticiones "
+            f"({100 * self.tasa_aciertos():.0f}%), {self.bytes_ahorrados / 2 ** 20:.2f} MB sin volver a subir"
+        )
+
+
+estadisticas_cache = EstadisticasCache()
@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from BBDD_create.database import SessionLocal
+from BBDD_create.cubo_categorias import get_cubo, get_celdas_semana
+from BBDD_create.vecinos_truefriends import indice_vecinos, agregados_vecinos, agregado_vecinos_usuario
+from config import TRUEFRIENDS_REFRESCO_S, TRUEFRIENDS_CACHE_RUTA, TRUEFRIENDS_MODO
+
+# ------------------------------------------------------------------------
+# Cache compartida de TrueFriends
+#
+# Los paneles de TrueFriends muestran los puntos por día de la semana del resto de usuarios
+# en cada categoría. El resultado es el mismo para todos los informes de un mismo intervalo,
+# así que se lee una vez por refresco del cubo de categorías de la semana actual
+# (cubo_categorias y cubo_celdas_usuario, que se mantienen en cada escritura):
+#   - totales[categoria]            -> vector de 7 días (L..D) con la suma de todos los usuarios,
+#   - por_usuario[user_id][categoria] -> vector de 7 días de cada usuario,
+# y excluir al usuario que pide el informe es restar su vector del total.
+# Con TRUEFRIENDS_MODO=vecinos se guarda además, por usuario, la media de los vectores de sus
+# vecinos más parecidos (vecinos[user_id][categoria]) y la línea de TrueFriends es esa media.
+# ------------------------------------------------------------------------
+
+CATEGORIAS_TRUEFRIENDS = ("alimentacion", "caminar", "deporte", "estilo-vida", "tiempo", "dejar")
+DIAS_SEMANA = ["L", "M", "X", "J", "V", "S", "D"]
+# Un proceso sin la reconstrucción nocturna (un worker sin copia en disco vigente) rehace su índice con esta edad
+INDICE_VECINOS_MAX_EDAD_S = 24 * 3600
+
+
+def calcular_agregados(db) -> dict:
+    """
+    Lee del cubo de categorías los vectores por día de la semana (totales y por usuario) de la semana actual.
+    """
+    lunes = datetime.now().date() - timedelta(days=datetime.now().weekday())
+    agregados = {
+        "semana": lunes.isoformat(),
+        "calculado": time.time(),
+        "totales": {categoria: np.zeros(7) for categoria in CATEGORIAS_TRUEFRIENDS},
+        "por_usuario": {},
+        "vecinos": {},
+    }
+    # Totales: como mucho 7 celdas por categoría
+    for celda in get_cubo(db, lunes).itertuples(index=False):
+        agregados["totales"].setdefault(celda.categoria, np.zeros(7))[celda.dia] += celda.puntos
+    # Vectores de cada usuario (para restarlos del total)
+    for user_id, categoria, dia, puntos in get_celdas_semana(db, lunes):
+        agregados["por_usuario"].setdefault(str(user_id), {}).setdefault(categoria, np.zeros(7))[dia] += puntos
+    # Media de los vecinos de cada usuario
+    if TRUEFRIENDS_MODO == "vecinos":
+        if indice_vecinos.construido is None or time.time() - indice_vecinos.construido > INDICE_VECINOS_MAX_EDAD_S:
+            indice_vecinos.reconstruir(db)
+        agregados["vecinos"] = agregados_vecinos(indice_vecinos, agregados["por_usuario"])
+    return agregados
+
+
+class CacheTrueFriends:
+    """
+    Cache en memoria (y opcionalmente en disco) de los agregados de TrueFriends.
+    Se refresca cada intervalo_s segundos o al cambiar de semana.
+    """
+
+    def __init__(self, intervalo_s: int = 300, ruta: str = ""):
+        self.intervalo_s = intervalo_s
+        self.ruta = ruta
+        self.agregados = None
+        # Fecha de modificación de la copia en disco que se ha leído o escrito por última vez
+        self.mtime = None
+        self.lock = threading.Lock()
+        self.refrescos = 0
+        # Si hay una copia en disco de esta misma semana se reutiliza al arrancar
+        if self.ruta:
+            self.agregados = self._cargar()
+
+    def _vigente(self) -> bool:
+        if self.agregados is None:
+            return False
+        lunes = datetime.now().date() - timedelta(days=datetime.now().weekday())
+        return (
+            self.agregados["semana"] == lunes.isoformat()
+            and time.time() - self.agregados["calculado"] < self.intervalo_s
+        )
+
+    def refrescar(self):
+        """
+        Vuelve a leer los agregados de la semana actual del cubo de categorías.
+        Toma el lock para no pisar (ni perder) la actualización de vecinos de modify_habitos.
+        """
+        with self.lock:
+            self._refrescar()
+
+    def _refrescar(self):
+        # Sin lock: quien llama ya lo tiene (el lock no es reentrante)
+        with SessionLocal() as db:
+            agregados = calcular_agregados(db)
+        self.agregados = agregados
+        self.refrescos += 1
+        if self.ruta:
+            self._guardar(agregados)
+
+    def _copia_nueva(self) -> bool:
+        # La copia en disco ha cambiado desde la última lectura o escritura de este proceso
+        if not self.ruta:
+            return False
+        try:
+            return os.path.getmtime(self.ruta) != self.mtime
+        except OSError:
+            return False
+
+    def _asegurar_vigente(self):
+        if self._vigente() and not self._copia_nueva():
+            return
+        with self.lock:
+            # Los workers del pool de informes leen la copia en disco que refresca la tarea
+            # programada del bot (y que el bot reescribe al cambiar los vecinos de un usuario),
+            # así que un informe no lanza la consulta de todos los usuarios
+            if self._copia_nueva():
+                self.agregados = self._cargar()
+            # Otro hilo puede haberla refrescado mientras se esperaba el lock
+            if self._vigente():
+                return
+            self._refrescar()
+
+    def actualizar_vecinos(self, user_id: int):
+        """
+        Modo vecinos: recalcula la media de los vecinos de un usuario tras cambiar sus hábitos
+        (con el índice ya actualizado) y guarda la copia en disco para que la lean los workers.
+        """
+        if TRUEFRIENDS_MODO != "vecinos" or self.agregados is None:
+            return
+        with self.lock:
+            agregados = dict(self.agregados)
+            agregados["vecinos"] = dict(agregados["vecinos"])
+            vecinos = agregado_vecinos_usuario(indice_vecinos, agregados["por_usuario"], user_id)
+            if vecinos is None:
+                agregados["vecinos"].pop(str(user_id), None)
+            else:
+                agregados["vecinos"][str(user_id)] = vecinos
+            self.agregados = agregados
+            if self.ruta:
+                self._guardar(agregados)
+
+    def puntos_por_dia(self, categoria: str, excluir_user_id=None) -> pd.DataFrame:
+        """
+        Retorna un DataFrame (dia_semana, puntos) de L a D con los puntos de todos los usuarios
+        en la categoría, restando los del usuario excluir_user_id; en modo vecinos, la media
+        de los vecinos de excluir_user_id (si está en el índice).
+        """
+        self._asegurar_vigente()
+        agregados = self.agregados
+        vecinos = agregados.get("vecinos", {}).get(str(excluir_user_id))
+        if vecinos is not None:
+            puntos = np.asarray(vecinos.get(categoria, np.zeros(7)), dtype=float)
+            return pd.DataFrame({"dia_semana": DIAS_SEMANA, "puntos": np.round(puntos, 6)})
+        puntos = agregados["totales"].get(categoria, np.zeros(7)).copy()
+        if excluir_user_id is not None:
+            propios = agregados["por_usuario"].get(str(excluir_user_id), {}).get(categoria)
+            if propios is not None:
+                puntos -= propios
+        return pd.DataFrame({"dia_semana": DIAS_SEMANA, "puntos": np.round(puntos, 6)})
+
+    def _guardar(self, agregados: dict):
+        # Escritura atómica: se escribe en un temporal y se renombra
+        serializable = {
+            "semana": agregados["semana"],
+            "calculado": agregados["calculado"],
+            "totales": {c: v.tolist() for c, v in agregados["totales"].items()},
+            "por_usuario": {u: {c: v.tolist() for c, v in cats.items()} for u, cats in agregados["por_usuario"].items()},
+            "vecinos": {u: {c: v.tolist() for c, v in cats.items()} for u, cats in agregados["vecinos"].items()},
+        }
+        try:
+            os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+            temporal = f"{self.ruta}.tmp"
+            with open(temporal, "w") as f:
+                json.dump(serializable, f)
+            os.replace(temporal, self.ruta)
+            self.mtime = os.path.getmtime(self.ruta)
+        except OSError as e:
+            print(f"No se ha podido guardar la cache de TrueFriends en {self.ruta}: {e}")
+
+    def _cargar(self):
+        try:
+            self.mtime = os.path.getmtime(self.ruta)
+            with open(self.ruta) as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return None
+        datos["totales"] = {c: np.array(v) for c, v in datos["totales"].items()}
+        datos["por_usuario"] = {u: {c: np.array(v) for c, v in cats.items()} for u, cats in datos["por_usuario"].items()}
+        datos["vecinos"] = {u: {c: np.array(v) for c, v in cats.items()} for u, cats in datos.get("vecinos", {}).items()}
+        return datos
+
+
+# Instancia compartida por todos los informes del proceso
+cache_truefriends = CacheTrueFriends(TRUEFRIENDS_REFRESCO_S, TRUEFRIENDS_CACHE_RUTA)
@@ -0,0 +1,192 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from BBDD_create.funciones_puntos_sql import PUNTOS_DIARIO
+
+# ------------------------------------------------------------------------
+# Comparativa de la semana actual con la anterior
+#
+# Una sola consulta recorre las acciones de las dos semanas, las agrupa por hábito y semana
+# (date_trunc 'week') y cruza los hábitos del usuario con ambas semanas, de modo que un hábito
+# sin registros en una de ellas aparece con total 0. LAG sobre las semanas de cada hábito da
+# el total y los puntos de la semana anterior en la misma fila que los de la actual, junto con
+# las diferencias. Los puntos siguen las reglas del informe:
+#   - diarios: suma de los puntos de cada día (10 si se alcanza el objetivo),
+#   - 'dejar' diarios: además, 10 puntos por cada día transcurrido de la semana sin registros,
+#   - semanales: min(total_semana / objetivo * 50, 50).
+# La semana actual está en curso: se compara lo que lleva con la semana anterior completa.
+# ------------------------------------------------------------------------
+
+QUERY_COMPARATIVA_SEMANAL = f"""
+    WITH filas AS (
+        SELECT
+            lower(coalesce(h.habito, '')) AS habito,
+            lower(coalesce(h.categoria, '')) AS categoria,
+            lower(coalesce(h.frecuencia_objetivo, '')) AS frecuencia,
+            coalesce(h.cantidad_objetivo, 0) AS objetivo,
+            date(a.fecha_realizacion) AS dia,
+            coalesce(sum(a.cantidad), 0) AS total
+        FROM habitos h
+        JOIN acciones a
+          ON a.user_id = h.user_id AND a.habito = h.habito
+         AND a.fecha_realizacion >= :lunes_anterior
+         AND a.fecha_realizacion < :lunes_siguiente
+        WHERE h.user_id = :user_id
+        GROUP BY 1, 2, 3, 4, 5
+    ),
+    por_semana AS (
+        SELECT
+            habito,
+            CAST(date_trunc('week', CAST(dia AS timestamp)) AS date) AS semana,
+            sum(total) AS total,
+            count(*) AS dias,
+            sum({PUNTOS_DIARIO}) AS puntos_dias
+        FROM filas
+        GROUP BY 1, 2
+    ),
+    rejilla AS (
+        SELECT
+            lower(coalesce(h.habito, '')) AS habito,
+            lower(coalesce(h.categoria, '')) AS categoria,
+            lower(coalesce(h.frecuencia_objetivo, '')) AS frecuencia,
+            coalesce(h.cantidad_objetivo, 0) AS objetivo,
+            coalesce(h.unidad_medida_objetivo, '') AS unidad,
+            CAST(s.semana AS date) AS semana
+        FROM habitos h
+        CROSS JOIN generate_series(CAST(:lunes_anterior AS date), CAST(:lunes AS date), interval '7 day') AS s(semana)
+        WHERE h.user_id = :user_id
+    ),
+    puntuadas AS (
+        SELECT
+            r.habito, r.categoria, r.frecuencia, r.unidad, r.semana,
+            CAST(coalesce(p.total, 0) AS float) AS total,
+            CAST(
+                CASE
+                    WHEN r.frecuencia = 'diaria' AND r.categoria = 'dejar' THEN
+                        coalesce(p.puntos_dias, 0)
+                        + CASE WHEN r.objetivo >= 0 THEN 10 ELSE 0 END
+                        * GREATEST(LEAST(CAST(:hoy AS date) - r.semana + 1, 7) - coalesce(p.dias, 0), 0)
+                    WHEN r.frecuencia = 'diaria' THEN coalesce(p.puntos_dias, 0)
+                    WHEN r.frecuencia = 'semanal' AND r.objetivo > 0 THEN
+                        LEAST(coalesce(p.total, 0) / r.objetivo * 50, 50)
+                    ELSE 0
+                END AS float
+            ) AS puntos
+        FROM rejilla r
+        LEFT JOIN por_semana p ON p.habito = r.habito AND p.semana = r.semana
+    ),
+    comparadas AS (
+        SELECT
+            *,
+            LAG(total, 1, CAST(0 AS float)) OVER semanas AS total_anterior,
+            LAG(puntos, 1, CAST(0 AS float)) OVER semanas AS puntos_anterior
+        FROM puntuadas
+        WINDOW semanas AS (PARTITION BY habito, categoria, frecuencia ORDER BY semana)
+    )
+    SELECT
+        habito, categoria, frecuencia, unidad,
+        total, total_anterior, total - total_anterior AS delta_total,
+        CAST(round(CAST(puntos AS numeric), 1) AS float) AS puntos,
+        CAST(round(CAST(puntos_anterior AS numeric), 1) AS float) AS puntos_anterior,
+        CAST(round(CAST(puntos - puntos_anterior AS numeric), 1) AS float) AS delta_puntos
+    FROM comparadas
+    WHERE semana = :lunes
+    ORDER BY abs(puntos - puntos_anterior) DESC, habito
+"""
+
+COLUMNAS_COMPARATIVA = [
+    "habito", "categoria", "frecuencia", "unidad",
+    "total", "total_anterior", "delta_total", "puntos", "puntos_anterior", "delta_puntos"
+]
+
+ETIQUETAS_CATEGORIA = {
+    "alimentacion": "Alimentación",
+    "caminar": "Caminar",
+    "deporte": "Deporte",
+    "estilo-vida": "Estilo de Vida",
+    "tiempo": "Planificación y Reflexión",
+    "dejar": "Hábitos a eliminar",
+}
+
+
+def get_comparativa_semanal(db: Session, user_id: int, fecha_referencia: date = None) -> dict:
+    """
+    Compara la semana que contiene fecha_referencia (por defecto la actual) con la anterior.
+    Retorna {'habitos': [...], 'categorias': [...], 'totales': {...}}: por hábito y por categoría,
+    los puntos de cada semana y su diferencia (y por hábito también el total registrado).
+    """
+    hoy = fecha_referencia or datetime.now().date()
+    lunes = hoy - timedelta(days=hoy.weekday())
+    params = {
+        "user_id": user_id,
+        "hoy": hoy,
+        "lunes": lunes,
+        "lunes_anterior": lunes - timedelta(days=7),
+        "lunes_siguiente": lunes + timedelta(days=7),
+    }
+    habitos = [dict(zip(COLUMNAS_COMPARATIVA, fila)) for fila in db.execute(text(QUERY_COMPARATIVA_SEMANAL), params)]
+
+    # Las categorías se agregan sobre las pocas filas de los hábitos
+    categorias = {}
+    for h in habitos:
+        c = categorias.setdefault(h["categoria"], {"categoria": h["categoria"], "puntos": 0.0, "puntos_anterior": 0.0})
+        c["puntos"] += h["puntos"]
+        c["puntos_anterior"] += h["puntos_anterior"]
+    for c in categorias.values():
+        c["delta_puntos"] = round(c["puntos"] - c["puntos_anterior"], 1)
+    puntos = sum(h["puntos"] for h in habitos)
+    puntos_anterior = sum(h["puntos_anterior"] for h in habitos)
+    return {
+        "semana": lunes,
+        "habitos": habitos,
+        "categorias": sorted(categorias.values(), key=lambda c: -abs(c["delta_puntos"])),
+        "totales": {
+            "puntos": round(puntos, 1),
+            "puntos_anterior": round(puntos_anterior, 1),
+            "delta_puntos": round(puntos - puntos_anterior, 1),
+        },
+    }
+
+
+def _delta(valor: float, sufijo: str = "") -> str:
+    if valor > 0:
+        return f"+{valor:g}{sufijo} ▲"
+    if valor < 0:
+        return f"{valor:g}{sufijo} ▼"
+    return "="
+
+
+def texto_comparativa_semanal(comparativa: dict, max_habitos: int = 6) -> str:
+    """
+    Mensaje para el usuario con la comparativa de get_comparativa_semanal: puntos totales,
+    por tipo de hábito y los hábitos que más han cambiado.
+    """
+    habitos = comparativa["habitos"]
+    if not habitos or not any(h["total"] or h["total_anterior"] for h in habitos):
+        return "📭 No hay registros ni esta semana ni la anterior para comparar."
+
+    totales = comparativa["totales"]
+    lineas = [
+        "📊 Esta semana frente a la anterior",
+        f"🏅 Puntos: {totales['puntos']:g} (la semana pasada {totales['puntos_anterior']:g}, "
+        f"{_delta(totales['delta_puntos'])})",
+        "",
+        "Por tipo de hábito:",
+    ]
+    for c in comparativa["categorias"]:
+        etiqueta = ETIQUETAS_CATEGORIA.get(c["categoria"], c["categoria"].capitalize() or "Sin categoría")
+        lineas.append(f"• {etiqueta}: {round(c['puntos'], 1):g} pts ({_delta(c['delta_puntos'])})")
+
+    cambios = [h for h in habitos if h["delta_total"] or h["delta_puntos"]][:max_habitos]
+    if cambios:
+        lineas += ["", "Hábitos que más han cambiado:"]
+        for h in cambios:
+            unidad = f" {h['unidad']}" if h["unidad"] else ""
+            lineas.append(
+                f"• {h['habito'].capitalize()}: {h['total']:g}{unidad} ({_delta(round(h['delta_total'], 2), unidad)}), "
+                f"{h['puntos']:g} pts ({_delta(h['delta_puntos'])})"
+            )
+    lineas += ["", "La semana actual sigue en curso: se compara lo que llevas con la semana pasada completa."]
+    return "\n".join(lineas)
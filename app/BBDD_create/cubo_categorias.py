@@ -0,0 +1,232 @@
+import argparse
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from BBDD_create.database import SessionLocal, CuboCategoria
+from BBDD_create.funciones_puntos_sql import PUNTOS_DIARIO, PUNTOS_SEMANAL
+
+# ------------------------------------------------------------------------
+# Cubo de categorías (tablas cubo_celdas_usuario y cubo_categorias)
+#
+# Agregados por (categoría, semana ISO, día de la semana) de todos los usuarios y todas las
+# categorías: suma de puntos, suma de totales, número de acciones y número de usuarios con
+# acciones. Los paneles que comparan al usuario con el resto (TrueFriends) leen unas decenas
+# de celdas del cubo en lugar de recorrer las acciones de todos los usuarios.
+#   - cubo_celdas_usuario guarda las celdas de cada usuario (puntos por día como en el informe
+#     semanal: diarios con el objetivo del día, semanales min(total_día / objetivo * 50, 50)).
+#   - Cada escritura recalcula las celdas del usuario en ese día (o todas las del usuario si no
+#     hay fecha): las celdas viejas se restan del cubo y las nuevas se suman, en dos sentencias.
+#   - Los 'dejar' solo tienen celdas en los días con registro (sin el relleno de la semana).
+# ------------------------------------------------------------------------
+
+# Celdas (usuario, categoría, semana, día) desde las acciones (los filtros a NULL no restringen)
+QUERY_CELDAS = f"""
+    WITH filas AS (
+        SELECT
+            h.user_id,
+            lower(coalesce(h.habito, '')) AS habito,
+            lower(coalesce(h.categoria, '')) AS categoria,
+            lower(coalesce(h.frecuencia_objetivo, '')) AS frecuencia,
+            coalesce(h.cantidad_objetivo, 0) AS objetivo,
+            date(a.fecha_realizacion) AS fecha,
+            coalesce(sum(a.cantidad), 0) AS total,
+            count(*) AS acciones
+        FROM habitos h
+        JOIN acciones a
+          ON a.user_id = h.user_id AND a.habito = h.habito
+        WHERE (CAST(:user_id AS bigint) IS NULL OR h.user_id = :user_id)
+          AND (CAST(:fecha AS date) IS NULL OR date(a.fecha_realizacion) = :fecha)
+        GROUP BY 1, 2, 3, 4, 5, 6
+    )
+    SELECT
+        user_id,
+        categoria,
+        CAST(date_trunc('week', CAST(fecha AS timestamp)) AS date) AS semana,
+        CAST(extract(isodow FROM fecha) AS integer) - 1 AS dia,
+        CAST(sum(
+            CASE
+                WHEN frecuencia = 'diaria' THEN {PUNTOS_DIARIO}
+                WHEN frecuencia = 'semanal' THEN {PUNTOS_SEMANAL}
+                ELSE 0
+            END
+        ) AS float) AS puntos,
+        CAST(sum(total) AS float) AS total,
+        CAST(sum(acciones) AS integer) AS acciones
+    FROM filas
+    GROUP BY 1, 2, 3, 4
+"""
+
+# Suma (o resta) al cubo las celdas que devuelve la sentencia 'cambios'
+_APLICAR_AL_CUBO = """
+    INSERT INTO cubo_categorias (categoria, semana, dia, puntos, total, acciones, usuarios, actualizado)
+    SELECT categoria, semana, dia, {signo} sum(puntos), {signo} sum(total), {signo} sum(acciones), {signo} count(*), now()
+    FROM cambios
+    GROUP BY 1, 2, 3
+    ON CONFLICT (semana, dia, categoria) DO UPDATE SET
+        puntos = cubo_categorias.puntos + excluded.puntos,
+        total = cubo_categorias.total + excluded.total,
+        acciones = cubo_categorias.acciones + excluded.acciones,
+        usuarios = cubo_categorias.usuarios + excluded.usuarios,
+        actualizado = excluded.actualizado
+"""
+
+QUERY_RESTAR = f"""
+    WITH cambios AS (
+        DELETE FROM cubo_celdas_usuario
+        WHERE (CAST(:user_id AS bigint) IS NULL OR user_id = :user_id)
+          AND (CAST(:semana AS date) IS NULL OR (semana = :semana AND dia = :dia))
+        RETURNING categoria, semana, dia, puntos, total, acciones
+    )
+    {_APLICAR_AL_CUBO.format(signo="-")}
+"""
+
+QUERY_SUMAR = f"""
+    WITH cambios AS (
+        INSERT INTO cubo_celdas_usuario (user_id, categoria, semana, dia, puntos, total, acciones, actualizado)
+        SELECT user_id, categoria, semana, dia, puntos, total, acciones, now() FROM ({QUERY_CELDAS}) celdas
+        RETURNING categoria, semana, dia, puntos, total, acciones
+    )
+    {_APLICAR_AL_CUBO.format(signo="")}
+"""
+
+# Celdas del cubo (del día recalculado) que se han quedado sin usuarios
+QUERY_LIMPIAR = """
+    DELETE FROM cubo_categorias
+    WHERE usuarios <= 0
+      AND (CAST(:semana AS date) IS NULL OR (semana = :semana AND dia = :dia))
+"""
+
+QUERY_CUBO = """
+    SELECT categoria, semana, dia, puntos, total, acciones, usuarios
+    FROM cubo_categorias
+    WHERE semana BETWEEN :desde AND :hasta
+    ORDER BY semana, categoria, dia
+"""
+
+QUERY_CELDAS_SEMANA = """
+    SELECT user_id, categoria, dia, puntos
+    FROM cubo_celdas_usuario
+    WHERE semana = :semana
+"""
+
+COLUMNAS_CUBO = ["categoria", "semana", "dia", "puntos", "total", "acciones", "usuarios"]
+
+
+def recalcular_celdas(db: Session, user_id: int = None, fecha: date = None):
+    """
+    Recalcula las celdas del usuario en la fecha (o todas) y aplica la diferencia al cubo.
+    Sin filtros reconstruye el cubo completo. No hace commit.
+    """
+    params = {
+        "user_id": user_id,
+        "fecha": fecha,
+        "semana": fecha - timedelta(days=fecha.weekday()) if fecha is not None else None,
+        "dia": fecha.weekday() if fecha is not None else None,
+    }
+    db.execute(text(QUERY_RESTAR), params)
+    db.execute(text(QUERY_SUMAR), params)
+    db.execute(text(QUERY_LIMPIAR), params)
+
+
+def actualizar_cubo(db: Session, user_id: int, fecha: datetime = None):
+    """
+    Actualiza el cubo tras un cambio en las acciones o los hábitos de un usuario.
+    Con fecha solo se recalculan las celdas de ese día; sin fecha, todas las del usuario
+    (un cambio de categoría u objetivo afecta a todo su historial).
+    Un fallo aquí no deshace la operación principal: el cubo se corrige con --rebuild.
+    """
+    if isinstance(fecha, datetime):
+        fecha = fecha.date()
+    elif not isinstance(fecha, date):
+        fecha = None
+    try:
+        recalcular_celdas(db, user_id, fecha)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error al actualizar el cubo de categorías del usuario {user_id}: {e}")
+
+
+def get_cubo(db: Session, desde: date, hasta: date = None) -> pd.DataFrame:
+    """
+    Retorna las celdas del cubo de las semanas (lunes) entre desde y hasta (por defecto solo desde),
+    con las columnas categoria, semana, dia, puntos, total, acciones y usuarios.
+    """
+    params = {"desde": desde, "hasta": hasta or desde}
+    return pd.DataFrame(db.execute(text(QUERY_CUBO), params).fetchall(), columns=COLUMNAS_CUBO)
+
+
+def get_celdas_semana(db: Session, semana: date) -> list:
+    """
+    Retorna las celdas (user_id, categoria, dia, puntos) de todos los usuarios en la semana (lunes).
+    """
+    return db.execute(text(QUERY_CELDAS_SEMANA), {"semana": semana}).fetchall()
+
+
+def reconstruir_cubo(db: Session):
+    """
+    Reconstruye las celdas y el cubo completos desde las acciones.
+    """
+    db.execute(text("DELETE FROM cubo_celdas_usuario"))
+    db.execute(text("DELETE FROM cubo_categorias"))
+    db.execute(text(QUERY_SUMAR), {"user_id": None, "fecha": None})
+    db.commit()
+
+
+def comprobar_cubo(db: Session, tolerancia: float = 0.01) -> list:
+    """
+    Compara el cubo con la agregación en vivo de las acciones.
+    Retorna las celdas (categoria, semana, dia) que no coinciden.
+    """
+    vivo = pd.DataFrame(
+        db.execute(text(QUERY_CELDAS), {"user_id": None, "fecha": None}).fetchall(),
+        columns=["user_id", "categoria", "semana", "dia", "puntos", "total", "acciones"]
+    )
+    vivo = vivo.groupby(["categoria", "semana", "dia"]).agg(
+        puntos=("puntos", "sum"), total=("total", "sum"), acciones=("acciones", "sum"), usuarios=("user_id", "count")
+    )
+    cubo = pd.DataFrame(
+        db.execute(text("SELECT categoria, semana, dia, puntos, total, acciones, usuarios FROM cubo_categorias")).fetchall(),
+        columns=COLUMNAS_CUBO
+    ).set_index(["categoria", "semana", "dia"])
+    comparacion = vivo.join(cubo, how="outer", lsuffix="_vivo", rsuffix="_cubo").fillna(0)
+    distintas = (
+        ((comparacion["puntos_vivo"] - comparacion["puntos_cubo"]).abs() > tolerancia)
+        | ((comparacion["total_vivo"] - comparacion["total_cubo"]).abs() > tolerancia)
+        | (comparacion["acciones_vivo"] != comparacion["acciones_cubo"])
+        | (comparacion["usuarios_vivo"] != comparacion["usuarios_cubo"])
+    )
+    return list(comparacion.index[distintas])
+
+
+def inicializar_cubo():
+    """
+    Rellena el cubo al arrancar si está vacío pero ya hay acciones (primera ejecución tras crear las tablas).
+    """
+    with SessionLocal() as db:
+        if db.query(CuboCategoria).first() is None and db.execute(text("SELECT 1 FROM acciones LIMIT 1")).first():
+            print("Cubo de categorías vacío: se reconstruye desde las acciones...")
+            reconstruir_cubo(db)
+
+
+if __name__ == "__main__":
+    # Uso (desde el directorio app):
+    #   python -m BBDD_create.cubo_categorias --rebuild
+    #   python -m BBDD_create.cubo_categorias --comprobar
+    parser = argparse.ArgumentParser(description="Mantenimiento del cubo de categorías")
+    parser.add_argument("--rebuild", action="store_true", help="Reconstruye el cubo desde las acciones")
+    parser.add_argument("--comprobar", action="store_true", help="Compara el cubo con la agregación en vivo")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.rebuild:
+            reconstruir_cubo(db)
+            print("Cubo de categorías reconstruido.")
+        if args.comprobar or not args.rebuild:
+            distintas = comprobar_cubo(db)
+            print(f"Celdas del cubo distintas de la agregación en vivo: {len(distintas)}")
+            for celda in distintas[:20]:
+                print(f"  {celda}")
@@ -1,14 +1,22 @@
 # OK
 
+import threading
+
 from sqlalchemy import (
     create_engine,
+    event,
     Column,
     Integer,
     BigInteger,
+    Boolean,
     String,
     DateTime,
+    Date,
     ForeignKeyConstraint,
-    Float
+    Index,
+    Float,
+    JSON,
+    LargeBinary
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
@@ -86,12 +94,154 @@ class Accion(Base):
     # Se establecen las claves foraneas
     __table_args__ = (
         ForeignKeyConstraint(['user_id', 'habito'], ['habitos.user_id', 'habitos.habito']),
+        # Lecturas por usuario/hábito y rango de fechas (informes semanal, mensual y anual)
+        Index("ix_acciones_usuario_habito_fecha", "user_id", "habito", "fecha_realizacion"),
     )
 
     # Se establece la relacion con la clase Habito
     habito_relacion = relationship("Habito", back_populates="acciones")
 
 
+class PuntosRegistro(Base):
+    """
+    Esta clase representa la tabla puntos_registro (libro de puntos) en la base de datos.
+    Cada fila son los puntos de un hábito (en minúsculas) en un día (hábitos diarios)
+    o en su primera semana (hábitos semanales, fecha = lunes de esa semana).
+    """
+
+    # Se define el nombre de la tabla
+    __tablename__ = "puntos_registro"
+
+    # Se definen las columnas y las claves primarias (user_id primero para sumar por usuario)
+    user_id = Column(BigInteger, primary_key=True)
+    habito = Column(String, primary_key=True)
+    fecha = Column(Date, primary_key=True)
+    puntos = Column(Float, nullable=False, default=0.0)
+    actualizado = Column(DateTime, default=datetime.utcnow)
+
+
+class CeldaCategoriaUsuario(Base):
+    """
+    Esta clase representa la tabla cubo_celdas_usuario en la base de datos.
+    Cada fila son los puntos, el total y el número de acciones de un usuario en una categoría
+    y un día (semana = lunes de la semana ISO, dia = 0 lunes ... 6 domingo).
+    """
+
+    # Se define el nombre de la tabla
+    __tablename__ = "cubo_celdas_usuario"
+
+    # Se definen las columnas y las claves primarias (user_id, semana y dia primero para recalcular un día)
+    user_id = Column(BigInteger, primary_key=True)
+    semana = Column(Date, primary_key=True)
+    dia = Column(Integer, primary_key=True)
+    categoria = Column(String, primary_key=True)
+    puntos = Column(Float, nullable=False, default=0.0)
+    total = Column(Float, nullable=False, default=0.0)
+    acciones = Column(Integer, nullable=False, default=0)
+    actualizado = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Lectura de las celdas de todos los usuarios de una semana (TrueFriends)
+        Index("ix_cubo_celdas_usuario_semana", "semana"),
+    )
+
+
+class CuboCategoria(Base):
+    """
+    Esta clase representa la tabla cubo_categorias en la base de datos.
+    Cada fila agrega las celdas de todos los usuarios de una categoría, semana ISO (lunes) y día:
+    suma de puntos, de totales y de acciones y número de usuarios con acciones.
+    """
+
+    # Se define el nombre de la tabla
+    __tablename__ = "cubo_categorias"
+
+    # Se definen las columnas y las claves primarias (semana primero para leer rangos de semanas)
+    semana = Column(Date, primary_key=True)
+    dia = Column(Integer, primary_key=True)
+    categoria = Column(String, primary_key=True)
+    puntos = Column(Float, nullable=False, default=0.0)
+    total = Column(Float, nullable=False, default=0.0)
+    acciones = Column(Integer, nullable=False, default=0)
+    usuarios = Column(Integer, nullable=False, default=0)
+    actualizado = Column(DateTime, default=datetime.utcnow)
+
+
+class ResumenSemanal(Base):
+    """
+    Esta clase representa la tabla resumenes_semanales en la base de datos.
+    Cada fila congela una semana ya cerrada de un usuario (semana = lunes).
+    """
+
+    # Se define el nombre de la tabla
+    __tablename__ = "resumenes_semanales"
+
+    # Se definen las columnas y las claves primarias (user_id, semana) para leer series por usuario
+    user_id = Column(BigInteger, primary_key=True)
+    semana = Column(Date, primary_key=True)
+    puntos = Column(Float, nullable=False, default=0.0)
+    puntos_max = Column(Float, nullable=False, default=0.0)
+    # {categoria: dias con el objetivo cumplido}
+    dias_cumplidos = Column(JSON, nullable=False, default=dict)
+    # {habito: total de acciones de la semana}
+    totales_habito = Column(JSON, nullable=False, default=dict)
+    cerrado = Column(DateTime, default=datetime.utcnow)
+
+
+class VersionDatos(Base):
+    """
+    Esta clase representa la tabla versiones_datos en la base de datos.
+    La version de un usuario aumenta cada vez que cambian sus acciones o sus habitos.
+    """
+
+    # Se define el nombre de la tabla
+    __tablename__ = "versiones_datos"
+
+    # Se definen las columnas
+    user_id = Column(BigInteger, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    actualizado = Column(DateTime, default=datetime.utcnow)
+
+
+class InformeCache(Base):
+    """
+    Esta clase representa la tabla informes_cache en la base de datos.
+    Guarda el informe semanal ya enviado de un usuario para una semana ISO y una version de sus datos.
+    """
+
+    # Se define el nombre de la tabla
+    __tablename__ = "informes_cache"
+
+    # Se definen las columnas y las claves primarias
+    user_id = Column(BigInteger, primary_key=True)
+    semana = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
+    # file_id de Telegram de la foto ya subida (se reenvia sin volver a subirla)
+    file_id = Column(String, nullable=True)
+    # Imagen generada (PNG, JPEG o WebP) que aun no se ha subido a Telegram
+    png = Column(LargeBinary, nullable=True)
+    bytes = Column(Integer, nullable=False, default=0)
+    creado = Column(DateTime, default=datetime.utcnow)
+
+
+class PreferenciaInforme(Base):
+    """
+    Esta clase representa la tabla preferencias_informe en la base de datos.
+    Formato en el que un usuario recibe sus informes; las columnas a NULL toman el valor global.
+    """
+
+    # Se define el nombre de la tabla
+    __tablename__ = "preferencias_informe"
+
+    # Se definen las columnas
+    user_id = Column(BigInteger, primary_key=True)
+    formato = Column(String, nullable=True)
+    calidad = Column(Integer, nullable=True)
+    escala = Column(Float, nullable=True)
+    compacto = Column(Boolean, nullable=True)
+    actualizado = Column(DateTime, default=datetime.utcnow)
+
+
 # Se crea el motor de la base de datos
 engine = create_engine(DATABASE_URL, future=True)
 
@@ -112,6 +262,32 @@ def get_db():
         # Se cierra la sesion
         db.close()
 
+class ContadorConsultas:
+    """
+    Cuenta las sentencias SQL que se ejecutan en el hilo actual mientras esta activo:
+        with ContadorConsultas() as contador:
+            ...
+        contador.consultas
+    """
+
+    def __init__(self):
+        self.consultas = 0
+        self.hilo = None
+
+    def _contar(self, conn, cursor, statement, parameters, context, executemany):
+        # Las consultas de otros hilos (tareas programadas, otros informes) no cuentan
+        if threading.get_ident() == self.hilo:
+            self.consultas += 1
+
+    def __enter__(self):
+        self.hilo = threading.get_ident()
+        event.listen(engine, "before_cursor_execute", self._contar)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self._contar)
+        return False
+
 def main_crear_BBDD():
     """
     Funcion principal que crea la base de datos y las tablas
@@ -121,5 +297,9 @@ def main_crear_BBDD():
     print("Creando/verificando tablas en la base de datos...")
     # Se ejecuta la creacion de las tablas definidas en los modelos
     Base.metadata.create_all(bind=engine)
+    # create_all no añade indices nuevos a tablas que ya existen: se crean aqui si faltan
+    for tabla in Base.metadata.sorted_tables:
+        for indice in tabla.indexes:
+            indice.create(bind=engine, checkfirst=True)
     # Se notifica que ha finalizado el proceso
     print("Proceso completado. Las tablas estan listas.")
@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+
+from BBDD_create.database import Usuario, Habito, Accion
+
+# ------------------------------------------------------------------------
+# Datos de entrada del informe semanal
+#
+# Todo lo que necesita un informe se lee en UNA consulta: usuarios LEFT JOIN habitos
+# LEFT JOIN acciones de la semana, agrupado por hábito y día. Cada hábito aparece al menos
+# en una fila (sin acciones, con fecha NULL), así que de las mismas filas salen la lista
+# de hábitos y el nombre del usuario. El resultado es inmutable: los cálculos del informe
+# solo lo leen.
+# ------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class HabitoInforme:
+    habito: str
+    categoria: str
+    frecuencia_objetivo: str
+    cantidad_objetivo: float
+
+
+@dataclass(frozen=True)
+class EntradaInforme:
+    user_id: int
+    nombre: str
+    lunes: date
+    # Hábitos del usuario (tengan o no acciones esta semana)
+    habitos: tuple
+    # Filas con el formato de get_filtered_data (las que recibe convert_to_dataframe):
+    # (user_id, habito, categoria, frecuencia_objetivo, fecha_realizacion, total_acciones,
+    #  cantidad_objetivo, media, reducir)
+    filas: tuple
+
+
+def cargar_entrada_informe(db: Session, user_id: int, fecha_referencia=None):
+    """
+    Lee en una sola consulta los hábitos, los agregados diarios de la semana actual
+    (o la de fecha_referencia) y el nombre del usuario.
+    Retorna None si el usuario no existe.
+    """
+    today = fecha_referencia or datetime.now()
+    start_of_week = (today - timedelta(days=today.weekday())).date()
+    # Límite exclusivo: el lunes siguiente (las acciones del domingo tienen hora)
+    next_week = start_of_week + timedelta(days=7)
+
+    # Mismos filtros de fecha que get_filtered_data
+    resultado = (
+        db.query(
+            Usuario.nombre,
+            Habito.user_id.label("user_id"),
+            Habito.habito,
+            Habito.categoria,
+            Habito.frecuencia_objetivo,
+            func.date(Accion.fecha_realizacion).label("fecha_realizacion"),
+            func.sum(Accion.cantidad).label("total_acciones"),
+            Habito.cantidad_objetivo.label("cantidad_objetivo"),
+            func.avg(Accion.cantidad).label("media"),
+            case(
+                [(Habito.categoria == "dejar", func.min(Accion.cantidad))],
+                else_=None
+            ).label("reducir"),
+        )
+        .outerjoin(Habito, Habito.user_id == Usuario.user_id)
+        .outerjoin(
+            Accion,
+            (Habito.user_id == Accion.user_id) &
+            (Habito.habito == Accion.habito) &
+            (Accion.fecha_realizacion >= start_of_week) &
+            (Accion.fecha_realizacion < next_week)
+        )
+        .filter(Usuario.user_id == user_id)
+        .group_by(
+            Usuario.nombre,
+            Habito.user_id,
+            Habito.habito,
+            Habito.categoria,
+            Habito.frecuencia_objetivo,
+            func.date(Accion.fecha_realizacion),
+            Habito.cantidad_objetivo
+        )
+        .all()
+    )
+    if not resultado:
+        return None
+
+    # Un usuario sin hábitos devuelve una única fila con el hábito a NULL
+    filas = tuple(tuple(fila[1:]) for fila in resultado if fila.habito is not None)
+    habitos = {}
+    for fila in filas:
+        habitos.setdefault(fila[1], HabitoInforme(fila[1], fila[2], fila[3], fila[6]))
+    return EntradaInforme(
+        user_id=user_id,
+        nombre=resultado[0].nombre or "",
+        lunes=start_of_week,
+        habitos=tuple(habitos.values()),
+        filas=filas,
+    )
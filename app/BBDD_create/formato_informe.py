@@ -0,0 +1,153 @@
+import io
+import re
+import unicodedata
+from dataclasses import dataclass, replace
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from config import INFORME_FORMATO, INFORME_CALIDAD, INFORME_ESCALA, INFORME_COMPACTO
+from BBDD_create.database import PreferenciaInforme
+from BBDD_create.cache_informes import marcar_cambio
+
+# ------------------------------------------------------------------------
+# Formato de salida de los informes
+#
+# Un informe se puede entregar como PNG (sin pérdidas), JPEG o WebP (con calidad), con su
+# tamaño en píxeles multiplicado por una escala y con la disposición compacta de una sola
+# columna para el móvil. El valor global sale de config (INFORME_FORMATO, ...) y cada usuario
+# puede cambiar cualquiera de los campos (tabla preferencias_informe).
+# Al guardar una preferencia se aumenta la version de datos del usuario, de modo que los
+# informes en cache con el formato anterior dejan de ser válidos.
+# ------------------------------------------------------------------------
+
+FORMATOS = ("png", "jpeg", "webp")
+CALIDAD_MIN, CALIDAD_MAX = 30, 95
+ESCALA_MIN, ESCALA_MAX = 0.5, 2.0
+
+
+@dataclass(frozen=True)
+class FormatoInforme:
+    formato: str = "png"
+    # Calidad de jpeg/webp (se ignora en png)
+    calidad: int = 85
+    # Factor sobre el tamaño en píxeles de la figura (1000 px de ancho)
+    escala: float = 1.0
+    # Una sola columna, un panel por fila
+    compacto: bool = False
+
+    def descripcion(self) -> str:
+        texto = self.formato.upper()
+        if self.formato != "png":
+            texto += f" (calidad {self.calidad})"
+        texto += f", {int(round(1000 * self.escala))} px de ancho"
+        return texto + (", una columna" if self.compacto else ", dos columnas")
+
+
+def normalizar(formato: FormatoInforme) -> FormatoInforme:
+    # Valores fuera de rango (variables de entorno o BBDD) se llevan al más cercano válido
+    return FormatoInforme(
+        formato=formato.formato if formato.formato in FORMATOS else "png",
+        calidad=min(max(int(formato.calidad), CALIDAD_MIN), CALIDAD_MAX),
+        escala=min(max(float(formato.escala), ESCALA_MIN), ESCALA_MAX),
+        compacto=bool(formato.compacto),
+    )
+
+
+def formato_por_defecto() -> FormatoInforme:
+    return normalizar(FormatoInforme(
+        formato="jpeg" if INFORME_FORMATO == "jpg" else INFORME_FORMATO,
+        calidad=INFORME_CALIDAD, escala=INFORME_ESCALA, compacto=INFORME_COMPACTO
+    ))
+
+
+def get_formato_usuario(db: Session, user_id: int) -> FormatoInforme:
+    """
+    Retorna el formato de los informes del usuario: su preferencia sobre el valor global.
+    """
+    formato = formato_por_defecto()
+    preferencia = db.get(PreferenciaInforme, user_id)
+    if preferencia is None:
+        return formato
+    cambios = {
+        campo: getattr(preferencia, campo) for campo in ("formato", "calidad", "escala", "compacto")
+        if getattr(preferencia, campo) is not None
+    }
+    return normalizar(replace(formato, **cambios))
+
+
+def guardar_formato_usuario(db: Session, user_id: int, cambios: dict) -> FormatoInforme:
+    """
+    Guarda los campos de cambios ({'formato': 'jpeg', 'compacto': True, ...}) en la preferencia
+    del usuario; con {'por_defecto': True} la borra. Retorna el formato resultante.
+    """
+    preferencia = db.get(PreferenciaInforme, user_id)
+    if cambios.get("por_defecto"):
+        if preferencia is not None:
+            db.delete(preferencia)
+    else:
+        if preferencia is None:
+            preferencia = PreferenciaInforme(user_id=user_id)
+            db.add(preferencia)
+        for campo, valor in cambios.items():
+            setattr(preferencia, campo, valor)
+        preferencia.actualizado = datetime.utcnow()
+    db.commit()
+    # Los informes ya guardados tienen el formato anterior
+    marcar_cambio(db, user_id)
+    return get_formato_usuario(db, user_id)
+
+
+def interpretar_formato(texto: str) -> dict:
+    """
+    Extrae de un mensaje los campos de formato que pide el usuario, por ejemplo
+    'quiero el informe en jpg compacto al 70%' -> {'formato': 'jpeg', 'compacto': True, 'escala': 0.7}.
+    Retorna {} si no reconoce ninguno.
+    """
+    texto = unicodedata.normalize("NFKD", texto.lower()).encode("ascii", "ignore").decode()
+    if re.search(r"por defecto|predeterminad|original", texto):
+        return {"por_defecto": True}
+
+    cambios = {}
+    if re.search(r"\bwebp\b", texto):
+        cambios["formato"] = "webp"
+    elif re.search(r"\bjpe?g\b", texto):
+        cambios["formato"] = "jpeg"
+    elif re.search(r"\bpng\b", texto):
+        cambios["formato"] = "png"
+
+    if re.search(r"compact|movil|una columna|vertical", texto):
+        cambios["compacto"] = True
+    elif re.search(r"dos columnas|completo|ordenador|horizontal", texto):
+        cambios["compacto"] = False
+
+    calidad = re.search(r"calidad\D{0,12}(\d{1,3})", texto)
+    if calidad:
+        cambios["calidad"] = min(max(int(calidad.group(1)), CALIDAD_MIN), CALIDAD_MAX)
+    escala = re.search(r"(\d{2,3})\s*(?:%|por ?ciento)", texto)
+    if escala and not (calidad and calidad.group(1) == escala.group(1)):
+        cambios["escala"] = min(max(int(escala.group(1)) / 100, ESCALA_MIN), ESCALA_MAX)
+    elif re.search(r"\bpequen|\bligero", texto):
+        cambios["escala"] = 0.75
+    elif re.search(r"\bgrande\b", texto):
+        cambios["escala"] = 1.5
+    return cambios
+
+
+def codificar(imagen, formato: FormatoInforme) -> bytes:
+    """
+    Codifica una imagen de Pillow (o los bytes de un PNG) en el formato y la calidad indicados.
+    """
+    from PIL import Image
+
+    if isinstance(imagen, bytes):
+        imagen = Image.open(io.BytesIO(imagen))
+    buffer = io.BytesIO()
+    if formato.formato == "png":
+        imagen.save(buffer, format="PNG")
+    elif formato.formato == "jpeg":
+        # JPEG no tiene canal alfa; el fondo del informe ya es blanco
+        imagen.convert("RGB").save(buffer, format="JPEG", quality=formato.calidad, optimize=True)
+    else:
+        imagen.save(buffer, format="WEBP", quality=formato.calidad, method=4)
+    return buffer.getvalue()
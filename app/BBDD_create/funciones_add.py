@@ -2,6 +2,12 @@ from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
 import calendar
 from BBDD_create.database import Usuario, Habito, Accion
+from BBDD_create.registro_puntos import actualizar_puntos, actualizar_ranking
+from BBDD_create.cubo_categorias import actualizar_cubo
+from BBDD_create.cache_informes import marcar_cambio
+from BBDD_create.resumen_semanal import recongelar_semanas
+from BBDD_create.vecinos_truefriends import indice_vecinos
+from BBDD_create.cache_truefriends import cache_truefriends
 
 def add_usuario(db, user_id, nombre, edad, sexo):
     # Esta funcion anade un usuario en la tabla de usuarios
@@ -106,18 +112,24 @@ def modify_habitos(db, user_id, habitos):
         # Crear un conjunto de nombres de hábitos proporcionados en la nueva lista
         nuevos_habitos_nombres = {habito[1] for habito in habitos}  # El segundo elemento es el nombre del hábito
 
+        # Hábitos cuyos puntos hay que recalcular en el libro (borrados o con cambios que afectan a la puntuación)
+        habitos_puntos = set()
+
         # Iterar por los hábitos existentes y eliminar los que no estén en la nueva lista
         for habito_existente in habitos_actuales:
             if habito_existente.habito not in nuevos_habitos_nombres:
                 # Eliminar el hábito y las acciones relacionadas
                 db.query(Accion).filter_by(user_id=user_id, habito=habito_existente.habito).delete()
                 db.delete(habito_existente)
+                habitos_puntos.add(habito_existente.habito)
                 
         for (categoria, habito, icono, objetivo, frecuencia, unidad_medida_objetivo, cantidad_objetivo) in habitos:
             # Buscar el hábito en la base de datos
             habito_obj = db.query(Habito).filter_by(user_id=user_id, habito=habito).first()
             
             if habito_obj:
+                # Se guarda lo que determina los puntos para detectar cambios
+                puntuacion_anterior = (habito_obj.habito, habito_obj.categoria, habito_obj.frecuencia_objetivo, habito_obj.cantidad_objetivo)
                 # Si el hábito es "Deporte", cambiar su categoría a "Caminar"
                 if habito == "Caminar": #or (habito_obj.habito == "Deporte" and habito == "Caminar"):
                     habito_obj.categoria = "Caminar"
@@ -132,6 +144,8 @@ def modify_habitos(db, user_id, habitos):
                 habito_obj.frecuencia_objetivo = frecuencia
                 habito_obj.unidad_medida_objetivo = unidad_medida_objetivo
                 habito_obj.cantidad_objetivo = cantidad_objetivo
+                if puntuacion_anterior != (habito_obj.habito, habito_obj.categoria, habito_obj.frecuencia_objetivo, habito_obj.cantidad_objetivo):
+                    habitos_puntos.update({puntuacion_anterior[0], habito_obj.habito})
             else:
                 # Si el hábito no existe, añadirlo como nuevo
                 add_habito(
@@ -148,13 +162,34 @@ def modify_habitos(db, user_id, habitos):
 
         # Confirmar los cambios
         db.commit()
+
+        # Se recalculan en el libro solo los hábitos afectados, y el cubo (todo el historial del
+        # usuario) y el ranking una sola vez al final
+        # (el grupo de categorías del ranking cambia aunque no cambien los puntos)
+        for habito in habitos_puntos:
+            actualizar_puntos(db, user_id, habito, derivados=False)
+        if habitos_puntos:
+            actualizar_cubo(db, user_id)
+        actualizar_ranking(db, user_id)
+        # Los informes guardados del usuario dejan de ser válidos
+        marcar_cambio(db, user_id)
+        # Un cambio de categoría u objetivo (o un hábito borrado) cambia también las semanas congeladas
+        if habitos_puntos:
+            recongelar_semanas(db, user_id)
     except Exception as e:
         # Si ocurre un error, deshacer los cambios
         db.rollback()
         print(f"Error al modificar los hábitos del usuario {user_id}: {e}")
         raise
+    try:
+        # Se recalculan sus vecinos de TrueFriends con los hábitos nuevos y su media en la cache
+        # (que se guarda en disco para los workers de informes)
+        indice_vecinos.actualizar_usuario(db, user_id)
+        cache_truefriends.actualizar_vecinos(user_id)
+    except Exception as e:
+        print(f"Error al actualizar los vecinos de TrueFriends del usuario {user_id}: {e}")
 
-def add_accion(db, user_id, habito, fecha_realizacion, texto, cantidad):
+def add_accion(db, user_id, habito, fecha_realizacion, texto, cantidad, actualizar_registro=True):
     # Esta funcion anade una accion a la tabla acciones
     try:
         # Se crea la instancia del modelo Accion con la informacion
@@ -173,6 +208,12 @@ def add_accion(db, user_id, habito, fecha_realizacion, texto, cantidad):
         db.refresh(accion)
         # Se informa que la accion se anadio correctamente
         print(f"Accion anadida correctamente: {accion}")
+        # Se actualiza el bucket del libro de puntos de ese dia y la version de los datos
+        if actualizar_registro:
+            actualizar_puntos(db, user_id, habito, fecha_realizacion)
+            marcar_cambio(db, user_id)
+            # Una accion de una semana ya cerrada cambia su resumen congelado
+            recongelar_semanas(db, user_id, fecha_realizacion)
         return accion
     except IntegrityError as e:
         # Se deshacen los cambios en caso de error de integridad
@@ -190,7 +231,12 @@ def modify_acciones(db, user_id, acciones):
         db.commit()
         # Se recorre la lista de acciones para anadirlas
         for (habito, fecha_realizacion, texto, cantidad) in acciones:
-            add_accion(db, user_id, habito, fecha_realizacion, texto, cantidad)
+            add_accion(db, user_id, habito, fecha_realizacion, texto, cantidad, actualizar_registro=False)
+        # Se recalcula el libro de puntos del usuario y su version una sola vez
+        actualizar_puntos(db, user_id)
+        marcar_cambio(db, user_id)
+        # Las semanas congeladas se vuelven a calcular con las acciones nuevas
+        recongelar_semanas(db, user_id)
     except Exception as e:
         # Si ocurre un error se deshacen los cambios
         db.rollback()
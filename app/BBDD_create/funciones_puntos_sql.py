@@ -0,0 +1,228 @@
+from datetime import datetime, timedelta, date
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# ------------------------------------------------------------------------
+# Cálculo de puntos en Postgres
+#
+# Las reglas son las mismas que aplica el pipeline de pandas
+# (convert_to_dataframe + get_points_accumulated_*), pero expresadas como una única
+# consulta agregada sobre 'acciones' unida a 'habitos':
+#   - diarios: 10 puntos si se alcanza el objetivo, si no la parte proporcional (1 decimal),
+#   - 'dejar' diarios: 10 puntos por día si no se supera el límite; los días de martes a domingo
+#     de la semana actual sin registros cuentan como días sin el mal hábito,
+#   - semanales: min(total_día / objetivo * 50, 50) por día, dentro de la semana del primer registro;
+#     en la semana actual cuenta el máximo diario y en el histórico la suma.
+# Postgres devuelve directamente el total final.
+# ------------------------------------------------------------------------
+
+# Puntos de una fila (hábito, día) según su categoría, total y objetivo
+PUNTOS_DIARIO = """
+    CASE
+        WHEN categoria = 'dejar' THEN CASE WHEN total <= objetivo THEN 10 ELSE 0 END
+        WHEN total >= objetivo THEN 10
+        WHEN objetivo <> 0 THEN round(CAST(LEAST(total / objetivo * 10, 10) AS numeric), 1)
+        ELSE 0
+    END
+"""
+PUNTOS_SEMANAL = "CASE WHEN objetivo > 0 THEN LEAST(total / objetivo * 50, 50) ELSE 0 END"
+
+# Filas base: total por (hábito, día), con los mismos valores por defecto que convert_to_dataframe
+_FILAS_HISTORICO = """
+    filas AS (
+        SELECT
+            lower(coalesce(h.habito, '')) AS habito,
+            lower(coalesce(h.categoria, '')) AS categoria,
+            lower(coalesce(h.frecuencia_objetivo, '')) AS frecuencia,
+            coalesce(h.cantidad_objetivo, 0) AS objetivo,
+            date(a.fecha_realizacion) AS dia,
+            coalesce(sum(a.cantidad), 0) AS total
+        FROM habitos h
+        JOIN acciones a
+          ON a.user_id = h.user_id AND a.habito = h.habito
+        WHERE h.user_id = :user_id
+        GROUP BY 1, 2, 3, 4, 5
+    )
+"""
+
+# En la semana se usa outer join: los hábitos sin acciones aparecen el lunes con total 0
+_FILAS_SEMANA = """
+    filas AS (
+        SELECT
+            lower(coalesce(h.habito, '')) AS habito,
+            lower(coalesce(h.categoria, '')) AS categoria,
+            lower(coalesce(h.frecuencia_objetivo, '')) AS frecuencia,
+            coalesce(h.cantidad_objetivo, 0) AS objetivo,
+            coalesce(date(a.fecha_realizacion), CAST(:lunes AS date)) AS dia,
+            coalesce(sum(a.cantidad), 0) AS total
+        FROM habitos h
+        LEFT JOIN acciones a
+          ON a.user_id = h.user_id AND a.habito = h.habito
+         AND a.fecha_realizacion >= :lunes
+         AND a.fecha_realizacion < CAST(:domingo AS date) + 1
+        WHERE h.user_id = :user_id
+        GROUP BY 1, 2, 3, 4, 5
+    )
+"""
+
+# Puntos de los hábitos diarios y relleno de días sin registro de los hábitos 'dejar'
+_PUNTOS_DIARIOS = f"""
+    puntos_diarios AS (
+        SELECT
+            {PUNTOS_DIARIO} AS puntos
+        FROM filas
+        WHERE frecuencia = 'diaria'
+    ),
+    relleno_dejar AS (
+        SELECT
+            CASE WHEN d.objetivo >= 0 THEN 10 ELSE 0 END * (
+                SELECT count(*)
+                FROM generate_series(CAST(:martes AS date), CAST(:domingo AS date), interval '1 day') AS g(dia)
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM filas f WHERE f.habito = d.habito AND f.dia = CAST(g.dia AS date)
+                )
+            ) AS puntos
+        FROM (
+            SELECT DISTINCT habito, categoria, frecuencia, objetivo
+            FROM filas
+            WHERE categoria = 'dejar' AND frecuencia = 'diaria'
+        ) d
+    ),
+    semanales AS (
+        SELECT
+            habito,
+            dia,
+            {PUNTOS_SEMANAL} AS puntos,
+            min(dia) OVER (PARTITION BY habito) AS primer_dia
+        FROM filas
+        WHERE frecuencia = 'semanal'
+    )
+"""
+
+QUERY_PUNTOS_HISTORICO = f"""
+    WITH {_FILAS_HISTORICO}, {_PUNTOS_DIARIOS}
+    SELECT CAST(round(CAST(
+          coalesce((SELECT sum(puntos) FROM puntos_diarios), 0)
+        + coalesce((SELECT sum(puntos) FROM relleno_dejar), 0)
+        + coalesce((
+            SELECT sum(puntos) FROM semanales
+            WHERE dia < date_trunc('week', primer_dia) + interval '7 days'
+          ), 0)
+    AS numeric), 1) AS float)
+"""
+
+QUERY_PUNTOS_SEMANA = f"""
+    WITH {_FILAS_SEMANA}, {_PUNTOS_DIARIOS}
+    SELECT CAST(
+          coalesce((SELECT sum(puntos) FROM puntos_diarios), 0)
+        + coalesce((SELECT sum(puntos) FROM relleno_dejar), 0)
+        + coalesce((
+            SELECT sum(maximo) FROM (
+                SELECT GREATEST(max(puntos), 0) AS maximo FROM semanales GROUP BY habito
+            ) m
+          ), 0)
+    AS float)
+"""
+
+
+# Puntos de la semana de todos los usuarios con hábitos (mismas reglas que QUERY_PUNTOS_SEMANA),
+# en una sola consulta agrupada por usuario
+QUERY_PUNTOS_SEMANA_USUARIOS = f"""
+    WITH filas AS (
+        SELECT
+            h.user_id,
+            lower(coalesce(h.habito, '')) AS habito,
+            lower(coalesce(h.categoria, '')) AS categoria,
+            lower(coalesce(h.frecuencia_objetivo, '')) AS frecuencia,
+            coalesce(h.cantidad_objetivo, 0) AS objetivo,
+            coalesce(date(a.fecha_realizacion), CAST(:lunes AS date)) AS dia,
+            coalesce(sum(a.cantidad), 0) AS total
+        FROM habitos h
+        LEFT JOIN acciones a
+          ON a.user_id = h.user_id AND a.habito = h.habito
+         AND a.fecha_realizacion >= :lunes
+         AND a.fecha_realizacion < CAST(:domingo AS date) + 1
+        GROUP BY 1, 2, 3, 4, 5, 6
+    ),
+    diarios AS (
+        SELECT user_id, sum({PUNTOS_DIARIO}) AS puntos
+        FROM filas
+        WHERE frecuencia = 'diaria'
+        GROUP BY user_id
+    ),
+    relleno_dejar AS (
+        SELECT
+            d.user_id,
+            sum(CASE WHEN d.objetivo >= 0 THEN 10 ELSE 0 END * (
+                SELECT count(*)
+                FROM generate_series(CAST(:martes AS date), CAST(:domingo AS date), interval '1 day') AS g(dia)
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM filas f
+                    WHERE f.user_id = d.user_id AND f.habito = d.habito AND f.dia = CAST(g.dia AS date)
+                )
+            )) AS puntos
+        FROM (
+            SELECT DISTINCT user_id, habito, objetivo
+            FROM filas
+            WHERE categoria = 'dejar' AND frecuencia = 'diaria'
+        ) d
+        GROUP BY d.user_id
+    ),
+    semanales AS (
+        SELECT user_id, sum(maximo) AS puntos
+        FROM (
+            SELECT user_id, habito, GREATEST(max({PUNTOS_SEMANAL}), 0) AS maximo
+            FROM filas
+            WHERE frecuencia = 'semanal'
+            GROUP BY 1, 2
+        ) m
+        GROUP BY user_id
+    )
+    SELECT
+        u.user_id,
+        CAST(coalesce(d.puntos, 0) + coalesce(r.puntos, 0) + coalesce(s.puntos, 0) AS float) AS puntos
+    FROM (SELECT DISTINCT user_id FROM filas) u
+    LEFT JOIN diarios d ON d.user_id = u.user_id
+    LEFT JOIN relleno_dejar r ON r.user_id = u.user_id
+    LEFT JOIN semanales s ON s.user_id = u.user_id
+"""
+
+def limites_semana(fecha_referencia: date = None) -> dict:
+    """
+    Retorna los parámetros de la semana (lunes->domingo) que contiene fecha_referencia (por defecto hoy).
+    """
+    fecha_referencia = fecha_referencia or datetime.now().date()
+    lunes = fecha_referencia - timedelta(days=fecha_referencia.weekday())
+    return {
+        "lunes": lunes,
+        "martes": lunes + timedelta(days=1),
+        "domingo": lunes + timedelta(days=6),
+    }
+
+
+def get_points_weekly_sql(db: Session, user_id: int, fecha_referencia: date = None) -> float:
+    """
+    Puntos de la semana que contiene fecha_referencia (por defecto la actual), calculados en Postgres.
+    """
+    params = {"user_id": user_id, **limites_semana(fecha_referencia)}
+    return float(db.execute(text(QUERY_PUNTOS_SEMANA), params).scalar() or 0.0)
+
+
+def get_points_weekly_all_users_sql(db: Session, fecha_referencia: date = None) -> dict:
+    """
+    Puntos de la semana que contiene fecha_referencia (por defecto la actual) de todos los usuarios
+    con hábitos, calculados en Postgres en una consulta. Retorna {user_id: puntos}.
+    """
+    params = limites_semana(fecha_referencia)
+    return {
+        user_id: float(puntos or 0.0)
+        for user_id, puntos in db.execute(text(QUERY_PUNTOS_SEMANA_USUARIOS), params)
+    }
+
+
+def get_points_all_time_sql(db: Session, user_id: int) -> float:
+    """
+    Puntos de todo el historial calculados en Postgres, redondeados a 1 decimal.
+    """
+    params = {"user_id": user_id, **limites_semana()}
+    return float(db.execute(text(QUERY_PUNTOS_HISTORICO), params).scalar() or 0.0)
@@ -0,0 +1,315 @@
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from BBDD_create.render_dashboard import get_render
+
+# ------------------------------------------------------------------------
+# Informes mensual y anual
+#
+# Postgres agrupa las acciones del periodo por hábito y día y las agrega en buckets con
+# date_trunc ('day' en el informe mensual, 'week' en el anual). A Python solo llegan las
+# filas (hábito, bucket) con el total, los días con registro, el cumplimiento sumado y los
+# días cumplidos, así que el coste del informe depende del número de buckets y no del
+# número de acciones. Con esas filas se puntúa y se rellenan los paneles:
+#   - diarios: 10 puntos por día cumplido y la parte proporcional de los días a medias,
+#   - 'dejar' diarios: 10 puntos por día sin superar el límite (los días sin registro cuentan),
+#   - semanales: min(total_semana / objetivo * 50, 50) por cada semana natural del periodo.
+# ------------------------------------------------------------------------
+
+PERIODOS = {"mes": "day", "anio": "week"}
+
+MESES = (
+    "enero", "febrero", "marzo", "abril", "mayo", "junio",
+    "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"
+)
+
+# Cumplimiento de un día: 1 si se alcanza el objetivo (o no se supera el límite en 'dejar'),
+# si no la fracción alcanzada
+_CUMPLIMIENTO_DIA = """
+    CASE
+        WHEN categoria = 'dejar' THEN CASE WHEN total <= objetivo THEN 1 ELSE 0 END
+        WHEN total >= objetivo THEN 1
+        WHEN objetivo <> 0 THEN LEAST(total / objetivo, 1)
+        ELSE 0
+    END
+"""
+
+QUERY_BUCKETS_PERIODO = f"""
+    WITH filas AS (
+        SELECT
+            lower(coalesce(h.habito, '')) AS habito,
+            lower(coalesce(h.categoria, '')) AS categoria,
+            lower(coalesce(h.frecuencia_objetivo, '')) AS frecuencia,
+            coalesce(h.cantidad_objetivo, 0) AS objetivo,
+            date(a.fecha_realizacion) AS dia,
+            coalesce(sum(a.cantidad), 0) AS total
+        FROM habitos h
+        JOIN acciones a
+          ON a.user_id = h.user_id AND a.habito = h.habito
+         AND a.fecha_realizacion >= :inicio
+         AND a.fecha_realizacion < :fin
+        WHERE h.user_id = :user_id
+        GROUP BY 1, 2, 3, 4, 5
+    )
+    SELECT
+        habito,
+        categoria,
+        frecuencia,
+        objetivo,
+        CAST(date_trunc(:unidad, CAST(dia AS timestamp)) AS date) AS bucket,
+        CAST(sum(total) AS float) AS total,
+        count(*) AS dias,
+        CAST(sum({_CUMPLIMIENTO_DIA}) AS float) AS cumplimiento,
+        sum(CASE WHEN {_CUMPLIMIENTO_DIA} >= 1 THEN 1 ELSE 0 END) AS dias_cumplidos
+    FROM filas
+    GROUP BY 1, 2, 3, 4, 5
+    ORDER BY 5
+"""
+
+QUERY_HABITOS_PERIODO = """
+    SELECT
+        lower(coalesce(habito, '')) AS habito,
+        lower(coalesce(categoria, '')) AS categoria,
+        lower(coalesce(frecuencia_objetivo, '')) AS frecuencia,
+        coalesce(cantidad_objetivo, 0) AS objetivo
+    FROM habitos
+    WHERE user_id = :user_id
+"""
+
+COLUMNAS_BUCKETS = [
+    "habito", "categoria", "frecuencia", "objetivo", "bucket", "total", "dias", "cumplimiento", "dias_cumplidos"
+]
+
+
+def limites_periodo(periodo: str, fecha_referencia: date = None) -> dict:
+    """
+    Retorna los límites del periodo ('mes' o 'anio') que contiene fecha_referencia (por defecto hoy):
+    inicio (incluido), fin (excluido), último día transcurrido, unidad de date_trunc, clave y título.
+    """
+    if periodo not in PERIODOS:
+        raise ValueError(f"Periodo no soportado: {periodo}")
+    hoy = fecha_referencia or datetime.now().date()
+    if periodo == "mes":
+        inicio = hoy.replace(day=1)
+        fin = (inicio + timedelta(days=32)).replace(day=1)
+        clave = f"{hoy.year}-{hoy.month:02d}"
+        titulo = f"Tu informe de {MESES[hoy.month - 1]} de TrueHabits"
+    else:
+        inicio = date(hoy.year, 1, 1)
+        fin = date(hoy.year + 1, 1, 1)
+        clave = f"{hoy.year}"
+        titulo = f"Tu informe de {hoy.year} de TrueHabits"
+    return {
+        "periodo": periodo,
+        "inicio": inicio,
+        "fin": fin,
+        "ultimo": min(hoy, fin - timedelta(days=1)),
+        "unidad": PERIODOS[periodo],
+        "clave": clave,
+        "titulo": titulo,
+    }
+
+
+def cargar_buckets(db: Session, user_id: int, limites: dict) -> tuple:
+    """
+    Retorna (buckets, habitos) del periodo: un DataFrame con una fila por (hábito, bucket)
+    con acciones y otro con todos los hábitos del usuario.
+    """
+    params = {"user_id": user_id, "inicio": limites["inicio"], "fin": limites["fin"], "unidad": limites["unidad"]}
+    buckets = pd.DataFrame(db.execute(text(QUERY_BUCKETS_PERIODO), params).fetchall(), columns=COLUMNAS_BUCKETS)
+    habitos = pd.DataFrame(
+        db.execute(text(QUERY_HABITOS_PERIODO), {"user_id": user_id}).fetchall(),
+        columns=["habito", "categoria", "frecuencia", "objetivo"]
+    )
+    for df in (buckets, habitos):
+        df["objetivo"] = df["objetivo"].astype(float)
+    return buckets, habitos
+
+
+def lista_buckets(limites: dict) -> list:
+    # Inicio de cada bucket desde el principio del periodo hasta el último día transcurrido
+    if limites["unidad"] == "day":
+        paso, primero = 1, limites["inicio"]
+    else:
+        paso, primero = 7, limites["inicio"] - timedelta(days=limites["inicio"].weekday())
+    n = (limites["ultimo"] - primero).days // paso + 1
+    return [primero + timedelta(days=paso * i) for i in range(n)]
+
+
+def dias_transcurridos(bucket: date, limites: dict) -> int:
+    # Días del bucket dentro del periodo y no posteriores a hoy
+    fin_bucket = bucket + timedelta(days=0 if limites["unidad"] == "day" else 6)
+    return max(0, (min(fin_bucket, limites["ultimo"]) - max(bucket, limites["inicio"])).days + 1)
+
+
+def puntuar_buckets(buckets: pd.DataFrame, habitos: pd.DataFrame, limites: dict) -> pd.DataFrame:
+    """
+    Puntúa las filas (hábito, bucket) del periodo y añade los buckets sin registro de los
+    hábitos 'dejar' diarios (que también puntúan). Retorna las filas con la columna 'puntos'.
+    """
+    todos = lista_buckets(limites)
+    transcurridos = {b: dias_transcurridos(b, limites) for b in todos}
+    buckets = buckets.assign(puntos=0.0)
+
+    # Diarios: 10 puntos por unidad de cumplimiento ('dejar' con días sin registro aparte)
+    diaria = (buckets["frecuencia"] == "diaria").to_numpy()
+    dejar = (buckets["categoria"] == "dejar").to_numpy()
+    buckets.loc[diaria, "puntos"] = 10 * buckets.loc[diaria, "cumplimiento"]
+
+    # 'dejar' diarios: cada día transcurrido sin registro suma 10 puntos si el límite no es negativo
+    habitos_dejar = habitos[(habitos["frecuencia"] == "diaria") & (habitos["categoria"] == "dejar")]
+    if not habitos_dejar.empty:
+        rejilla = habitos_dejar.merge(pd.DataFrame({"bucket": todos}), how="cross")
+        rejilla = rejilla.merge(
+            buckets.loc[diaria & dejar, ["habito", "bucket", "total", "dias", "cumplimiento", "dias_cumplidos", "puntos"]],
+            on=["habito", "bucket"], how="left"
+        ).fillna({"total": 0.0, "dias": 0, "cumplimiento": 0.0, "dias_cumplidos": 0, "puntos": 0.0})
+        sin_registro = rejilla["bucket"].map(transcurridos) - rejilla["dias"]
+        rejilla["puntos"] += 10 * sin_registro.clip(lower=0) * (rejilla["objetivo"] >= 0)
+        buckets = pd.concat([buckets[~(diaria & dejar)], rejilla[buckets.columns]], ignore_index=True)
+
+    # Semanales: se suma el total de cada semana natural y los puntos van al primer bucket de la semana
+    semanal = buckets["frecuencia"] == "semanal"
+    if semanal.any():
+        semanales = buckets[semanal]
+        semana = semanales["bucket"].map(lambda b: b - timedelta(days=b.weekday()))
+        grupos = semanales.groupby([semanales["habito"], semana])
+        total_semana = grupos["total"].transform("sum")
+        primero = semanales["bucket"] == grupos["bucket"].transform("min")
+        objetivo = semanales["objetivo"]
+        puntos = np.where(objetivo > 0, np.minimum(total_semana / objetivo.where(objetivo > 0, 1) * 50, 50), 0.0)
+        buckets.loc[semanal, "puntos"] = np.where(primero, puntos, 0.0)
+
+    buckets["puntos"] = buckets["puntos"].round(1)
+    return buckets
+
+
+def puntos_maximos(habitos: pd.DataFrame, limites: dict) -> int:
+    # 10 puntos por hábito diario y día transcurrido, 50 por hábito semanal y semana (aunque sea parcial)
+    todos = lista_buckets(limites)
+    dias = sum(dias_transcurridos(b, limites) for b in todos)
+    semanas = len({b - timedelta(days=b.weekday()) for b in todos})
+    frecuencias = habitos["frecuencia"].tolist()
+    return frecuencias.count("diaria") * 10 * dias + frecuencias.count("semanal") * 50 * semanas
+
+
+def datos_informe_periodo(db: Session, user_id: int, periodo: str, fecha_referencia: date = None):
+    """
+    Calcula los datos de los paneles del informe mensual ('mes') o anual ('anio') del usuario
+    con el mismo formato que datos_dashboard. Retorna None si no hay acciones en el periodo.
+    """
+    limites = limites_periodo(periodo, fecha_referencia)
+    buckets, habitos = cargar_buckets(db, user_id, limites)
+    if buckets.empty or not (buckets["total"] > 0).any():
+        return None
+    buckets = puntuar_buckets(buckets, habitos, limites)
+
+    etiquetas_personalizadas = {
+        "alimentacion": "Alimentación",
+        "caminar": "Caminar",
+        "deporte": "Deporte",
+        "estilo-vida": "Estilo de Vida",
+        "tiempo": "Planificación <br>& Reflexión",
+        "dejar": "Hábitos <br>a eliminar"
+    }
+    colores_categoria = ["#0F4738", "#1E5F4B", "#2A6F5B", "#4A937C", "#165446", "#044021"]
+    etiqueta = lambda c: etiquetas_personalizadas.get(c, c.capitalize())
+
+    # Puntos por categoría (de menor a mayor, como en el informe semanal)
+    por_categoria = buckets.groupby("categoria", sort=False)["puntos"].sum().sort_values(kind="stable")
+    maximo_categoria = float(por_categoria.max()) if len(por_categoria) else 0.0
+    categorias = {
+        "etiquetas": [etiqueta(c) for c in por_categoria.index],
+        "puntos": [round(float(p), 1) for p in por_categoria],
+        "colores": colores_categoria[:len(por_categoria)],
+        "max_eje": max(maximo_categoria * 1.25, 10),
+        # El mínimo para canjear premios es semanal: no se dibuja en estos informes
+        "minimo": None,
+    }
+
+    # Días cumplidos por categoría (hábitos diarios; en 'dejar', días sin superar el límite)
+    diarios = buckets[buckets["frecuencia"] == "diaria"]
+    cumplidos = diarios.assign(
+        dias_cumplidos=np.where(
+            diarios["categoria"] == "dejar",
+            diarios["puntos"] // 10,
+            diarios["dias_cumplidos"]
+        )
+    ).groupby("categoria")["dias_cumplidos"].sum().sort_values(ascending=False, kind="stable")
+    racha = {
+        "etiquetas": [etiqueta(c).replace("<br>", "") for c in cumplidos.index],
+        "dias": [int(d) for d in cumplidos],
+        "colores": colores_categoria[:len(cumplidos)],
+    }
+
+    # Serie de puntos por bucket (todos los buckets transcurridos, con 0 si no hay puntos)
+    todos = lista_buckets(limites)
+    por_bucket = buckets.groupby("bucket")["puntos"].sum().reindex(todos, fill_value=0.0)
+    if periodo == "mes":
+        etiquetas_serie = [str(b.day) for b in todos]
+        eje_x = "Días del mes"
+    else:
+        etiquetas_serie = [f"S{b.isocalendar()[1]}" for b in todos]
+        eje_x = "Semanas del año"
+    serie = {
+        "etiquetas": etiquetas_serie,
+        "puntos": [round(float(p), 1) for p in por_bucket],
+        "promedio": float(por_bucket.mean()),
+        "eje_x": eje_x,
+    }
+
+    # Hábitos con más puntos en el periodo
+    por_habito = (
+        buckets.groupby("habito", sort=False)
+        .agg(total=("total", "sum"), dias=("dias", "sum"), puntos=("puntos", "sum"))
+        .sort_values("puntos", ascending=False, kind="stable")
+        .head(10)
+    )
+    habitos_tabla = {
+        "cabeceras": ["Hábito", "Total", "Días", "Puntos"],
+        "columnas": [
+            [h.capitalize() for h in por_habito.index],
+            [f"{t:g}" for t in por_habito["total"]],
+            [int(d) for d in por_habito["dias"]],
+            [f"{p:.1f}" for p in por_habito["puntos"]],
+        ],
+    }
+
+    return {
+        "titulo": limites["titulo"],
+        "filas": [
+            [("gauge", "<b>Puntos TrueHabits</b>"), ("categorias", "<b>Puntos por tipo de hábito</b>")],
+            [("habitos", "<b>Hábitos con más puntos</b>"), ("racha", "<b>Días cumplidos</b>")],
+            [("serie", "<b>Puntos por día</b>" if periodo == "mes" else "<b>Puntos por semana</b>")],
+        ],
+        "alto": 1100,
+        "espaciado": 0.15,
+        "puntos_totales": round(float(buckets["puntos"].sum()), 1),
+        "puntos_objetivo_totales": puntos_maximos(habitos, limites),
+        "categorias": categorias,
+        "racha": racha,
+        "serie": serie,
+        "habitos": habitos_tabla,
+    }
+
+
+def generate_informe_periodo(db: Session, user_id: int, periodo: str, tiempos: dict = None, motor: str = None,
+                             formato=None):
+    """
+    Genera el informe mensual ('mes') o anual ('anio') del usuario y lo retorna como bytes de la imagen
+    (en el FormatoInforme indicado; por defecto, el global).
+    Retorna None si no hay acciones en el periodo. Si se pasa el dict tiempos, se rellena con los
+    segundos de cada etapa (datos, figura, png), como en generate_dashboard.
+    """
+    tiempos = tiempos if tiempos is not None else {}
+    inicio = time.perf_counter()
+    datos = datos_informe_periodo(db, user_id, periodo)
+    tiempos["datos"] = time.perf_counter() - inicio
+    if datos is None:
+        return None
+    return get_render(motor).renderizar(datos, tiempos, formato)
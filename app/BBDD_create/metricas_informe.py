@@ -0,0 +1,118 @@
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# ------------------------------------------------------------------------
+# Métricas del informe semanal
+#
+# calcular_metricas recibe el DataFrame semanal de convert_to_dataframe y calcula en una
+# pasada todo lo que usan los paneles: puntos totales y por categoría, días cumplidos por
+# categoría, días sin mal hábito, puntos por categoría y día de la semana y puntos de hoy.
+# Las columnas auxiliares (día de la semana, cumplido, puntos de hoy) se calculan una vez
+# y cada estadística sale de un único groupby. El resultado es inmutable.
+# ------------------------------------------------------------------------
+
+DIAS_SEMANA = ("L", "M", "X", "J", "V", "S", "D")
+
+
+@dataclass(frozen=True)
+class MetricasInforme:
+    puntos_totales: float
+    puntos_objetivo_totales: int
+    # {categoria: puntos} de todas las categorías con registros (en orden de aparición)
+    puntos_categoria: dict
+    # Categorías de hábitos diarios en orden de aparición
+    categorias_diarias: tuple
+    # {categoria: días con el objetivo cumplido} (solo hábitos diarios)
+    dias_cumplidos: dict
+    # Días de la semana sin registrar el mal hábito ('dejar' diario)
+    dias_reducir: int
+    # {categoria: 7 puntos de lunes a domingo}
+    puntos_dia: dict
+    # ((categoria, habito, puntos), ...) de hoy, agrupado por categoría y hábito
+    hoy: tuple
+    mostrar_caminar: bool
+    mostrar_deporte: bool
+    mostrar_estilo_vida: bool
+    mostrar_reducir: bool
+
+
+def calcular_metricas(df: pd.DataFrame, habitos, lunes: date, hoy: datetime = None) -> MetricasInforme:
+    """
+    Calcula las métricas del informe a partir del DataFrame semanal (no vacío) y los hábitos
+    del usuario (con atributos categoria y frecuencia_objetivo). hoy es por defecto la fecha actual.
+    """
+    # Import local: funciones_informe importa este módulo
+    from BBDD_create.funciones_informe import calcular_puntos_vectorizado
+
+    hoy = (hoy or datetime.now()).strftime("%Y-%m-%d")
+    frecuencias = [(h.frecuencia_objetivo or "").lower() for h in habitos]
+    puntos_objetivo_totales = frecuencias.count("diaria") * 7 * 10 + frecuencias.count("semanal") * 50
+
+    # Columnas auxiliares (una vez para todo el DataFrame)
+    es_diaria = (df["frecuencia_objetivo"] == "diaria").to_numpy()
+    es_semanal = (df["frecuencia_objetivo"] == "semanal").to_numpy()
+    categoria = df["categoria"].to_numpy(dtype=object)
+    puntos = df["puntos"].to_numpy(dtype=float)
+    dia_semana = pd.to_datetime(df["fecha_realizacion"], errors="coerce").dt.weekday
+
+    # Puntos: los diarios se suman; de cada hábito semanal se toma el máximo (el acumulado final)
+    maximos_semanales = df[es_semanal].groupby(["id", "habito", "categoria"], sort=False)["puntos"].max()
+    puntos_totales = puntos[es_diaria].sum() + maximos_semanales.sum()
+    por_categoria = pd.concat([
+        df.loc[es_diaria, ["categoria", "puntos"]],
+        maximos_semanales.reset_index()[["categoria", "puntos"]],
+    ]).groupby("categoria")["puntos"].sum()
+    categorias = pd.unique(categoria)
+    puntos_categoria = {c: float(por_categoria.get(c, 0.0)) for c in categorias}
+
+    # Días cumplidos por categoría (hábitos diarios)
+    cumplido = es_diaria & (puntos >= df["puntos_obj"].to_numpy(dtype=float))
+    dias_cumplidos = df[cumplido].groupby("categoria")["fecha_realizacion"].nunique().to_dict()
+    categorias_diarias = tuple(pd.unique(categoria[es_diaria]))
+
+    # Días sin mal hábito: días de la semana sin acciones de hábitos 'dejar' diarios
+    semana = {(lunes + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(7)}
+    con_mal_habito = set(df.loc[
+        es_diaria & (categoria == "dejar") & (df["total_acciones"].to_numpy() > 0), "fecha_realizacion"
+    ])
+    dias_reducir = len(semana - con_mal_habito)
+
+    # Puntos por categoría y día de la semana (se incluyen los acumulados diarios de los semanales)
+    por_dia = (
+        df.assign(dia=dia_semana).dropna(subset=["dia"])
+        .groupby(["categoria", "dia"])["puntos"].sum()
+        .unstack(fill_value=0.0)
+        .reindex(columns=range(7), fill_value=0.0)
+    )
+    puntos_dia = {c: tuple(float(p) for p in fila) for c, fila in zip(por_dia.index, por_dia.to_numpy())}
+
+    # Puntos de hoy: se recalculan con la frecuencia de cada hábito (los semanales sobre el total del día)
+    es_hoy = (df["fecha_realizacion"] == hoy).to_numpy()
+    df_hoy = df.loc[es_hoy, ["categoria", "habito"]]
+    puntos_hoy, _ = calcular_puntos_vectorizado(
+        categoria[es_hoy], df.loc[es_hoy, "frecuencia_objetivo"],
+        df.loc[es_hoy, "total_acciones"], df.loc[es_hoy, "cantidad_objetivo"]
+    )
+    resumen_hoy = df_hoy.assign(puntos=np.round(puntos_hoy, 1)).groupby(["categoria", "habito"])["puntos"].sum()
+    tabla_hoy = tuple((c, h, float(p)) for (c, h), p in resumen_hoy.items())
+
+    con_puntos = puntos > 0
+    return MetricasInforme(
+        puntos_totales=float(puntos_totales),
+        puntos_objetivo_totales=puntos_objetivo_totales,
+        puntos_categoria=puntos_categoria,
+        categorias_diarias=categorias_diarias,
+        dias_cumplidos={c: int(dias_cumplidos.get(c, 0)) for c in categorias_diarias},
+        dias_reducir=dias_reducir,
+        puntos_dia=puntos_dia,
+        hoy=tabla_hoy,
+        mostrar_caminar=bool((con_puntos & (df["habito"] == "caminar").to_numpy()).any()),
+        mostrar_deporte=bool((con_puntos & (categoria == "deporte")).any()),
+        mostrar_estilo_vida=bool((con_puntos & (categoria == "estilo-vida")).any()),
+        mostrar_reducir=any(
+            f == "diaria" and (h.categoria or "").lower() == "dejar" for f, h in zip(frecuencias, habitos)
+        ),
+    )
@@ -0,0 +1,213 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+
+from sqlalchemy import text
+
+from BBDD_create.database import SessionLocal
+from BBDD_create.funciones_puntos_sql import get_points_weekly_sql, get_points_weekly_all_users_sql
+from BBDD_create.registro_puntos import get_points_all_time_registro, get_saldos_registro
+
+# ------------------------------------------------------------------------
+# Ranking de puntos
+#
+# Clasificaciones en memoria de la semana actual y del histórico, global y entre usuarios
+# con las mismas categorías de hábitos (grupo). Cada clasificación es una lista ordenada de
+# claves (-puntos, user_id), así que la posición, el percentil y los vecinos de un usuario
+# salen de una búsqueda binaria (bisect) en O(log n).
+#   - Se reconstruye desde Postgres al arrancar y cada medianoche en una tarea programada (el
+#     relleno de los 'dejar' depende del día): una consulta agrupada para la semana y otra para
+#     el libro de puntos. Las consultas de los usuarios nunca reconstruyen.
+#   - Cada cambio en el libro (actualizar_puntos) o en los hábitos (modify_habitos) recalcula
+#     solo los puntos de ese usuario y mueve su clave en las clasificaciones afectadas.
+# ------------------------------------------------------------------------
+
+ALCANCES = ("semana", "total")
+
+QUERY_GRUPOS = """
+    SELECT user_id, string_agg(DISTINCT lower(categoria), ',' ORDER BY lower(categoria)) AS grupo
+    FROM habitos
+    WHERE (CAST(:user_id AS bigint) IS NULL OR user_id = :user_id)
+      AND coalesce(categoria, '') <> ''
+    GROUP BY user_id
+"""
+
+
+class Clasificacion:
+    """
+    Lista ordenada de (-puntos, user_id): el primero es el que más puntos tiene
+    y a igualdad de puntos se ordena por user_id.
+    """
+
+    def __init__(self, puntos: dict = None):
+        self.puntos = dict(puntos or {})
+        self.claves = sorted((-p, user_id) for user_id, p in self.puntos.items())
+
+    def __len__(self) -> int:
+        return len(self.claves)
+
+    def __contains__(self, user_id) -> bool:
+        return user_id in self.puntos
+
+    def actualizar(self, user_id: int, puntos: float):
+        self.quitar(user_id)
+        self.puntos[user_id] = puntos
+        insort(self.claves, (-puntos, user_id))
+
+    def quitar(self, user_id: int):
+        if user_id not in self.puntos:
+            return
+        i = bisect_left(self.claves, (-self.puntos.pop(user_id), user_id))
+        del self.claves[i]
+
+    def posicion(self, user_id: int) -> int:
+        # Los empatados comparten la mejor posición (1 = primero)
+        return bisect_left(self.claves, (-self.puntos[user_id], float("-inf"))) + 1
+
+    def percentil(self, user_id: int) -> float:
+        # Porcentaje de usuarios con menos puntos
+        por_debajo = len(self.claves) - bisect_right(self.claves, (-self.puntos[user_id], float("inf")))
+        return 100 * por_debajo / len(self.claves)
+
+    def vecinos(self, user_id: int, n: int = 1) -> tuple:
+        """
+        Retorna ([(user_id, puntos)] de los n de arriba, [(user_id, puntos)] de los n de abajo).
+        """
+        i = bisect_left(self.claves, (-self.puntos[user_id], user_id))
+        arriba = [(u, -p) for p, u in self.claves[max(0, i - n):i]]
+        abajo = [(u, -p) for p, u in self.claves[i + 1:i + 1 + n]]
+        return arriba, abajo
+
+    def top(self, n: int = 10) -> list:
+        return [(u, -p) for p, u in self.claves[:n]]
+
+
+class RankingPuntos:
+    """
+    Clasificaciones por (alcance, grupo): alcance 'semana' o 'total' y grupo None (global)
+    o la lista de categorías del usuario ('deporte,dejar,...').
+    """
+
+    def __init__(self):
+        self.tablas = {}
+        self.grupos = {}
+        self.dia = None
+        self.lock = threading.Lock()
+        self.reconstrucciones = 0
+
+    def reconstruir(self, db=None):
+        """
+        Reconstruye todas las clasificaciones desde Postgres (puntos de la semana, libro y categorías).
+        """
+        if db is None:
+            with SessionLocal() as db:
+                return self.reconstruir(db)
+        dia = datetime.now().date()
+        puntos = {
+            "semana": get_points_weekly_all_users_sql(db),
+            "total": get_saldos_registro(db),
+        }
+        grupos = {user_id: grupo for user_id, grupo in db.execute(text(QUERY_GRUPOS), {"user_id": None})}
+
+        tablas = {}
+        for alcance in ALCANCES:
+            por_alcance = {user_id: round(p, 1) for user_id, p in puntos[alcance].items()}
+            tablas[(alcance, None)] = Clasificacion(por_alcance)
+            por_grupo = {}
+            for user_id, p in por_alcance.items():
+                por_grupo.setdefault(grupos.get(user_id, ""), {})[user_id] = p
+            for grupo, puntos_grupo in por_grupo.items():
+                tablas[(alcance, grupo)] = Clasificacion(puntos_grupo)
+
+        with self.lock:
+            self.tablas, self.grupos, self.dia = tablas, grupos, dia
+            self.reconstrucciones += 1
+
+    def actualizar_usuario(self, db, user_id: int):
+        """
+        Recalcula los puntos (semana e histórico) y el grupo de un usuario y lo recoloca.
+        Si las clasificaciones aún no se han construido no hace nada: se construirán completas.
+        """
+        if self.dia is None:
+            return
+        puntos = {
+            "semana": round(get_points_weekly_sql(db, user_id), 1),
+            "total": round(get_points_all_time_registro(db, user_id), 1),
+        }
+        fila = db.execute(text(QUERY_GRUPOS), {"user_id": user_id}).first()
+        grupo = fila.grupo if fila is not None else ""
+
+        with self.lock:
+            anterior = self.grupos.get(user_id, "")
+            self.grupos[user_id] = grupo
+            for alcance in ALCANCES:
+                if anterior != grupo and (alcance, anterior) in self.tablas:
+                    self.tablas[(alcance, anterior)].quitar(user_id)
+                self.tablas.setdefault((alcance, None), Clasificacion()).actualizar(user_id, puntos[alcance])
+                self.tablas.setdefault((alcance, grupo), Clasificacion()).actualizar(user_id, puntos[alcance])
+
+    def consultar(self, user_id: int, vecinos: int = 1) -> dict:
+        """
+        Retorna, para cada alcance ('semana', 'total') y ámbito ('global', 'grupo'), un dict con
+        puntos, posicion, usuarios, percentil y los vecinos de arriba y de abajo; o None si el
+        usuario no aparece (no tiene hábitos o las clasificaciones aún no se han construido).
+        """
+        resultado = {}
+        with self.lock:
+            grupo = self.grupos.get(user_id, "")
+            for alcance in ALCANCES:
+                resultado[alcance] = {}
+                for ambito, clave in (("global", None), ("grupo", grupo)):
+                    tabla = self.tablas.get((alcance, clave))
+                    if tabla is None or user_id not in tabla:
+                        return None
+                    arriba, abajo = tabla.vecinos(user_id, vecinos)
+                    resultado[alcance][ambito] = {
+                        "puntos": tabla.puntos[user_id],
+                        "posicion": tabla.posicion(user_id),
+                        "usuarios": len(tabla),
+                        "percentil": tabla.percentil(user_id),
+                        "arriba": arriba,
+                        "abajo": abajo,
+                    }
+        return resultado
+
+
+# Ranking compartido por todos los handlers del bot
+ranking_puntos = RankingPuntos()
+
+
+def inicializar_ranking():
+    """
+    Construye las clasificaciones al arrancar y cada medianoche (tarea programada).
+    Si falla se informa y se mantienen las clasificaciones anteriores.
+    """
+    try:
+        ranking_puntos.reconstruir()
+    except Exception as e:
+        print(f"Error al construir el ranking de puntos: {e}")
+
+
+def texto_ranking(user_id: int) -> str:
+    """
+    Mensaje para el usuario con su posición en la semana y en el histórico.
+    """
+    ranking = ranking_puntos.consultar(user_id)
+    if ranking is None:
+        return "📭 Aún no apareces en el ranking. ¡Registra tus hábitos para entrar! 🚀"
+
+    lineas = []
+    for alcance, titulo in (("semana", "🏆 Esta semana"), ("total", "🥇 En total")):
+        glob, grupo = ranking[alcance]["global"], ranking[alcance]["grupo"]
+        linea = (
+            f"{titulo}: puesto {glob['posicion']} de {glob['usuarios']} con {glob['puntos']:.1f} puntos "
+            f"(superas al {glob['percentil']:.0f}% de usuarios)."
+        )
+        if glob["arriba"]:
+            diferencia = glob["arriba"][-1][1] - glob["puntos"]
+            if diferencia > 0:
+                linea += f" Te faltan {diferencia:.1f} puntos para subir un puesto."
+        if grupo["usuarios"] > 1:
+            linea += f"\n   Entre quienes tienen tus mismos tipos de hábito: puesto {grupo['posicion']} de {grupo['usuarios']}."
+        lineas.append(linea)
+    return "\n".join(lineas)
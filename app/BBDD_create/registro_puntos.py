@@ -0,0 +1,275 @@
+import argparse
+from datetime import date, datetime
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from BBDD_create.database import SessionLocal, PuntosRegistro
+from BBDD_create.funciones_puntos_sql import PUNTOS_DIARIO, PUNTOS_SEMANAL, limites_semana, get_points_all_time_sql
+from BBDD_create.cubo_categorias import actualizar_cubo
+
+# ------------------------------------------------------------------------
+# Libro de puntos (tabla puntos_registro)
+#
+# Guarda los puntos ya calculados por (usuario, hábito en minúsculas, día) para los hábitos
+# diarios y por (usuario, hábito, lunes de la primera semana) para los semanales.
+# Las altas y bajas de acciones y los cambios de objetivo recalculan solo los buckets afectados,
+# y el histórico se lee como SUM(puntos) + el relleno de los 'dejar' en la semana actual
+# (lo único que depende del día en que se consulta).
+# ------------------------------------------------------------------------
+
+# Buckets de un usuario/hábito/día (los filtros a NULL no restringen)
+QUERY_BUCKETS = f"""
+    WITH filas AS (
+        SELECT
+            h.user_id,
+            lower(coalesce(h.habito, '')) AS habito,
+            lower(coalesce(h.categoria, '')) AS categoria,
+            lower(coalesce(h.frecuencia_objetivo, '')) AS frecuencia,
+            coalesce(h.cantidad_objetivo, 0) AS objetivo,
+            date(a.fecha_realizacion) AS dia,
+            coalesce(sum(a.cantidad), 0) AS total
+        FROM habitos h
+        JOIN acciones a
+          ON a.user_id = h.user_id AND a.habito = h.habito
+        WHERE (CAST(:user_id AS bigint) IS NULL OR h.user_id = :user_id)
+          AND (CAST(:habito AS varchar) IS NULL OR lower(coalesce(h.habito, '')) = :habito)
+          AND (CAST(:dia AS date) IS NULL OR date(a.fecha_realizacion) = :dia)
+        GROUP BY 1, 2, 3, 4, 5, 6
+    ),
+    semanales AS (
+        SELECT
+            user_id,
+            habito,
+            dia,
+            CAST(date_trunc('week', min(dia) OVER (PARTITION BY user_id, habito)) AS date) AS semana,
+            {PUNTOS_SEMANAL} AS puntos
+        FROM filas
+        WHERE frecuencia = 'semanal'
+    )
+    SELECT user_id, habito, fecha, sum(puntos) AS puntos
+    FROM (
+        SELECT user_id, habito, dia AS fecha, {PUNTOS_DIARIO} AS puntos
+        FROM filas
+        WHERE frecuencia = 'diaria'
+        UNION ALL
+        SELECT user_id, habito, semana, puntos
+        FROM semanales
+        WHERE dia < semana + 7
+    ) b
+    GROUP BY 1, 2, 3
+"""
+
+QUERY_BORRAR = """
+    DELETE FROM puntos_registro
+    WHERE (CAST(:user_id AS bigint) IS NULL OR user_id = :user_id)
+      AND (CAST(:habito AS varchar) IS NULL OR habito = :habito)
+      AND (CAST(:dia AS date) IS NULL OR fecha = :dia)
+"""
+
+QUERY_INSERTAR = f"""
+    INSERT INTO puntos_registro (user_id, habito, fecha, puntos, actualizado)
+    SELECT user_id, habito, fecha, puntos, now() FROM ({QUERY_BUCKETS}) buckets
+"""
+
+# Relleno de los 'dejar' diarios: días de martes a domingo de la semana actual sin registro
+QUERY_RELLENO_DEJAR = """
+    SELECT coalesce(sum(
+        CASE WHEN d.objetivo >= 0 THEN 10 ELSE 0 END * (
+            6 - (
+                SELECT count(*) FROM puntos_registro p
+                WHERE p.user_id = :user_id AND p.habito = d.habito
+                  AND p.fecha BETWEEN :martes AND :domingo
+            )
+        )
+    ), 0)
+    FROM (
+        SELECT DISTINCT lower(coalesce(habito, '')) AS habito, coalesce(cantidad_objetivo, 0) AS objetivo
+        FROM habitos
+        WHERE user_id = :user_id
+          AND lower(coalesce(categoria, '')) = 'dejar'
+          AND lower(coalesce(frecuencia_objetivo, '')) = 'diaria'
+    ) d
+    WHERE EXISTS (SELECT 1 FROM puntos_registro p WHERE p.user_id = :user_id AND p.habito = d.habito)
+"""
+
+QUERY_SALDO = f"""
+    SELECT CAST(round(CAST(
+        coalesce((SELECT sum(puntos) FROM puntos_registro WHERE user_id = :user_id), 0)
+        + ({QUERY_RELLENO_DEJAR})
+    AS numeric), 1) AS float)
+"""
+
+
+# Saldo de todos los usuarios con hábitos (mismo cálculo que QUERY_SALDO, agrupado por usuario)
+QUERY_SALDOS = """
+    WITH dejar AS (
+        SELECT DISTINCT
+            user_id,
+            lower(coalesce(habito, '')) AS habito,
+            coalesce(cantidad_objetivo, 0) AS objetivo
+        FROM habitos
+        WHERE lower(coalesce(categoria, '')) = 'dejar'
+          AND lower(coalesce(frecuencia_objetivo, '')) = 'diaria'
+    ),
+    relleno AS (
+        SELECT
+            d.user_id,
+            sum(CASE WHEN d.objetivo >= 0 THEN 10 ELSE 0 END * (
+                6 - (
+                    SELECT count(*) FROM puntos_registro p
+                    WHERE p.user_id = d.user_id AND p.habito = d.habito
+                      AND p.fecha BETWEEN :martes AND :domingo
+                )
+            )) AS puntos
+        FROM dejar d
+        WHERE EXISTS (SELECT 1 FROM puntos_registro p WHERE p.user_id = d.user_id AND p.habito = d.habito)
+        GROUP BY d.user_id
+    ),
+    libro AS (
+        SELECT user_id, sum(puntos) AS puntos
+        FROM puntos_registro
+        GROUP BY user_id
+    )
+    SELECT
+        u.user_id,
+        CAST(round(CAST(coalesce(l.puntos, 0) + coalesce(r.puntos, 0) AS numeric), 1) AS float) AS puntos
+    FROM (SELECT DISTINCT user_id FROM habitos) u
+    LEFT JOIN libro l ON l.user_id = u.user_id
+    LEFT JOIN relleno r ON r.user_id = u.user_id
+"""
+
+
+def recalcular_buckets(db: Session, user_id: int = None, habito: str = None, dia: date = None):
+    """
+    Recalcula (borra y vuelve a insertar) los buckets del libro que cumplen los filtros.
+    Sin filtros reconstruye el libro completo. No hace commit.
+    """
+    habito = habito.lower() if habito is not None else None
+    if dia is not None and habito is not None:
+        # Un hábito semanal solo tiene el bucket de su primera semana: cualquier cambio lo recalcula entero
+        es_semanal = db.execute(
+            text(
+                "SELECT bool_or(lower(coalesce(frecuencia_objetivo, '')) = 'semanal') FROM habitos "
+                "WHERE user_id = :user_id AND lower(coalesce(habito, '')) = :habito"
+            ),
+            {"user_id": user_id, "habito": habito}
+        ).scalar()
+        if es_semanal:
+            dia = None
+    params = {"user_id": user_id, "habito": habito, "dia": dia}
+    db.execute(text(QUERY_BORRAR), params)
+    db.execute(text(QUERY_INSERTAR), params)
+
+
+def actualizar_puntos(db: Session, user_id: int, habito: str = None, fecha: datetime = None, derivados: bool = True):
+    """
+    Actualiza el libro tras un cambio en las acciones o el objetivo de un hábito.
+    Con fecha solo se recalcula el bucket de ese día; sin fecha, todos los del hábito
+    (y sin hábito, todos los del usuario).
+    Un fallo aquí no deshace la operación principal: el libro se corrige con --reconciliar.
+    Tras el commit se actualizan sus celdas del cubo de categorías y se recoloca al usuario en el
+    ranking de puntos (con derivados=False no: quien recalcula varios hábitos lo hace una vez al final).
+    """
+    try:
+        if isinstance(fecha, datetime):
+            dia = fecha.date()
+        elif isinstance(fecha, date):
+            dia = fecha
+        else:
+            # Fecha desconocida o en texto: se recalcula el hábito completo
+            dia = None
+        recalcular_buckets(db, user_id, habito, dia)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error al actualizar el libro de puntos de '{habito}' del usuario {user_id}: {e}")
+        return
+    if derivados:
+        # Mismo día que el bucket del libro (o todo el usuario si no hay fecha)
+        actualizar_cubo(db, user_id, dia)
+        actualizar_ranking(db, user_id)
+
+
+def actualizar_ranking(db: Session, user_id: int):
+    """
+    Recoloca al usuario en el ranking de puntos. Un fallo aquí solo se informa.
+    """
+    try:
+        # Import local: ranking importa este módulo
+        from BBDD_create.ranking import ranking_puntos
+        ranking_puntos.actualizar_usuario(db, user_id)
+    except Exception as e:
+        print(f"Error al actualizar el ranking del usuario {user_id}: {e}")
+
+
+def get_points_all_time_registro(db: Session, user_id: int) -> float:
+    """
+    Puntos de todo el historial leídos del libro, redondeados a 1 decimal.
+    """
+    params = {"user_id": user_id, **limites_semana()}
+    return float(db.execute(text(QUERY_SALDO), params).scalar() or 0.0)
+
+
+def get_saldos_registro(db: Session) -> dict:
+    """
+    Puntos de todo el historial de todos los usuarios con hábitos, leídos del libro en una consulta.
+    Retorna {user_id: puntos}.
+    """
+    return {user_id: float(puntos or 0.0) for user_id, puntos in db.execute(text(QUERY_SALDOS), limites_semana())}
+
+
+def reconstruir_registro(db: Session, user_id: int = None):
+    """
+    Reconstruye el libro de puntos (de un usuario o completo) desde las acciones.
+    """
+    recalcular_buckets(db, user_id)
+    db.commit()
+
+
+def reconciliar_registro(db: Session, tolerancia: float = 0.1, corregir: bool = False) -> list:
+    """
+    Compara el saldo del libro con el cálculo en vivo para cada usuario con hábitos.
+    Retorna la lista de (user_id, libro, vivo) que no coinciden y, si corregir=True, reconstruye esos usuarios.
+    """
+    user_ids = [fila[0] for fila in db.execute(text("SELECT DISTINCT user_id FROM habitos"))]
+    diferencias = []
+    for user_id in user_ids:
+        libro = get_points_all_time_registro(db, user_id)
+        vivo = get_points_all_time_sql(db, user_id)
+        if abs(libro - vivo) > tolerancia:
+            diferencias.append((user_id, libro, vivo))
+            if corregir:
+                reconstruir_registro(db, user_id)
+    return diferencias
+
+
+def inicializar_registro():
+    """
+    Rellena el libro al arrancar si está vacío pero ya hay acciones (primera ejecución tras crear la tabla).
+    """
+    with SessionLocal() as db:
+        if db.query(PuntosRegistro).first() is None and db.execute(text("SELECT 1 FROM acciones LIMIT 1")).first():
+            print("Libro de puntos vacío: se reconstruye desde las acciones...")
+            reconstruir_registro(db)
+
+
+if __name__ == "__main__":
+    # Uso (desde el directorio app):
+    #   python -m BBDD_create.registro_puntos --rebuild [--usuario ID]
+    #   python -m BBDD_create.registro_puntos --reconciliar [--corregir]
+    parser = argparse.ArgumentParser(description="Mantenimiento del libro de puntos")
+    parser.add_argument("--rebuild", action="store_true", help="Reconstruye el libro desde las acciones")
+    parser.add_argument("--reconciliar", action="store_true", help="Compara el libro con el cálculo en vivo")
+    parser.add_argument("--corregir", action="store_true", help="Reconstruye los usuarios que no cuadren")
+    parser.add_argument("--usuario", type=int, default=None)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.rebuild:
+            reconstruir_registro(db, args.usuario)
+            print("Libro de puntos reconstruido.")
+        if args.reconciliar or not args.rebuild:
+            diferencias = reconciliar_registro(db, corregir=args.corregir)
+            for user_id, libro, vivo in diferencias:
+                print(f"user_id={user_id}: libro={libro} vivo={vivo}")
+            print(f"{len(diferencias)} usuarios con diferencias" + (" (corregidos)" if args.corregir and diferencias else ""))
@@ -0,0 +1,671 @@
+import copy
+import io
+import logging
+import threading
+import time
+
+from config import INFORME_RENDER
+from BBDD_create.formato_informe import FormatoInforme, formato_por_defecto, codificar
+
+# ------------------------------------------------------------------------
+# Motores de renderizado del informe semanal
+#
+# generate_dashboard calcula los datos de cada panel y la rejilla de filas (datos_dashboard)
+# y el motor elegido con INFORME_RENDER los dibuja y retorna los bytes de la imagen en el
+# formato pedido (PNG, JPEG o WebP, con escala y disposición compacta; ver formato_informe):
+#   - plotly:     figura de Plotly exportada con kaleido (arranca Chromium en cada proceso),
+#   - matplotlib: los mismos paneles con matplotlib y el backend Agg, sin procesos externos.
+#
+# Paneles: gauge, categorias, hoy, racha, caminar, deporte, estilo-vida, dejar y, en los
+# informes mensual y anual (informe_periodo), serie y habitos.
+# Cada fila de datos["filas"] tiene dos celdas (panel, titulo) o None si la celda queda vacía;
+# una fila con una sola celda ocupa las dos columnas.
+#
+# Con Plotly, la rejilla de subgráficos (make_subplots), los títulos, márgenes y fuentes solo
+# dependen de la firma de la rejilla (filas, espaciado, alto y título), y hay pocas distintas.
+# RenderPlotly guarda un esqueleto por firma y cada informe parte de una copia y solo añade
+# las trazas y los ajustes de ejes que dependen de los datos.
+# ------------------------------------------------------------------------
+
+# Disposición compacta: un panel por fila de ALTO_FILA_COMPACTO px, separadas SEPARACION_COMPACTO px
+ALTO_FILA_COMPACTO = 420
+SEPARACION_COMPACTO = 110
+# Márgenes superior (título) e inferior de la figura, en px
+MARGENES_ALTO = 250 + 80
+
+COLOR_PRINCIPAL = "#0F4738"
+COLOR_SECUNDARIO = "#dd9faf"
+COLOR_PROMEDIO = "lightcoral"
+COLOR_TRUEFRIENDS = "#31D3A9"
+COLOR_CELDAS = "#E5ECF6"
+PANELES_LINEAS = ("caminar", "deporte", "estilo-vida")
+
+
+def compactar(datos: dict) -> dict:
+    """
+    Retorna una copia de datos con un panel por fila a todo el ancho (en el mismo orden)
+    y el alto y el espaciado ajustados al número de filas.
+    """
+    celdas = [celda for fila in datos["filas"] for celda in fila if celda]
+    n = len(celdas)
+    alto = MARGENES_ALTO + n * ALTO_FILA_COMPACTO + (n - 1) * SEPARACION_COMPACTO
+    return dict(
+        datos,
+        filas=[[celda] for celda in celdas],
+        alto=alto,
+        # vertical_spacing de Plotly es una fracción del área de dibujo (sin márgenes)
+        espaciado=SEPARACION_COMPACTO / (alto - MARGENES_ALTO),
+        # El título queda a 70 px del borde superior, como en el informe de 1400 px
+        titulo_y=1 - 70 / alto,
+    )
+
+
+class RenderDashboard:
+    """
+    Interfaz común de los motores: renderizar(datos, tiempos, formato) retorna los bytes de la
+    imagen y anota en tiempos los segundos de construcción de la figura ('figura') y de
+    exportación ('png', sea cual sea el formato).
+    Cada motor implementa figura(datos) y exportar(fig, formato).
+    """
+
+    nombre = ""
+
+    def calentar(self):
+        # Se llama una vez por proceso worker antes del primer informe
+        pass
+
+    def renderizar(self, datos: dict, tiempos: dict, formato: FormatoInforme = None) -> bytes:
+        formato = formato or formato_por_defecto()
+        if formato.compacto:
+            datos = compactar(datos)
+        inicio = time.perf_counter()
+        fig = self.figura(datos)
+        inicio_png = time.perf_counter()
+        tiempos["figura"] = inicio_png - inicio
+        imagen = self.exportar(fig, formato)
+        tiempos["png"] = time.perf_counter() - inicio_png
+        return imagen
+
+    def figura(self, datos: dict):
+        raise NotImplementedError
+
+    def exportar(self, fig, formato: FormatoInforme) -> bytes:
+        raise NotImplementedError
+
+
+# ------------------------------------------------------------------------
+# Plotly + kaleido
+# ------------------------------------------------------------------------
+
+class RenderPlotly(RenderDashboard):
+
+    nombre = "plotly"
+    tipos = {
+        "gauge": "domain", "categorias": "xy", "hoy": "table", "racha": "xy",
+        "caminar": "xy", "deporte": "xy", "estilo-vida": "xy", "dejar": "domain",
+        "serie": "xy", "habitos": "table",
+    }
+
+    def __init__(self):
+        # Esqueletos por firma de la rejilla: (layout como dict, _grid_ref, _grid_str)
+        self.esqueletos = {}
+        self.lock = threading.Lock()
+
+    def calentar(self):
+        # El primer renderizado (arranque de Chromium) cuesta ~1 s y los siguientes unas decenas de ms
+        import plotly.graph_objects as go
+        try:
+            go.Figure().to_image(format="png", engine="kaleido")
+        except Exception as e:
+            logging.warning(f"No se ha podido precalentar kaleido: {e}")
+
+    def exportar(self, fig, formato: FormatoInforme) -> bytes:
+        # kaleido no tiene parámetro de calidad: jpeg y webp se codifican con Pillow desde el PNG
+        png = fig.to_image(format="png", engine="kaleido", scale=formato.escala)
+        return png if formato.formato == "png" else codificar(png, formato)
+
+    def figura(self, datos: dict):
+        fig = self.esqueleto(datos)
+        for r, fila in enumerate(datos["filas"], start=1):
+            for c, celda in enumerate(fila, start=1):
+                if celda is None:
+                    continue
+                panel = celda[0]
+                if panel in PANELES_LINEAS:
+                    self.panel_linea(fig, datos["lineas"][panel], r, c)
+                else:
+                    getattr(self, f"panel_{panel}")(fig, datos, r, c)
+        return fig
+
+    @staticmethod
+    def firma(datos: dict) -> tuple:
+        return (
+            tuple(tuple(fila) for fila in datos["filas"]), datos["espaciado"], datos["alto"], datos["titulo"]
+        )
+
+    def esqueleto(self, datos: dict):
+        """
+        Retorna una figura nueva con la rejilla y el layout de la firma de datos, sin trazas.
+        El primer informe de cada firma construye el esqueleto con make_subplots; los siguientes
+        copian su layout sin volver a validarlo (~1 ms frente a ~35 ms).
+        """
+        import plotly.graph_objects as go
+
+        firma = self.firma(datos)
+        with self.lock:
+            esqueleto = self.esqueletos.get(firma)
+        if esqueleto is None:
+            fig = self.construir_esqueleto(datos)
+            esqueleto = (fig.layout.to_plotly_json(), fig._grid_ref, fig._grid_str)
+            with self.lock:
+                self.esqueletos[firma] = esqueleto
+        layout, grid_ref, grid_str = esqueleto
+        fig = go.Figure(layout=copy.deepcopy(layout), _validate=False)
+        # go.Figure(fig) copia la rejilla igual; las trazas de los paneles sí se validan
+        fig._grid_ref, fig._grid_str = grid_ref, grid_str
+        fig._validate = True
+        return fig
+
+    def construir_esqueleto(self, datos: dict):
+        from plotly.subplots import make_subplots
+
+        specs, subplot_titles = [], []
+        for fila in datos["filas"]:
+            if len(fila) == 1:
+                specs.append([{"type": self.tipos[fila[0][0]], "colspan": 2}, None])
+            else:
+                specs.append([{"type": self.tipos[celda[0]]} if celda else None for celda in fila])
+            if not any(fila):
+                subplot_titles.extend(["", ""])
+            subplot_titles.extend(celda[1] for celda in fila if celda)
+
+        fig = make_subplots(
+            rows=len(specs),
+            cols=2,
+            vertical_spacing=datos["espaciado"],
+            horizontal_spacing=0.2,
+            specs=specs,
+            subplot_titles=subplot_titles
+        )
+        fig.update_layout(
+            title={
+                "text": f"<b><span style='text-shadow: 2px 2px 4px gray;'><br> {datos['titulo']}</span></b>",
+                "x": 0.5,
+                "y": datos.get("titulo_y", 0.95),
+                "xanchor": "center",
+                "font": {"size": 46, "color": COLOR_PRINCIPAL, "family": "Quicksand"}
+            },
+            margin={"t": 250, "b": 80, "l": 80, "r": 80},
+            font={"family": "Quicksand", "size": 14, "color": "black"},
+            height=datos["alto"],
+            width=1000,
+            legend={"yanchor": "bottom", "y": -0.3, "xanchor": "center", "x": 0.5},
+            showlegend=False
+        )
+        # Tamaño de fuente de los títulos de subgráficos
+        fig.update_annotations(font_size=18)
+        return fig
+
+    @staticmethod
+    def ejes(fig, row: int, col: int) -> tuple:
+        # Referencias ('x3', 'y3') de los ejes de la celda, para las anotaciones
+        subplot = fig.get_subplot(row, col)
+        return subplot.xaxis.plotly_name.replace("axis", ""), subplot.yaxis.plotly_name.replace("axis", "")
+
+    @staticmethod
+    def actualizar_ejes(fig, row: int, col: int, x: dict = None, y: dict = None):
+        # Equivale a update_xaxes/update_yaxes(row=, col=) sin recorrer y filtrar todos los ejes
+        subplot = fig.get_subplot(row, col)
+        if x:
+            subplot.xaxis.update(**x)
+        if y:
+            subplot.yaxis.update(**y)
+
+    def panel_gauge(self, fig, datos: dict, row: int, col: int):
+        import plotly.graph_objects as go
+
+        puntos, objetivo = datos["puntos_totales"], datos["puntos_objetivo_totales"]
+        max_gauge = max(1, puntos, objetivo)
+        fig.add_trace(
+            go.Indicator(
+                mode="gauge+number",
+                value=puntos,
+                title={"text": ""},
+                gauge={
+                    "axis": {
+                        "range": [0, max_gauge],
+                        "showticklabels": True,
+                        "tickvals": [0, objetivo],
+                        "ticktext": ["0", f"{objetivo}"]
+                    },
+                    "bar": {"color": COLOR_PRINCIPAL},
+                    "steps": [
+                        {"range": [0, puntos], "color": COLOR_PRINCIPAL},
+                        {"range": [puntos, max_gauge], "color": COLOR_SECUNDARIO}
+                    ],
+                    "borderwidth": 0
+                },
+                domain={"x": [0.2, 0.8], "y": [0.2, 0.4]}
+            ),
+            row=row, col=col
+        )
+
+    def panel_categorias(self, fig, datos: dict, row: int, col: int):
+        import plotly.graph_objects as go
+
+        categorias = datos["categorias"]
+        fig.add_trace(
+            go.Bar(
+                x=categorias["puntos"],
+                y=categorias["etiquetas"],
+                orientation='h',
+                marker=dict(color=categorias["colores"]),
+                text=[f"{p:g}" for p in categorias["puntos"]],
+                textposition='outside',
+                name="Puntos por Categoría",
+                showlegend=False
+            ),
+            row=row, col=col
+        )
+        self.actualizar_ejes(fig, row, col, x=dict(range=[0, categorias["max_eje"]]))
+        if categorias.get("minimo") is None:
+            return
+        minimo = categorias["minimo"]
+        xref, yref = self.ejes(fig, row, col)
+        n = len(categorias["etiquetas"])
+        # Línea fija en el mínimo para canjear premios (x=50)
+        fig.add_shape(
+            type="line", x0=minimo, x1=minimo, y0=-0.5, y1=n - 0.5,
+            line=dict(color=COLOR_PROMEDIO, dash="dash"), xref=xref, yref=yref
+        )
+        fig.add_annotation(
+            x=minimo, y=n - 0.5,
+            text="<span style='font-size:13px;'>Mínimo puntos premios</span>",
+            showarrow=False, font=dict(color=COLOR_PROMEDIO, size=18), align="center",
+            xref=xref, yref=yref, xanchor="center", yanchor="bottom"
+        )
+
+    def panel_hoy(self, fig, datos: dict, row: int, col: int):
+        hoy = datos["hoy"]
+        vacio = not hoy["habitos"]
+        columnas = [
+            ["-"] if vacio else hoy["categorias"],
+            ["-"] if vacio else hoy["habitos"],
+            ["0"] if vacio else hoy["puntos"]
+        ]
+        self.tabla(fig, ["Categoría", "Hábito", "Puntos"], columnas, [60, 40, 20], row, col)
+
+    def panel_habitos(self, fig, datos: dict, row: int, col: int):
+        habitos = datos["habitos"]
+        self.tabla(fig, habitos["cabeceras"], habitos["columnas"], [50, 25, 20, 25], row, col)
+
+    @staticmethod
+    def tabla(fig, cabeceras: list, columnas: list, anchos: list, row: int, col: int):
+        import plotly.graph_objects as go
+
+        fig.add_trace(
+            go.Table(
+                columnwidth=anchos,
+                header=dict(
+                    values=[f"<b>{c}</b>" for c in cabeceras],
+                    fill_color=COLOR_PRINCIPAL,
+                    font=dict(color="white", family="Quicksand", size=14),
+                    align="center",
+                    height=24
+                ),
+                cells=dict(
+                    values=columnas,
+                    fill_color=COLOR_CELDAS,
+                    align="left",
+                    font=dict(color="black", family="Quicksand", size=13),
+                    height=25
+                )
+            ),
+            row=row, col=col
+        )
+
+    def panel_racha(self, fig, datos: dict, row: int, col: int):
+        import plotly.graph_objects as go
+
+        racha = datos["racha"]
+        fig.add_trace(
+            go.Bar(
+                x=racha["etiquetas"],
+                y=racha["dias"],
+                marker_color=racha["colores"],
+                text=[str(v) for v in racha["dias"]],
+                textposition='auto',
+                showlegend=False
+            ),
+            row=row, col=col
+        )
+        self.actualizar_ejes(
+            fig, row, col,
+            x=dict(tickfont=dict(size=12), automargin=True, range=[-0.75, len(racha["etiquetas"])]),
+            y=dict(range=[0, max(racha["dias"], default=0) + 0.5])
+        )
+
+    def panel_linea(self, fig, linea: dict, row: int, col: int):
+        import plotly.graph_objects as go
+
+        dias = linea["dias"]
+        fig.add_trace(
+            go.Scatter(
+                x=dias, y=linea["puntos"], mode='lines+markers', line_shape='spline',
+                line=dict(color=COLOR_PRINCIPAL), name=linea["nombre"], showlegend=False
+            ),
+            row=row, col=col
+        )
+        maximo = linea["max_eje"]
+        self.actualizar_ejes(
+            fig, row, col,
+            x=dict(
+                title_text="Días de la semana",
+                tickvals=dias,
+                title_font=dict(size=14, family="Quicksand", color="black"),
+                showgrid=False,
+                range=[-1, 8.5]
+            ),
+            y=dict(
+                title_text="Puntos",
+                title_font=dict(size=14, family="Quicksand", color="black"),
+                tickmode="array",
+                tickvals=[int(round(val / 5) * 5) for val in linea["ticks"]],
+                range=[-maximo * 0.1, maximo * 1.1]
+            )
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=dias, y=[linea["promedio"]] * len(dias), mode='lines',
+                line=dict(dash='dash', color=COLOR_PROMEDIO), name="Promedio", showlegend=True
+            ),
+            row=row, col=col
+        )
+        xref, yref = self.ejes(fig, row, col)
+        leyendas = [("  -- Promedio", COLOR_PROMEDIO, 0.85)]
+        if linea["truefriends"] is not None:
+            fig.add_trace(
+                go.Scatter(
+                    x=dias, y=linea["truefriends"], mode='lines', line_shape='spline',
+                    line=dict(dash='dash', color=COLOR_TRUEFRIENDS), name="TrueFriends", showlegend=True
+                ),
+                row=row, col=col
+            )
+            leyendas.append(("  -- TrueFriends", COLOR_TRUEFRIENDS, 0.75))
+        # Etiquetas de las líneas a la derecha del domingo
+        for texto, color, y in leyendas:
+            fig.add_annotation(
+                x=5.2, y=y, text=f"<span style='font-size:14px;'>{texto}</span>",
+                showarrow=False, font=dict(color=color, size=18), align="left",
+                xref=xref, yref=f"{yref} domain", xanchor="left", yanchor="bottom"
+            )
+
+    def panel_serie(self, fig, datos: dict, row: int, col: int):
+        import plotly.graph_objects as go
+
+        serie = datos["serie"]
+        etiquetas = serie["etiquetas"]
+        fig.add_trace(
+            go.Bar(
+                x=etiquetas, y=serie["puntos"], marker_color=COLOR_PRINCIPAL,
+                name="Puntos", showlegend=False
+            ),
+            row=row, col=col
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=etiquetas, y=[serie["promedio"]] * len(etiquetas), mode='lines',
+                line=dict(dash='dash', color=COLOR_PROMEDIO), name="Promedio", showlegend=False
+            ),
+            row=row, col=col
+        )
+        self.actualizar_ejes(
+            fig, row, col,
+            x=dict(
+                title_text=serie["eje_x"], title_font=dict(size=14, family="Quicksand", color="black"),
+                tickfont=dict(size=10), showgrid=False
+            ),
+            y=dict(title_text="Puntos", title_font=dict(size=14, family="Quicksand", color="black"))
+        )
+
+    def panel_dejar(self, fig, datos: dict, row: int, col: int):
+        import plotly.graph_objects as go
+
+        dejar = datos["dejar"]
+        fig.add_trace(
+            go.Pie(
+                labels=["Días Superados", "Días No Superados"],
+                values=[dejar["superados"], dejar["no_superados"]],
+                marker=dict(colors=[COLOR_PRINCIPAL, COLOR_SECUNDARIO]),
+                name="Días Reducción",
+                textinfo='label+percent',
+                rotation=120,
+                pull=[0, 0.1, 0],
+                direction='clockwise',
+                textposition='outside'
+            ),
+            row=row, col=col
+        )
+
+
+# ------------------------------------------------------------------------
+# matplotlib (Agg)
+# ------------------------------------------------------------------------
+
+def texto_plano(texto: str) -> str:
+    # Las etiquetas se escriben para Plotly (HTML): se pasan a texto con saltos de línea
+    for etiqueta in ("<b>", "</b>"):
+        texto = texto.replace(etiqueta, "")
+    return texto.replace("<br>", "\n").replace(" \n", "\n")
+
+
+class RenderMatplotlib(RenderDashboard):
+    """
+    Mismos paneles que RenderPlotly dibujados con matplotlib sobre un canvas Agg propio
+    (sin pyplot ni estado global, así que se puede usar desde varios hilos).
+    Las líneas por día se dibujan rectas en lugar de spline.
+    """
+
+    nombre = "matplotlib"
+    dpi = 100
+
+    def calentar(self):
+        # Carga matplotlib y la cache de fuentes con una figura mínima
+        self.exportar(self.nueva_figura(100), FormatoInforme())
+
+    def nueva_figura(self, alto: int):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        fig = Figure(figsize=(1000 / self.dpi, alto / self.dpi), dpi=self.dpi)
+        FigureCanvasAgg(fig)
+        return fig
+
+    def exportar(self, fig, formato: FormatoInforme) -> bytes:
+        # La escala cambia los dpi (el tamaño en pulgadas es fijo); jpeg y webp se codifican
+        # con Pillow directamente desde el buffer RGBA de Agg, sin pasar por PNG
+        dpi = self.dpi * formato.escala
+        if formato.formato == "png":
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png", dpi=dpi)
+            return buffer.getvalue()
+        from PIL import Image
+
+        fig.set_dpi(dpi)
+        fig.canvas.draw()
+        ancho, alto = fig.canvas.get_width_height()
+        imagen = Image.frombuffer("RGBA", (ancho, alto), fig.canvas.buffer_rgba(), "raw", "RGBA", 0, 1)
+        return codificar(imagen, formato)
+
+    def figura(self, datos: dict):
+        alto = datos["alto"]
+        n_filas = len(datos["filas"])
+        fig = self.nueva_figura(alto)
+        fig.patch.set_facecolor("white")
+        fig.suptitle(datos["titulo"], y=1 - 90 / alto, fontsize=26, fontweight="bold", color=COLOR_PRINCIPAL)
+
+        # vertical_spacing de Plotly es una fracción del alto total; hspace de matplotlib, del alto medio de fila
+        espaciado = datos["espaciado"]
+        rejilla = fig.add_gridspec(
+            n_filas, 2,
+            top=1 - 200 / alto, bottom=80 / alto, left=0.14, right=0.95,
+            hspace=espaciado * n_filas / (1 - espaciado * (n_filas - 1)), wspace=0.45
+        )
+        for r, fila in enumerate(datos["filas"]):
+            for c, celda in enumerate(fila):
+                if celda is None:
+                    continue
+                panel, titulo = celda
+                ax = fig.add_subplot(rejilla[r, :] if len(fila) == 1 else rejilla[r, c])
+                ax.set_title(texto_plano(titulo), fontsize=14, fontweight="bold", pad=14)
+                if panel in PANELES_LINEAS:
+                    self.panel_linea(ax, datos["lineas"][panel])
+                else:
+                    getattr(self, f"panel_{panel}")(ax, datos)
+        return fig
+
+    def panel_gauge(self, ax, datos: dict):
+        from matplotlib.patches import Wedge
+
+        puntos, objetivo = datos["puntos_totales"], datos["puntos_objetivo_totales"]
+        max_gauge = max(1, puntos, objetivo)
+        angulo = 180 - 180 * min(puntos, max_gauge) / max_gauge
+        ax.add_patch(Wedge((0, 0), 1, 0, angulo, width=0.35, color=COLOR_SECUNDARIO))
+        ax.add_patch(Wedge((0, 0), 1, angulo, 180, width=0.35, color=COLOR_PRINCIPAL))
+        ax.text(0, 0.05, f"{puntos:g}", ha="center", va="bottom", fontsize=30, color="black")
+        ax.text(-0.82, -0.12, "0", ha="center", va="top", fontsize=11)
+        ax.text(0.82, -0.12, f"{objetivo}", ha="center", va="top", fontsize=11)
+        ax.set_xlim(-1.1, 1.1)
+        ax.set_ylim(-0.3, 1.1)
+        ax.set_aspect("equal")
+        ax.axis("off")
+
+    def panel_categorias(self, ax, datos: dict):
+        categorias = datos["categorias"]
+        etiquetas = [texto_plano(e) for e in categorias["etiquetas"]]
+        posiciones = range(len(etiquetas))
+        barras = ax.barh(posiciones, categorias["puntos"], color=categorias["colores"])
+        ax.bar_label(barras, labels=[f"{p:g}" for p in categorias["puntos"]], padding=3, fontsize=10)
+        ax.set_yticks(list(posiciones), etiquetas, fontsize=10)
+        ax.set_xlim(0, categorias["max_eje"])
+        ax.set_ylim(-0.5, len(etiquetas) - 0.5 + 0.4)
+        # Línea fija en el mínimo para canjear premios (x=50)
+        if categorias.get("minimo") is not None:
+            ax.axvline(categorias["minimo"], color=COLOR_PROMEDIO, linestyle="--", linewidth=1)
+            ax.text(categorias["minimo"], len(etiquetas) - 0.5, "Mínimo puntos premios", color=COLOR_PROMEDIO,
+                    ha="center", va="bottom", fontsize=9)
+        self.estilo_ejes(ax)
+
+    def panel_hoy(self, ax, datos: dict):
+        hoy = datos["hoy"]
+        filas = [
+            [texto_plano(c), h, f"{p:g}"] for c, h, p in zip(hoy["categorias"], hoy["habitos"], hoy["puntos"])
+        ] or [["-", "-", "0"]]
+        self.tabla(ax, ["Categoría", "Hábito", "Puntos"], filas, [0.5, 0.33, 0.17])
+
+    def panel_habitos(self, ax, datos: dict):
+        habitos = datos["habitos"]
+        filas = [list(fila) for fila in zip(*habitos["columnas"])] or [["-"] * len(habitos["cabeceras"])]
+        self.tabla(ax, habitos["cabeceras"], filas, [0.4, 0.2, 0.16, 0.24])
+
+    @staticmethod
+    def tabla(ax, cabeceras: list, filas: list, anchos: list):
+        tabla = ax.table(
+            cellText=filas, colLabels=cabeceras,
+            colWidths=anchos, cellLoc="left", loc="upper center"
+        )
+        tabla.auto_set_font_size(False)
+        tabla.set_fontsize(10)
+        tabla.scale(1, 1.6)
+        for (fila, _), celda in tabla.get_celld().items():
+            celda.set_edgecolor("white")
+            if fila == 0:
+                celda.set_facecolor(COLOR_PRINCIPAL)
+                celda.set_text_props(color="white", fontweight="bold", ha="center")
+            else:
+                celda.set_facecolor(COLOR_CELDAS)
+        ax.axis("off")
+
+    def panel_racha(self, ax, datos: dict):
+        racha = datos["racha"]
+        etiquetas = [texto_plano(e).replace(" & ", " &\n").replace(" a ", "\na ") for e in racha["etiquetas"]]
+        barras = ax.bar(range(len(etiquetas)), racha["dias"], color=racha["colores"])
+        ax.bar_label(barras, labels=[str(v) for v in racha["dias"]], label_type="center", color="white", fontsize=11)
+        ax.set_xticks(range(len(etiquetas)), etiquetas, fontsize=9)
+        ax.set_xlim(-0.75, max(len(etiquetas), 1) - 0.25)
+        ax.set_ylim(0, max(racha["dias"], default=0) + 0.5)
+        self.estilo_ejes(ax)
+
+    def panel_linea(self, ax, linea: dict):
+        posiciones = range(len(linea["dias"]))
+        ax.plot(posiciones, linea["puntos"], color=COLOR_PRINCIPAL, marker="o", markersize=5)
+        ax.plot(posiciones, [linea["promedio"]] * len(linea["dias"]), color=COLOR_PROMEDIO, linestyle="--")
+        leyendas = [("-- Promedio", COLOR_PROMEDIO, 0.85)]
+        if linea["truefriends"] is not None:
+            ax.plot(posiciones, linea["truefriends"], color=COLOR_TRUEFRIENDS, linestyle="--")
+            leyendas.append(("-- TrueFriends", COLOR_TRUEFRIENDS, 0.75))
+        for texto, color, y in leyendas:
+            ax.text(5.4, y, texto, color=color, fontsize=9, transform=ax.get_xaxis_transform())
+        ax.set_xticks(list(posiciones), linea["dias"])
+        ax.set_xlim(-1, 8.5)
+        maximo = linea["max_eje"]
+        if maximo > 0:
+            ax.set_ylim(-maximo * 0.1, maximo * 1.1)
+            ax.set_yticks(sorted({int(round(val / 5) * 5) for val in linea["ticks"]}))
+        ax.set_xlabel("Días de la semana", fontsize=11)
+        ax.set_ylabel("Puntos", fontsize=11)
+        self.estilo_ejes(ax)
+
+    def panel_serie(self, ax, datos: dict):
+        serie = datos["serie"]
+        posiciones = range(len(serie["etiquetas"]))
+        ax.bar(posiciones, serie["puntos"], color=COLOR_PRINCIPAL)
+        ax.axhline(serie["promedio"], color=COLOR_PROMEDIO, linestyle="--", linewidth=1)
+        # Con muchas semanas se muestra una etiqueta de cada cuatro
+        paso = 1 if len(serie["etiquetas"]) <= 31 else 4
+        ax.set_xticks(list(posiciones)[::paso], serie["etiquetas"][::paso], fontsize=9)
+        ax.set_xlim(-0.75, len(serie["etiquetas"]) - 0.25)
+        ax.set_xlabel(serie["eje_x"], fontsize=11)
+        ax.set_ylabel("Puntos", fontsize=11)
+        self.estilo_ejes(ax)
+
+    def panel_dejar(self, ax, datos: dict):
+        dejar = datos["dejar"]
+        valores = [dejar["superados"], dejar["no_superados"]]
+        total = max(sum(valores), 1)
+        # Etiqueta y porcentaje juntos fuera del sector, como textinfo='label+percent' en Plotly
+        etiquetas = [
+            f"{etiqueta}\n{100 * valor / total:.1f}%" if valor else ""
+            for etiqueta, valor in zip(["Días Superados", "Días No Superados"], valores)
+        ]
+        ax.pie(
+            valores, labels=etiquetas, colors=[COLOR_PRINCIPAL, COLOR_SECUNDARIO],
+            explode=[0, 0.1], labeldistance=1.15, startangle=-30, counterclock=False,
+            textprops={"fontsize": 10, "ha": "center"}
+        )
+        ax.set_aspect("equal")
+
+    @staticmethod
+    def estilo_ejes(ax):
+        # Fondo y rejilla parecidos a la plantilla por defecto de Plotly
+        ax.set_facecolor(COLOR_CELDAS)
+        ax.grid(color="white", linewidth=1)
+        ax.set_axisbelow(True)
+        for borde in ax.spines.values():
+            borde.set_visible(False)
+        ax.tick_params(length=0)
+
+
+RENDERS = {"plotly": RenderPlotly, "matplotlib": RenderMatplotlib}
+_instancias = {}
+
+
+def get_render(nombre: str = None) -> RenderDashboard:
+    """
+    Retorna el motor de renderizado (por defecto INFORME_RENDER; si no se reconoce, plotly).
+    """
+    nombre = (nombre or INFORME_RENDER).lower()
+    clase = RENDERS.get(nombre, RenderPlotly)
+    if clase.nombre not in _instancias:
+        _instancias[clase.nombre] = clase()
+    return _instancias[clase.nombre]
@@ -0,0 +1,195 @@
+from datetime import datetime, timedelta, date
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from BBDD_create.database import SessionLocal, Habito, Accion, ResumenSemanal
+from BBDD_create.funciones_puntos_sql import get_points_weekly_sql
+
+# ------------------------------------------------------------------------
+# Resúmenes semanales congelados (tabla resumenes_semanales)
+#
+# Cuando una semana termina se guarda una fila por usuario con sus puntos, puntos máximos,
+# días cumplidos por categoría y totales por hábito. La serie histórica de puntos se lee
+# de esta tabla con una sola consulta por clave primaria y solo la semana actual se calcula en vivo.
+# Los puntos salen del libro de puntos (puntos_registro), así que la suma de las semanas congeladas
+# coincide con la del libro; el máximo es el del informe (70 por hábito diario y 50 por semanal).
+# ------------------------------------------------------------------------
+
+# Puntos de la semana en el libro de puntos (los semanales están en el lunes de su semana)
+QUERY_RESUMEN_PUNTOS = """
+    SELECT coalesce(sum(puntos), 0)
+    FROM puntos_registro
+    WHERE user_id = :user_id
+      AND fecha >= :semana
+      AND fecha < CAST(:semana AS date) + 7
+"""
+
+# Máximo del informe: 7 días x 10 puntos por hábito diario y 50 por hábito semanal
+QUERY_RESUMEN_MAXIMO = """
+    SELECT
+        70 * count(*) FILTER (WHERE lower(coalesce(frecuencia_objetivo, '')) = 'diaria')
+        + 50 * count(*) FILTER (WHERE lower(coalesce(frecuencia_objetivo, '')) = 'semanal')
+    FROM habitos
+    WHERE user_id = :user_id
+"""
+
+# Días (distintos) con algún hábito diario de la categoría cumplido según el libro de puntos
+QUERY_RESUMEN_DIAS = """
+    SELECT lower(coalesce(h.categoria, '')) AS categoria, count(DISTINCT p.fecha) AS dias
+    FROM puntos_registro p
+    JOIN habitos h
+      ON h.user_id = p.user_id AND lower(coalesce(h.habito, '')) = p.habito
+    WHERE p.user_id = :user_id
+      AND p.fecha >= :semana
+      AND p.fecha < CAST(:semana AS date) + 7
+      AND lower(coalesce(h.frecuencia_objetivo, '')) = 'diaria'
+      AND p.puntos >= 10
+    GROUP BY 1
+"""
+
+# Cantidad registrada de cada hábito en la semana (de lunes a domingo, ambos incluidos)
+QUERY_RESUMEN_TOTALES = """
+    SELECT lower(coalesce(habito, '')) AS habito, coalesce(sum(cantidad), 0) AS total
+    FROM acciones
+    WHERE user_id = :user_id
+      AND fecha_realizacion >= :semana
+      AND fecha_realizacion < CAST(:semana AS date) + 7
+    GROUP BY 1
+"""
+
+
+def lunes_de(fecha) -> date:
+    """
+    Retorna el lunes de la semana que contiene fecha.
+    """
+    fecha = fecha.date() if isinstance(fecha, datetime) else fecha
+    return fecha - timedelta(days=fecha.weekday())
+
+
+def calcular_resumen_semana(db: Session, user_id: int, semana: date) -> dict:
+    """
+    Calcula el resumen de la semana que empieza en 'semana' (lunes) a partir del libro de puntos,
+    con el máximo del informe y contando solo los hábitos diarios en los días cumplidos.
+    """
+    params = {"user_id": user_id, "semana": semana}
+    puntos = db.execute(text(QUERY_RESUMEN_PUNTOS), params).scalar()
+    puntos_max = db.execute(text(QUERY_RESUMEN_MAXIMO), params).scalar()
+    return {
+        "puntos": round(float(puntos or 0), 1),
+        "puntos_max": float(puntos_max or 0),
+        "dias_cumplidos": {
+            categoria: int(n) for categoria, n in db.execute(text(QUERY_RESUMEN_DIAS), params).fetchall()
+        },
+        "totales_habito": {
+            habito: round(float(total), 2)
+            for habito, total in db.execute(text(QUERY_RESUMEN_TOTALES), params).fetchall()
+        },
+    }
+
+
+def semanas_pendientes(db: Session, user_id: int, lunes_actual: date) -> list:
+    """
+    Semanas cerradas (anteriores a lunes_actual) que aún no están congeladas para el usuario.
+    Se empieza tras la última semana guardada o, si no hay ninguna, en la semana de su primera acción.
+    """
+    ultima = db.query(func.max(ResumenSemanal.semana)).filter(ResumenSemanal.user_id == user_id).scalar()
+    if ultima is not None:
+        inicio = ultima + timedelta(days=7)
+    else:
+        primera = (
+            db.query(func.min(func.date(Accion.fecha_realizacion)))
+            .filter(Accion.user_id == user_id)
+            .scalar()
+        )
+        if primera is None:
+            return []
+        inicio = lunes_de(primera)
+    semanas = []
+    while inicio < lunes_actual:
+        semanas.append(inicio)
+        inicio += timedelta(days=7)
+    return semanas
+
+
+def cerrar_semanas(db: Session, user_id: int, lunes_actual: date = None) -> int:
+    """
+    Congela las semanas pendientes de un usuario. Retorna cuántas se han guardado.
+    """
+    lunes_actual = lunes_actual or lunes_de(datetime.now())
+    semanas = semanas_pendientes(db, user_id, lunes_actual)
+    for semana in semanas:
+        db.merge(ResumenSemanal(user_id=user_id, semana=semana, cerrado=datetime.utcnow(),
+                                **calcular_resumen_semana(db, user_id, semana)))
+    db.commit()
+    return len(semanas)
+
+
+def recongelar_semanas(db: Session, user_id: int, fecha=None) -> int:
+    """
+    Vuelve a calcular las semanas ya congeladas de un usuario tras reescribir acciones u objetivos
+    pasados: solo la semana de fecha o, sin fecha, todas. Las semanas aún no congeladas las guarda
+    cerrar_semanas. Retorna cuántas se han recalculado.
+    Un fallo aquí no deshace la operación principal: se informa y se sigue.
+    """
+    if fecha is not None and lunes_de(fecha) >= lunes_de(datetime.now()):
+        # La semana en curso se calcula en vivo
+        return 0
+    try:
+        consulta = db.query(ResumenSemanal.semana).filter(ResumenSemanal.user_id == user_id)
+        if fecha is not None:
+            consulta = consulta.filter(ResumenSemanal.semana == lunes_de(fecha))
+        semanas = [semana for (semana,) in consulta.all()]
+        for semana in semanas:
+            db.merge(ResumenSemanal(user_id=user_id, semana=semana, cerrado=datetime.utcnow(),
+                                    **calcular_resumen_semana(db, user_id, semana)))
+        db.commit()
+        return len(semanas)
+    except Exception as e:
+        db.rollback()
+        print(f"Error al recalcular los resúmenes semanales del usuario {user_id}: {e}")
+        return 0
+
+
+def cerrar_semanas_pendientes() -> int:
+    """
+    Tarea programada: congela las semanas terminadas de todos los usuarios con hábitos.
+    Si el bot estuvo parado, se recuperan todas las semanas que falten.
+    """
+    total = 0
+    with SessionLocal() as db:
+        user_ids = [fila[0] for fila in db.query(Habito.user_id).distinct()]
+        for user_id in user_ids:
+            try:
+                total += cerrar_semanas(db, user_id)
+            except Exception as e:
+                db.rollback()
+                print(f"Error al cerrar las semanas del usuario {user_id}: {e}")
+    print(f"Resúmenes semanales: {total} semanas congeladas para {len(user_ids)} usuarios")
+    return total
+
+
+def get_serie_puntos(db: Session, user_id: int, n_semanas: int = 12, incluir_actual: bool = True) -> list:
+    """
+    Retorna la serie de puntos de las últimas n_semanas cerradas (una lectura por clave primaria),
+    en orden cronológico y, si incluir_actual=True, con la semana en curso calculada en vivo al final.
+    Cada elemento es un dict con semana, puntos, puntos_max y cerrada.
+    """
+    filas = (
+        db.query(ResumenSemanal.semana, ResumenSemanal.puntos, ResumenSemanal.puntos_max)
+        .filter(ResumenSemanal.user_id == user_id)
+        .order_by(ResumenSemanal.semana.desc())
+        .limit(n_semanas)
+        .all()
+    )
+    serie = [
+        {"semana": semana, "puntos": puntos, "puntos_max": puntos_max, "cerrada": True}
+        for semana, puntos, puntos_max in reversed(filas)
+    ]
+    if incluir_actual:
+        serie.append({
+            "semana": lunes_de(datetime.now()),
+            "puntos": get_points_weekly_sql(db, user_id),
+            "puntos_max": None,
+            "cerrada": False,
+        })
+    return serie
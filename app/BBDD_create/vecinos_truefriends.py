@@ -0,0 +1,261 @@
+import re
+import threading
+import time
+import unicodedata
+import zlib
+
+import numpy as np
+from sqlalchemy import text
+
+from BBDD_create.database import SessionLocal
+from config import TRUEFRIENDS_VECINOS
+
+# ------------------------------------------------------------------------
+# Índice de vecinos de TrueFriends (TRUEFRIENDS_MODO=vecinos)
+#
+# Cada usuario se representa con un vector de sus hábitos, normalizado a norma 1:
+#   - número de hábitos por categoría y por (categoría, frecuencia),
+#   - magnitud de los objetivos por categoría (media de log(1 + cantidad_objetivo)),
+#   - nombres de los hábitos (sin tildes ni números) repartidos en HASH_HABITOS posiciones,
+# con un peso por bloque. La similitud entre dos usuarios es el producto escalar (coseno).
+#   - La lista de los k vecinos de todos los usuarios se calcula por bloques de filas
+#     (producto de matrices y argpartition) al reconstruir el índice cada noche.
+#   - modify_habitos recalcula el vector y los vecinos del usuario que cambia (un producto
+#     matriz-vector) y su media en la cache de TrueFriends; las listas del resto se ponen al día
+#     en la reconstrucción nocturna.
+#   - La cache de TrueFriends precalcula en cada refresco la media de los vectores por día de
+#     la semana de los vecinos de cada usuario (agregados_vecinos) y la guarda en disco: los
+#     workers del pool de informes la leen de ahí y no construyen el índice.
+# ------------------------------------------------------------------------
+
+CATEGORIAS = ("alimentacion", "caminar", "deporte", "estilo-vida", "tiempo", "dejar")
+FRECUENCIAS = ("diaria", "semanal")
+HASH_HABITOS = 32
+# Peso de cada bloque del vector (categorías, categoría x frecuencia, magnitud, nombres)
+PESOS = (1.0, 0.7, 0.5, 0.8)
+BLOQUE_FILAS = 1024
+
+QUERY_HABITOS_VECINOS = """
+    SELECT
+        user_id,
+        lower(coalesce(habito, '')) AS habito,
+        lower(coalesce(categoria, '')) AS categoria,
+        lower(coalesce(frecuencia_objetivo, '')) AS frecuencia,
+        coalesce(cantidad_objetivo, 0) AS objetivo
+    FROM habitos
+    WHERE (CAST(:user_id AS bigint) IS NULL OR user_id = :user_id)
+"""
+
+
+def _posicion_habito(habito: str) -> int:
+    # 'Correr 2', 'córrer' y 'correr' caen en la misma posición
+    habito = unicodedata.normalize("NFKD", habito).encode("ascii", "ignore").decode()
+    habito = re.sub(r"[^a-z]+", " ", habito).strip()
+    return zlib.crc32(habito.encode("utf-8")) % HASH_HABITOS
+
+
+def vectorizar(filas: list) -> tuple:
+    """
+    Retorna (user_ids, matriz) con un vector de norma 1 por usuario a partir de las filas
+    (user_id, habito, categoria, frecuencia, objetivo) de sus hábitos.
+    """
+    if not filas:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32)
+    user_ids, fila_usuario = np.unique(np.array([f[0] for f in filas], dtype=np.int64), return_inverse=True)
+    n, n_cat, n_frec = len(user_ids), len(CATEGORIAS), len(FRECUENCIAS)
+    indice_cat = {c: i for i, c in enumerate(CATEGORIAS)}
+    indice_frec = {f: i for i, f in enumerate(FRECUENCIAS)}
+    categoria = np.array([indice_cat.get(f[2], -1) for f in filas])
+    frecuencia = np.array([indice_frec.get(f[3], -1) for f in filas])
+    magnitud = np.log1p(np.abs(np.array([float(f[4]) for f in filas])))
+    nombre = np.array([_posicion_habito(f[1]) for f in filas])
+
+    con_categoria = categoria >= 0
+    categorias = np.zeros((n, n_cat))
+    np.add.at(categorias, (fila_usuario[con_categoria], categoria[con_categoria]), 1.0)
+    con_frecuencia = con_categoria & (frecuencia >= 0)
+    cruce = np.zeros((n, n_cat * n_frec))
+    np.add.at(cruce, (fila_usuario[con_frecuencia], categoria[con_frecuencia] * n_frec + frecuencia[con_frecuencia]), 1.0)
+    magnitudes = np.zeros((n, n_cat))
+    np.add.at(magnitudes, (fila_usuario[con_categoria], categoria[con_categoria]), magnitud[con_categoria])
+    magnitudes = np.divide(magnitudes, categorias, out=np.zeros_like(magnitudes), where=categorias > 0)
+    nombres = np.zeros((n, HASH_HABITOS))
+    np.add.at(nombres, (fila_usuario, nombre), 1.0)
+
+    bloques = []
+    for bloque, peso in zip((categorias, cruce, magnitudes, nombres), PESOS):
+        norma = np.linalg.norm(bloque, axis=1, keepdims=True)
+        bloques.append(peso * np.divide(bloque, norma, out=np.zeros_like(bloque), where=norma > 0))
+    matriz = np.hstack(bloques)
+    norma = np.linalg.norm(matriz, axis=1, keepdims=True)
+    matriz = np.divide(matriz, norma, out=np.zeros_like(matriz), where=norma > 0)
+    return user_ids, matriz.astype(np.float32)
+
+
+def _k_mejores(similitudes: np.ndarray, k: int) -> np.ndarray:
+    # Índices de las k columnas con más similitud de cada fila, de mayor a menor
+    k = min(k, similitudes.shape[1])
+    if k <= 0:
+        return np.zeros((similitudes.shape[0], 0), dtype=np.int64)
+    mejores = np.argpartition(-similitudes, k - 1, axis=1)[:, :k]
+    orden = np.argsort(-np.take_along_axis(similitudes, mejores, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(mejores, orden, axis=1)
+
+
+class IndiceVecinos:
+    """
+    Vectores de hábitos de todos los usuarios y la lista de sus k vecinos más parecidos.
+    """
+
+    def __init__(self, k: int = 25):
+        self.k = k
+        self.user_ids = np.zeros(0, dtype=np.int64)
+        self.matriz = np.zeros((0, 0), dtype=np.float32)
+        self.posiciones = {}
+        # vecinos[i] -> posiciones de los vecinos del usuario i (y sus similitudes)
+        self.vecinos = np.zeros((0, 0), dtype=np.int64)
+        self.similitudes = np.zeros((0, 0), dtype=np.float32)
+        self.construido = None
+        self.lock = threading.Lock()
+        self.reconstrucciones = 0
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def reconstruir(self, db=None):
+        """
+        Reconstruye los vectores de todos los usuarios con hábitos y sus listas de vecinos.
+        """
+        if db is None:
+            with SessionLocal() as db:
+                return self.reconstruir(db)
+        self.construir(db.execute(text(QUERY_HABITOS_VECINOS), {"user_id": None}).fetchall())
+
+    def construir(self, filas: list):
+        """
+        Construye el índice desde las filas (user_id, habito, categoria, frecuencia, objetivo) de todos los hábitos.
+        """
+        user_ids, matriz = vectorizar(filas)
+        n = len(user_ids)
+        vecinos = np.zeros((n, min(self.k, max(n - 1, 0))), dtype=np.int64)
+        similitudes = np.zeros(vecinos.shape, dtype=np.float32)
+        for inicio in range(0, n, BLOQUE_FILAS):
+            bloque = matriz[inicio:inicio + BLOQUE_FILAS] @ matriz.T
+            # Un usuario no es vecino de sí mismo
+            propias = np.arange(len(bloque))
+            bloque[propias, inicio + propias] = -np.inf
+            mejores = _k_mejores(bloque, vecinos.shape[1])
+            vecinos[inicio:inicio + len(bloque)] = mejores
+            similitudes[inicio:inicio + len(bloque)] = np.take_along_axis(bloque, mejores, axis=1)
+
+        with self.lock:
+            self.user_ids, self.matriz = user_ids, matriz
+            self.posiciones = {int(u): i for i, u in enumerate(user_ids)}
+            self.vecinos, self.similitudes = vecinos, similitudes
+            self.construido = time.time()
+            self.reconstrucciones += 1
+
+    def actualizar_usuario(self, db, user_id: int):
+        """
+        Recalcula el vector y los vecinos de un usuario tras cambiar sus hábitos.
+        Si el índice aún no se ha construido no hace nada: se construirá completo.
+        """
+        if self.construido is None:
+            return
+        self.actualizar_filas(user_id, db.execute(text(QUERY_HABITOS_VECINOS), {"user_id": user_id}).fetchall())
+
+    def actualizar_filas(self, user_id: int, filas: list):
+        """
+        Sustituye el vector del usuario por el de sus hábitos (filas como en construir) y recalcula sus vecinos.
+        """
+        _, fila = vectorizar(filas)
+        with self.lock:
+            i = self.posiciones.get(user_id)
+            if len(fila) == 0:
+                # Sin hábitos: se queda sin vecinos (la fila se elimina en la siguiente reconstrucción)
+                if i is not None:
+                    self.matriz[i] = 0.0
+                    self.similitudes[i] = 0.0
+                return
+            if i is None:
+                i = len(self.user_ids)
+                self.user_ids = np.append(self.user_ids, user_id)
+                self.matriz = np.vstack([self.matriz.reshape(-1, fila.shape[1]), fila])
+                self.vecinos = np.vstack([self.vecinos, np.zeros((1, self.vecinos.shape[1]), dtype=np.int64)])
+                self.similitudes = np.vstack([self.similitudes, np.zeros((1, self.vecinos.shape[1]), dtype=np.float32)])
+                self.posiciones[user_id] = i
+            self.matriz[i] = fila[0]
+            similitud = self.matriz @ fila[0]
+            similitud[i] = -np.inf
+            mejores = _k_mejores(similitud[None, :], self.vecinos.shape[1])[0]
+            self.vecinos[i, :len(mejores)] = mejores
+            self.similitudes[i, :len(mejores)] = similitud[mejores]
+
+    def consultar(self, user_id: int, k: int = None) -> list:
+        """
+        Retorna [(user_id, similitud)] de los k vecinos más parecidos del usuario (de más a menos),
+        o [] si no está en el índice.
+        """
+        with self.lock:
+            i = self.posiciones.get(user_id)
+            if i is None:
+                return []
+            k = self.vecinos.shape[1] if k is None else min(k, self.vecinos.shape[1])
+            return [
+                (int(self.user_ids[j]), float(s))
+                for j, s in zip(self.vecinos[i, :k], self.similitudes[i, :k])
+            ]
+
+
+def agregados_vecinos(indice: IndiceVecinos, por_usuario: dict) -> dict:
+    """
+    Media de los vectores por día de la semana de los vecinos de cada usuario del índice.
+    por_usuario es {str(user_id): {categoria: vector de 7 días}} (los usuarios sin registros
+    cuentan como ceros). Retorna {str(user_id): {categoria: vector de 7 días}} con las categorías
+    en las que algún vecino tiene puntos.
+    """
+    with indice.lock:
+        user_ids, vecinos = indice.user_ids, indice.vecinos
+    if len(user_ids) == 0 or vecinos.shape[1] == 0:
+        return {}
+    categorias = sorted({c for vectores in por_usuario.values() for c in vectores})
+    posicion_categoria = {c: j for j, c in enumerate(categorias)}
+    semana = np.zeros((len(user_ids), len(categorias), 7))
+    for i, user_id in enumerate(user_ids):
+        for categoria, vector in por_usuario.get(str(user_id), {}).items():
+            semana[i, posicion_categoria[categoria]] = vector
+    # (usuarios, k, categorías, 7) -> media de los k vecinos
+    medias = semana[vecinos].mean(axis=1)
+    con_puntos = medias.any(axis=2)
+    return {
+        str(user_id): {categorias[j]: medias[i, j] for j in np.flatnonzero(con_puntos[i])}
+        for i, user_id in enumerate(user_ids)
+    }
+
+
+def agregado_vecinos_usuario(indice: IndiceVecinos, por_usuario: dict, user_id: int):
+    """
+    Como agregados_vecinos, pero solo para un usuario (tras recalcular sus vecinos en modify_habitos).
+    Retorna {categoria: vector de 7 días}, o None si el usuario no está en el índice.
+    """
+    vecinos = indice.consultar(user_id)
+    if not vecinos:
+        return None
+    suma = {}
+    for vecino, _ in vecinos:
+        for categoria, vector in por_usuario.get(str(vecino), {}).items():
+            suma[categoria] = suma.get(categoria, 0.0) + np.asarray(vector, dtype=float)
+    return {categoria: vector / len(vecinos) for categoria, vector in suma.items() if vector.any()}
+
+
+# Índice compartido por el bot (tareas programadas, modify_habitos y la cache de TrueFriends)
+indice_vecinos = IndiceVecinos(TRUEFRIENDS_VECINOS)
+
+
+def reconstruir_indice_vecinos():
+    """
+    Tarea programada: reconstruye el índice de vecinos (cada noche y al arrancar).
+    """
+    inicio = time.perf_counter()
+    indice_vecinos.reconstruir()
+    print(f"Índice de vecinos de TrueFriends: {len(indice_vecinos)} usuarios en {time.perf_counter() - inicio:.2f} s")
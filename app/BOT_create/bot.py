@@ -1,10 +1,15 @@
 # OK
 
+import asyncio
+
 from config import TELEGRAM_TOKEN
 from BOT_create.start_bot import iniciar_bot
 from BOT_create.registro_bot import datos_registro
 from BOT_create.orquestador_acciones import orquestar_acciones
 from acciones.accion_audio import manejar_audios
+from acciones.tareas_programadas import iniciar_tareas
+from acciones.accion_informe import pool_informes
+from acciones.informe_webapp import iniciar_servidor_informes
 from telegram.ext import (
     ApplicationBuilder
 )
@@ -12,9 +17,18 @@ from telegram.ext import (
 # Se define el nombre de usuario del bot y la URL del GIF
 BOT_USERNAME = 'truehabits_bot'
 
+async def al_arrancar(application):
+    # Se arrancan las tareas programadas y los procesos que renderizan los informes
+    await iniciar_tareas(application)
+    pool_informes.calentar()
+    # En modo WebApp, el servidor que entrega los informes en JSON
+    iniciar_servidor_informes(asyncio.get_running_loop())
+
+
 def main_crear_BOT():
     # Se construye la aplicacion del bot con el token de Telegram
-    application = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
+    # post_init arranca las tareas programadas y el pool de informes dentro del bucle del bot
+    application = ApplicationBuilder().token(TELEGRAM_TOKEN).post_init(al_arrancar).build()
 
     # Se inicia el bot con el handler para /start
     iniciar_bot(application)
@@ -10,6 +10,7 @@ from telegram import (
 from BBDD_create.database import SessionLocal
 from BBDD_create.database import Usuario
 from BBDD_create.funciones_informe import get_points_accumulated_all_time
+from acciones.informe_webapp import modo_webapp, url_informe_webapp
 
 def single_register_button():
     """
@@ -80,6 +81,12 @@ def get_five_button_keyboard(user_id: int):
         url_puntos = "https://truehabit.github.io/Canjear_TH/"
         url_canje_puntos = f"{url_puntos}?usuario={user.nombre}&puntos={puntos_totales}"             
 
+    # En modo WebApp el informe se abre en la WebApp de informes en lugar de enviarse como imagen
+    if modo_webapp():
+        boton_informe = KeyboardButton(text="Generar informe", web_app=WebAppInfo(url=url_informe_webapp(user_id)))
+    else:
+        boton_informe = KeyboardButton(text="Generar informe")
+
     # Se define la estructura de teclado con botones
     kb_five_buttons = [
         [
@@ -95,7 +102,7 @@ def get_five_button_keyboard(user_id: int):
             )
         ],
         [
-            KeyboardButton(text="Generar informe")
+            boton_informe
         ],
         [
             KeyboardButton(
@@ -6,11 +6,11 @@ from telegram.ext import CallbackContext, MessageHandler, filters, CallbackQuery
 from BOT_create.control_teclado import single_register_button, get_five_button_keyboard
 from acciones.recibir_texto_organizar import procesar_mensaje_principal
 from BBDD_create.funciones_consulta import is_user_registered
-from BBDD_create.funciones_informe import generate_dashboard, get_filtered_data, convert_to_dataframe
+from BBDD_create.funciones_informe import get_filtered_data, convert_to_dataframe
 from BBDD_create.database import SessionLocal
 from acciones.accion_add_datos_BBDD import button_callback
+from acciones.accion_informe import enviar_informe
 import traceback
-import os 
 
 async def text_menu_handler(update: Update, context: CallbackContext):
     """
@@ -54,29 +54,13 @@ async def text_menu_handler(update: Update, context: CallbackContext):
         '''
         FUNCION PARA GENERAR EL RESUMEN GENERAL DEL USUARIO
         '''
-        with SessionLocal() as session:
-            user_id = update.message.from_user.id
+        user_id = update.message.from_user.id
 
-            # Llama a la función que genera el dashboard
-            png_path = generate_dashboard(session, user_id)
-            
-            if png_path is None:
-                # No hay datos; informa al usuario
-                await update.message.reply_text(
-                    "📭 No tienes hábitos registrados esta semana. ¡Es un buen momento para comenzar! 🚀"
-                )
-            else: 
-                if os.path.exists(png_path):
-                    # Enviar el PNG al usuario
-                    await update.message.reply_text("📊 Aquí tienes tu informe semanal de hábitos y objetivos. 🚀")
-                    await update.message.reply_photo(photo=open(png_path, 'rb'))                    
-                else:
-                    await update.message.reply_text("No se pudo generar el informe. Revisa si hay datos suficientes.")
-    
-        # O, opcionalmente, puedes volver a mostrar opciones al final
-        await update.message.reply_text(
-            "🤔 ¿Qué quieres hacer ahora? 🎯",
-            reply_markup=get_five_button_keyboard(user_id)
+        # El informe se renderiza en el pool de procesos y se envia desde una tarea aparte,
+        # de modo que el bot sigue atendiendo otros mensajes mientras tanto
+        context.application.create_task(
+            enviar_informe(update, context, user_id, reply_markup=get_five_button_keyboard(user_id)),
+            update=update
         )
         return
                         
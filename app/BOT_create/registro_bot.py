@@ -11,6 +11,7 @@ from BBDD_create.funciones_add import *
 from BBDD_create.database import SessionLocal
 from BBDD_create.funciones_consulta import is_user_registered
 from BOT_create.control_teclado import single_register_button, get_five_button_keyboard
+from acciones.accion_informe import enviar_informe
 
 import openai
 from config import OPENAI_API_KEY
@@ -169,6 +170,15 @@ async def web_app_data(update: Update, context: CallbackContext):
     user_id = update.message.from_user.id
     print("Mensaje de ", user_id)
 
+    # La WebApp de informes pide el informe en imagen si no ha podido cargarlo
+    if data.get("accion") == "informe_png":
+        periodo = data.get("periodo") if data.get("periodo") in ("semana", "mes", "anio") else "semana"
+        context.application.create_task(
+            enviar_informe(update, context, user_id, reply_markup=get_five_button_keyboard(user_id), periodo=periodo),
+            update=update
+        )
+        return
+
     # Se extrae la informacion principal del JSON
     nombre = data.get("nombre", "")
     edad = data.get("edad", "")
@@ -14,6 +14,9 @@ from BBDD_create.database import Habito
 from BBDD_create.funciones_add import add_accion
 from BBDD_create.funciones_consulta import get_user_habits, get_user_obj, check_habit_completion
 from BBDD_create.database import SessionLocal, Accion
+from BBDD_create.registro_puntos import actualizar_puntos
+from BBDD_create.cache_informes import marcar_cambio
+from BBDD_create.resumen_semanal import recongelar_semanas
 
 from acciones.accion_separar_acciones import separar_acciones
 import json
@@ -230,11 +233,18 @@ async def button_callback(update: Update, context: CallbackContext):
         # Se intenta modificar en la base de datos
         with SessionLocal() as session:
             try:
+                # Se guarda el bucket de puntos afectado antes de borrar
+                bucket = session.query(Accion.user_id, Accion.habito, Accion.fecha_realizacion).filter(Accion.id == record_id).first()
                 session.query(Accion).filter(Accion.id == record_id).delete()
                 session.commit()
             except Exception as e:
                 await query.message.reply_text(text=f"Error al modificar: {e}")
                 return
+            # Se actualiza el bucket del libro de puntos de la accion borrada y la version de los datos
+            if bucket:
+                actualizar_puntos(session, *bucket)
+                marcar_cambio(session, bucket[0])
+                recongelar_semanas(session, bucket[0], bucket[2])
 
         # Se edita el mensaje original indicando que ha sido modificado
         await query.edit_message_text(
@@ -247,11 +257,18 @@ async def button_callback(update: Update, context: CallbackContext):
         # Se elimina de la base de datos
         with SessionLocal() as session:
             try:
+                # Se guarda el bucket de puntos afectado antes de borrar
+                bucket = session.query(Accion.user_id, Accion.habito, Accion.fecha_realizacion).filter(Accion.id == record_id).first()
                 session.query(Accion).filter(Accion.id == record_id).delete()
                 session.commit()
             except Exception as e:
                 await query.message.reply_text(text=f"Error al eliminar el registro: {e}")
                 return
+            # Se actualiza el bucket del libro de puntos de la accion borrada y la version de los datos
+            if bucket:
+                actualizar_puntos(session, *bucket)
+                marcar_cambio(session, bucket[0])
+                recongelar_semanas(session, bucket[0], bucket[2])
 
         # Se edita el mensaje original indicando que ha sido eliminado
         await query.edit_message_text(
@@ -6,67 +6,123 @@ from telegram import (
 from telegram.ext import (
     CallbackContext, MessageHandler, filters
 )
-import json
-import os
-import librosa
-import soundfile as sf
+import asyncio
 import speech_recognition as sr
+from concurrent.futures import ThreadPoolExecutor
 from BOT_create.control_teclado import get_five_button_keyboard
 from acciones.recibir_texto_organizar import procesar_mensaje_principal
+from acciones.backends_asr import get_backend_asr
+from acciones.cola_audio import ColaAudio
+from acciones.vad import segmentar_por_silencios
+from acciones.decodificar_audio import decodificar_audio
+from config import (
+    AUDIO_WORKERS, AUDIO_COLA_MAX, AUDIO_CACHE_MAX,
+    AUDIO_MAX_DURACION_S, ASR_TROZO_MAX_S, ASR_TROZOS_PARALELOS
+)
 
 # Se importa openai para posibles llamadas a la API
 import openai
 
+# Frecuencia de muestreo con la que trabajan los motores de transcripcion
+SAMPLE_RATE_ASR = 16000
+
+def cargar_audio(audio_file: str):
+    # Se decodifica el archivo .ogg directamente a audio mono en float32 a 16 kHz (sin librosa)
+    audio = decodificar_audio(audio_file, SAMPLE_RATE_ASR)
+    return audio, SAMPLE_RATE_ASR
+
+# Pool compartido para transcribir en paralelo los trozos de las notas largas
+pool_trozos = ThreadPoolExecutor(max_workers=ASR_TROZOS_PARALELOS, thread_name_prefix="asr-trozo")
+
+def transcribir_trozo(backend, trozo, sr_rate: int) -> str:
+    # Se transcribe un trozo; si solo contiene ruido se devuelve vacio en lugar de fallar
+    try:
+        return backend.transcribir(trozo, sr_rate)
+    except sr.UnknownValueError:
+        return ""
+
+def transcribir_por_trozos(audio, sr_rate: int) -> str:
+    # Se divide el audio en frases por los silencios, se transcriben en paralelo y se unen en orden
+    backend = get_backend_asr()
+    segmentos = segmentar_por_silencios(audio, sr_rate, max_segmento_s=ASR_TROZO_MAX_S)
+    if not segmentos:
+        raise sr.UnknownValueError("No se ha detectado voz en el audio")
+
+    # pool.map conserva el orden de los segmentos
+    textos = pool_trozos.map(
+        lambda seg: transcribir_trozo(backend, audio[seg[0]:seg[1]], sr_rate),
+        segmentos
+    )
+    transcription = " ".join(t.strip() for t in textos if t and t.strip())
+    if not transcription:
+        raise sr.UnknownValueError("No se ha reconocido ningun texto en el audio")
+    return transcription
+
 def transcribe_audio(audio_file: str):
-    # Se transcribe un archivo de audio ogg a texto
-    # Primero se carga el archivo .ogg y se convierte a WAV
+    # Se transcribe un archivo de audio ogg a texto con el motor configurado (ASR_BACKEND)
     try:
-        audio, sr_rate = librosa.load(audio_file, sr=16000)
-        wav_file = "temp.wav"
-        sf.write(wav_file, audio, sr_rate)
-
-        # Se utiliza speech_recognition para transcribir el archivo WAV
-        recognizer = sr.Recognizer()
-        with sr.AudioFile(wav_file) as source:
-            audio_data = recognizer.record(source)
-            transcription = recognizer.recognize_google(audio_data, language="es-ES")
-
-        # Se elimina el archivo WAV temporal
-        os.remove(wav_file)
+        audio, sr_rate = cargar_audio(audio_file)
+
+        # Se comprueba que la nota no supere la duracion maxima permitida
+        duracion = len(audio) / sr_rate
+        if duracion > AUDIO_MAX_DURACION_S:
+            return (
+                f"Error al transcribir el audio: la nota de voz dura {duracion:.0f} segundos "
+                f"y el máximo es {AUDIO_MAX_DURACION_S} segundos"
+            )
+
+        # Las notas cortas se transcriben de una vez y las largas por trozos en paralelo
+        if duracion <= ASR_TROZO_MAX_S:
+            transcription = get_backend_asr().transcribir(audio, sr_rate)
+        else:
+            transcription = transcribir_por_trozos(audio, sr_rate)
+
         # Se devuelve la transcripcion
         return transcription
     except Exception as e:
         return f"Error al transcribir el audio: {e}"
 
+# Cola acotada de transcripciones compartida por todos los mensajes de voz
+cola_audio = ColaAudio(
+    transcribe_audio,
+    workers=AUDIO_WORKERS,
+    max_cola=AUDIO_COLA_MAX,
+    max_cache=AUDIO_CACHE_MAX
+)
+
 async def audio_handler(update: Update, context: CallbackContext):
     # Se gestiona la llegada de un archivo de audio
-    # Primero se comprueba si existe el directorio de audios y se crea si no existe
-    audio_dir = "./Audios"
-    if not os.path.exists(audio_dir):
-        os.makedirs(audio_dir)
+    user_id = update.message.from_user.id
 
-    try:
-        # Se descarga el audio recibido de Telegram
-        audio_file = await update.message.voice.get_file()
-        file_path = f"{audio_dir}/audio_{update.message.message_id}.ogg"
-        await audio_file.download_to_drive(file_path)
+    # Se descartan antes de descargarlas las notas que superan la duracion maxima
+    duracion = update.message.voice.duration or 0
+    if duracion > AUDIO_MAX_DURACION_S:
+        await update.message.reply_text(
+            f"⏱️ La nota de voz dura {duracion} segundos y el máximo es {AUDIO_MAX_DURACION_S}. "
+            f"Divídela en varios audios más cortos, por favor. 🙏"
+        )
+        return
 
-        # Se transcribe el audio descargado
-        transcription = transcribe_audio(file_path)
+    try:
+        # Se obtiene la transcripcion a traves de la cola de audios (o de la cache si ya se conoce)
+        try:
+            transcription = await cola_audio.enviar(update.message.voice)
+        except asyncio.QueueFull:
+            # Si la cola esta llena se contesta de inmediato para que el usuario lo reintente
+            await update.message.reply_text(
+                "⏳ Ahora mismo estoy procesando muchos audios. Inténtalo de nuevo en unos segundos, por favor. 🙏"
+            )
+            return
 
         # Se comprueba si se ha producido algun error durante la transcripcion
         if "Error" in transcription:
             await update.message.reply_text(transcription)
         else:
             # Se informa al usuario de lo que se ha entendido
-            user_id = update.message.from_user.id
             #await update.message.reply_text(f"🔊He entendido lo siguiente:🔊\n {transcription}")
             # Se procesa el texto transcrito para anadirlo a la base de datos
             await procesar_mensaje_principal(transcription, user_id, update, context)
 
-        # Se elimina el archivo de audio original
-        os.remove(file_path)
-
         # Al acabar, se muestran las opciones del teclado
         await update.message.reply_text(
             "🤔 ¿Qué quieres hacer ahora? 🎯",
@@ -83,4 +139,5 @@ async def audio_handler(update: Update, context: CallbackContext):
 
 def manejar_audios(application):
     # Se anade un handler para interceptar los mensajes de audio
-    application.add_handler(MessageHandler(filters.VOICE, audio_handler))
+    # block=False permite que el bot siga atendiendo otros mensajes mientras el audio espera en la cola
+    application.add_handler(MessageHandler(filters.VOICE, audio_handler, block=False))
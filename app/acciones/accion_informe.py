@@ -0,0 +1,325 @@
+# OK
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from telegram import Update
+from telegram.ext import CallbackContext
+
+from config import INFORME_WORKERS, INFORME_COLA_MAX, TRUEFRIENDS_CACHE_RUTA
+from BBDD_create.database import SessionLocal
+from BBDD_create.cache_informes import (
+    semana_iso, get_version, buscar_informe, guardar_informe, estadisticas_cache
+)
+from BBDD_create.informe_periodo import limites_periodo
+
+
+# ------------------------------------------------------------------------
+# Funciones que se ejecutan dentro de los procesos worker
+# ------------------------------------------------------------------------
+
+def inicializar_worker():
+    # Se prepara el motor de renderizado una vez por proceso (con plotly, arrancar kaleido
+    # cuesta ~1 s en el primer informe y los siguientes unas decenas de ms)
+    from BBDD_create.render_dashboard import get_render
+    get_render().calentar()
+
+
+def renderizar_informe(user_id: int, enviado: float, periodo: str = "semana") -> tuple:
+    """
+    Genera el informe de un usuario en el proceso worker: el semanal o, con periodo 'mes' o 'anio',
+    el mensual o anual, en el formato que tenga elegido el usuario (o el global).
+    Retorna (imagen o None, segundos en cola, segundos de renderizado, segundos por etapa).
+    En el dict de etapas se anota tambien el numero de consultas SQL del informe ('consultas').
+    """
+    from BBDD_create.database import SessionLocal, ContadorConsultas
+    from BBDD_create.funciones_informe import generate_dashboard
+    from BBDD_create.informe_periodo import generate_informe_periodo
+    from BBDD_create.formato_informe import get_formato_usuario
+
+    inicio = time.time()
+    tiempos = {}
+    with SessionLocal() as session, ContadorConsultas() as contador:
+        formato = get_formato_usuario(session, user_id)
+        if periodo == "semana":
+            png = generate_dashboard(session, user_id, tiempos, formato=formato)
+        else:
+            png = generate_informe_periodo(session, user_id, periodo, tiempos, formato=formato)
+    tiempos["consultas"] = contador.consultas
+    return png, inicio - enviado, time.time() - inicio, tiempos
+
+
+def renderizar_json_informe(user_id: int, enviado: float, periodo: str = "semana") -> tuple:
+    """
+    Modo WebApp: prepara en el proceso worker la figura de Plotly del informe (disposición compacta)
+    como JSON comprimido con gzip, para que la dibuje el navegador. No se exporta ninguna imagen.
+    Retorna (json gzip o None, segundos en cola, segundos de preparación, segundos por etapa).
+    """
+    import gzip
+    import json
+    from plotly.utils import PlotlyJSONEncoder
+    from BBDD_create.database import SessionLocal, ContadorConsultas
+    from BBDD_create.entrada_informe import cargar_entrada_informe
+    from BBDD_create.funciones_informe import datos_dashboard
+    from BBDD_create.informe_periodo import datos_informe_periodo
+    from BBDD_create.render_dashboard import get_render, compactar
+
+    inicio = time.time()
+    tiempos = {}
+    with SessionLocal() as session, ContadorConsultas() as contador:
+        inicio_datos = time.perf_counter()
+        if periodo == "semana":
+            entrada = cargar_entrada_informe(session, user_id)
+            datos = datos_dashboard(entrada) if entrada is not None else None
+        else:
+            datos = datos_informe_periodo(session, user_id, periodo)
+        tiempos["datos"] = time.perf_counter() - inicio_datos
+    tiempos["consultas"] = contador.consultas
+    if datos is None:
+        return None, inicio - enviado, time.time() - inicio, tiempos
+
+    inicio_figura = time.perf_counter()
+    # El navegador dibuja con plotly.js, sea cual sea INFORME_RENDER
+    fig = get_render("plotly").figura(compactar(datos))
+    tiempos["figura"] = time.perf_counter() - inicio_figura
+    inicio_json = time.perf_counter()
+    contenido = json.dumps({
+        "periodo": periodo,
+        "titulo": datos["titulo"],
+        "puntos": datos.get("puntos_totales"),
+        "puntos_objetivo": datos.get("puntos_objetivo_totales"),
+        "figura": fig.to_plotly_json(),
+    }, cls=PlotlyJSONEncoder, separators=(",", ":"))
+    comprimido = gzip.compress(contenido.encode("utf-8"), compresslevel=6)
+    tiempos["json"] = time.perf_counter() - inicio_json
+    return comprimido, inicio - enviado, time.time() - inicio, tiempos
+
+
+def no_op():
+    return None
+
+
+# ------------------------------------------------------------------------
+# Pool de renderizado (lado del bot)
+# ------------------------------------------------------------------------
+
+class PoolInformes:
+    """
+    Pool acotado de procesos que renderizan los informes fuera del bucle de eventos.
+    - Cada proceso mantiene el motor de renderizado caliente y su propia conexion a la BBDD.
+    - Si ya hay workers + max_cola informes pendientes, generar() lanza asyncio.QueueFull.
+    - Si un usuario pide un informe mientras ese mismo (usuario, periodo, tipo) se esta generando,
+      se reutiliza el mismo trabajo (tipo: imagen o JSON del modo WebApp).
+    - Si un worker muere (p. ej. por falta de memoria) el pool queda roto: se crea uno nuevo y
+      el informe se reintenta una vez.
+    """
+
+    def __init__(self, workers: int, max_cola: int):
+        self.workers = workers
+        self.max_cola = max_cola
+        self.executor = None
+        self.en_curso = {}
+
+    def _arrancar(self):
+        if not TRUEFRIENDS_CACHE_RUTA:
+            logging.warning(
+                "TRUEFRIENDS_CACHE_RUTA está vacío: los workers de informes no ven el refresco del bot "
+                "y cada uno calcula los agregados de TrueFriends de todos los usuarios"
+            )
+        # 'spawn' evita heredar por fork los hilos y conexiones abiertas del proceso del bot
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=inicializar_worker
+        )
+
+    def calentar(self):
+        # Se lanzan tantas tareas vacias como workers para que los procesos arranquen antes del primer informe
+        if self.executor is None:
+            self._arrancar()
+        for _ in range(self.workers):
+            self.executor.submit(no_op)
+
+    async def generar(self, user_id: int, periodo: str = "semana"):
+        """
+        Retorna los bytes de la imagen del informe del usuario (None si no hay datos en el periodo).
+        periodo es 'semana' (informe semanal), 'mes' o 'anio'.
+        """
+        png, _ = await self.generar_con_tiempos(user_id, periodo)
+        return png
+
+    async def generar_con_tiempos(self, user_id: int, periodo: str = "semana") -> tuple:
+        """
+        Como generar(), pero retorna (png, tiempos) con los segundos de cola y de cada etapa
+        (y el numero de consultas SQL).
+        """
+        return await self._ejecutar((user_id, periodo, "imagen"), renderizar_informe, user_id, periodo)
+
+    async def generar_json(self, user_id: int, periodo: str = "semana"):
+        """
+        Modo WebApp: retorna el JSON (gzip) de la figura del informe, o None si no hay datos.
+        """
+        contenido, _ = await self._ejecutar((user_id, periodo, "json"), renderizar_json_informe, user_id, periodo)
+        return contenido
+
+    async def _ejecutar(self, clave: tuple, funcion, user_id: int, periodo: str) -> tuple:
+        if clave in self.en_curso:
+            resultado, espera, render, tiempos = await asyncio.shield(self.en_curso[clave])
+            return resultado, dict(tiempos, cola=espera)
+        if len(self.en_curso) >= self.workers + self.max_cola:
+            raise asyncio.QueueFull()
+        if self.executor is None:
+            self._arrancar()
+
+        futuro = asyncio.ensure_future(self._lanzar(funcion, user_id, periodo))
+        self.en_curso[clave] = futuro
+        try:
+            resultado, espera, render, tiempos = await futuro
+        finally:
+            self.en_curso.pop(clave, None)
+        logging.info(
+            f"Informe ({periodo}, {clave[2]}) de {user_id}: cola {espera * 1000:.0f} ms, "
+            f"renderizado {render * 1000:.0f} ms, {tiempos.get('consultas', 0)} consultas, "
+            f"{len(resultado) if resultado else 0} bytes"
+        )
+        return resultado, dict(tiempos, cola=espera)
+
+    async def _lanzar(self, funcion, user_id: int, periodo: str) -> tuple:
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            return await loop.run_in_executor(executor, funcion, user_id, time.time(), periodo)
+        except BrokenProcessPool:
+            # Solo se rehace el pool una vez aunque fallen a la vez varios informes del pool roto
+            if self.executor is executor:
+                logging.error("El pool de informes se ha roto (ha muerto un worker): se vuelve a crear")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._arrancar()
+            return await loop.run_in_executor(self.executor, funcion, user_id, time.time(), periodo)
+
+    def cerrar(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+# Pool compartido por todos los handlers
+pool_informes = PoolInformes(INFORME_WORKERS, INFORME_COLA_MAX)
+
+
+# Textos de cada tipo de informe: (al enviarlo, sin datos)
+TEXTOS_INFORME = {
+    "semana": (
+        "📊 Aquí tienes tu informe semanal de hábitos y objetivos. 🚀",
+        "📭 No tienes hábitos registrados esta semana. ¡Es un buen momento para comenzar! 🚀",
+    ),
+    "mes": (
+        "📊 Aquí tienes tu informe mensual de hábitos y objetivos. 🚀",
+        "📭 No tienes hábitos registrados este mes. ¡Es un buen momento para comenzar! 🚀",
+    ),
+    "anio": (
+        "📊 Aquí tienes tu informe anual de hábitos y objetivos. 🚀",
+        "📭 No tienes hábitos registrados este año. ¡Es un buen momento para comenzar! 🚀",
+    ),
+}
+
+
+def clave_cache(periodo: str) -> str:
+    """
+    Retorna la clave del informe en informes_cache: la semana ISO y el día para el semanal (el panel
+    de puntos de hoy y las líneas de TrueFriends cambian cada día aunque el usuario no escriba nada) y,
+    para el mensual y el anual, el periodo y el día (sus puntos máximos cambian con cada día transcurrido).
+    """
+    if periodo == "semana":
+        return f"{semana_iso()}@{date.today().isoformat()}"
+    limites = limites_periodo(periodo)
+    return f"{limites['clave']}@{limites['ultimo'].isoformat()}"
+
+
+def leer_informe(user_id: int, semana: str) -> tuple:
+    """
+    Retorna (version de los datos, (file_id, bytes) del informe ya enviado o None,
+    png pre-renderizado o None, True si el informe guardado es el resultado vacio).
+    """
+    with SessionLocal() as session:
+        version = get_version(session, user_id)
+        informe = buscar_informe(session, user_id, semana, version)
+        guardado = (informe.file_id, informe.bytes) if informe is not None and informe.file_id else None
+        # Informe pre-renderizado por la tarea programada pero aun no subido
+        prerenderizado = informe.png if informe is not None and not informe.file_id else None
+        vacio = informe is not None and not informe.file_id and informe.png is None
+    return version, guardado, prerenderizado, vacio
+
+
+def guardar_enviado(user_id: int, semana: str, version: int, n_bytes: int, file_id: str = None):
+    # Sin file_id (n_bytes 0) se guarda el resultado vacio: no hay datos en el periodo
+    with SessionLocal() as session:
+        guardar_informe(session, user_id, semana, version, n_bytes, file_id=file_id)
+
+
+async def enviar_informe(update: Update, context: CallbackContext, user_id: int, reply_markup=None, periodo: str = "semana"):
+    """
+    Envia el informe semanal del usuario (o el mensual/anual con periodo 'mes' o 'anio').
+    Si ya se envio con la misma version de datos en el mismo periodo, se reenvia su file_id de Telegram;
+    si no, se genera en el pool, se envia y se guarda el file_id para la proxima vez.
+    Se lanza como tarea aparte para no bloquear el procesado de otros mensajes, y las consultas
+    a la cache se hacen en hilos para no bloquear el bucle de eventos.
+    """
+    texto_informe, texto_sin_datos = TEXTOS_INFORME[periodo]
+    semana = clave_cache(periodo)
+    version, guardado, prerenderizado, vacio = await asyncio.to_thread(leer_informe, user_id, semana)
+
+    if guardado is not None:
+        file_id, n_bytes = guardado
+        estadisticas_cache.acierto(n_bytes)
+        await update.message.reply_text(texto_informe)
+        await update.message.reply_photo(photo=file_id)
+        if reply_markup is not None:
+            await update.message.reply_text("🤔 ¿Qué quieres hacer ahora? 🎯", reply_markup=reply_markup)
+        return
+
+    if prerenderizado is not None or vacio:
+        # Acierto del pre-renderizado o del resultado vacio guardado: no se renderiza
+        # (la foto pre-renderizada aun hay que subirla)
+        estadisticas_cache.acierto(0)
+    else:
+        estadisticas_cache.fallo()
+    try:
+        if vacio:
+            png = None
+        else:
+            png = prerenderizado if prerenderizado is not None else await pool_informes.generar(user_id, periodo)
+    except asyncio.QueueFull:
+        await update.message.reply_text("⏳ Estoy generando muchos informes ahora mismo. Inténtalo de nuevo en un minuto.")
+        return
+    except Exception as e:
+        logging.error(f"Error al generar el informe de {user_id}: {e}")
+        await update.message.reply_text("No se pudo generar el informe. Revisa si hay datos suficientes.")
+        return
+
+    if png is None:
+        # No hay datos; informa al usuario y se guarda el resultado vacio para no volver a generarlo
+        await update.message.reply_text(texto_sin_datos)
+        if not vacio:
+            try:
+                await asyncio.to_thread(guardar_enviado, user_id, semana, version, 0)
+            except Exception as e:
+                logging.error(f"Error al guardar el informe de {user_id} en cache: {e}")
+    else:
+        # Enviar la imagen al usuario directamente desde memoria
+        await update.message.reply_text(texto_informe)
+        mensaje = await update.message.reply_photo(photo=png)
+        # Se guarda el file_id de la foto subida (la version es la leida antes de generar el informe)
+        try:
+            await asyncio.to_thread(guardar_enviado, user_id, semana, version, len(png), mensaje.photo[-1].file_id)
+        except Exception as e:
+            logging.error(f"Error al guardar el informe de {user_id} en cache: {e}")
+
+    # Se vuelven a mostrar las opciones al final
+    if reply_markup is not None:
+        await update.message.reply_text("🤔 ¿Qué quieres hacer ahora? 🎯", reply_markup=reply_markup)
@@ -0,0 +1,116 @@
+# OK
+
+import json
+import hashlib
+import threading
+import numpy as np
+import speech_recognition as sr
+
+from config import ASR_BACKEND, ASR_IDIOMA, VOSK_MODEL_PATH, ASR_FAKE_TEXTO
+
+
+def audio_a_pcm16(audio: np.ndarray) -> bytes:
+    # Se convierte el audio en coma flotante [-1, 1] a PCM de 16 bits little-endian
+    audio = np.clip(np.asarray(audio, dtype=np.float32), -1.0, 1.0)
+    return (audio * 32767).astype("<i2").tobytes()
+
+
+class BackendASR:
+    """
+    Interfaz comun de los motores de transcripcion.
+    Recibe el audio mono en float32 y su frecuencia de muestreo y devuelve el texto transcrito.
+    """
+
+    nombre = "base"
+
+    def transcribir(self, audio: np.ndarray, sample_rate: int) -> str:
+        raise NotImplementedError
+
+
+class BackendGoogle(BackendASR):
+    """
+    Motor remoto de Google a traves de speech_recognition (comportamiento original del bot).
+    """
+
+    nombre = "google"
+
+    def __init__(self, idioma: str = ASR_IDIOMA):
+        self.idioma = idioma
+        self.recognizer = sr.Recognizer()
+
+    def transcribir(self, audio: np.ndarray, sample_rate: int) -> str:
+        # Se pasa el PCM directamente sin escribir un WAV temporal en disco
+        audio_data = sr.AudioData(audio_a_pcm16(audio), sample_rate, 2)
+        return self.recognizer.recognize_google(audio_data, language=self.idioma)
+
+
+class BackendVosk(BackendASR):
+    """
+    Motor local y sin conexion (Vosk/Kaldi) que se ejecuta en CPU.
+    El modelo se carga una sola vez al crear la instancia y se comparte entre transcripciones.
+    """
+
+    nombre = "vosk"
+
+    def __init__(self, ruta_modelo: str = VOSK_MODEL_PATH):
+        # Se importa aqui para no exigir vosk cuando se usa otro motor
+        from vosk import Model, SetLogLevel
+        SetLogLevel(-1)
+        self.modelo = Model(ruta_modelo)
+
+    def transcribir(self, audio: np.ndarray, sample_rate: int) -> str:
+        from vosk import KaldiRecognizer
+        # Cada transcripcion usa su propio reconocedor sobre el modelo compartido
+        recognizer = KaldiRecognizer(self.modelo, sample_rate)
+        recognizer.AcceptWaveform(audio_a_pcm16(audio))
+        texto = json.loads(recognizer.FinalResult()).get("text", "").strip()
+        if not texto:
+            raise sr.UnknownValueError("No se ha reconocido ningun texto en el audio")
+        return texto
+
+
+class BackendFake(BackendASR):
+    """
+    Motor determinista para pruebas y benchmarks: no llama a ningun servicio.
+    Devuelve ASR_FAKE_TEXTO si esta definido o un texto derivado del contenido del audio.
+    """
+
+    nombre = "fake"
+
+    def __init__(self, texto: str = ASR_FAKE_TEXTO):
+        self.texto = texto
+
+    def transcribir(self, audio: np.ndarray, sample_rate: int) -> str:
+        if self.texto:
+            return self.texto
+        # El mismo audio produce siempre el mismo texto
+        huella = hashlib.sha1(audio_a_pcm16(audio)).hexdigest()[:8]
+        duracion = len(audio) / sample_rate if sample_rate else 0.0
+        return f"audio de {duracion:.1f} segundos {huella}"
+
+
+# Motores disponibles por nombre de configuracion
+BACKENDS_ASR = {
+    "google": BackendGoogle,
+    "vosk": BackendVosk,
+    "fake": BackendFake,
+}
+
+# Instancias ya creadas en este proceso (un modelo por worker)
+_instancias = {}
+_lock_instancias = threading.Lock()
+
+
+def get_backend_asr(nombre: str = None) -> BackendASR:
+    """
+    Devuelve el motor de transcripcion configurado (ASR_BACKEND) o el indicado por nombre.
+    La instancia se crea una vez por proceso y se reutiliza en las siguientes llamadas.
+    """
+    nombre = (nombre or ASR_BACKEND).lower()
+    if nombre not in BACKENDS_ASR:
+        raise ValueError(f"Motor de transcripcion desconocido: {nombre}")
+
+    with _lock_instancias:
+        if nombre not in _instancias:
+            _instancias[nombre] = BACKENDS_ASR[nombre]()
+    return _instancias[nombre]
@@ -0,0 +1,109 @@
+# OK
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ColaAudio:
+    """
+    Cola acotada de trabajos de transcripcion de notas de voz.
+    - Un numero fijo de workers descarga y transcribe los audios.
+    - Si la cola esta llena, enviar() lanza asyncio.QueueFull para contestar rapido al usuario.
+    - Las transcripciones se guardan por file_unique_id de Telegram, de modo que un audio
+      reenviado (o una actualizacion repetida) se responde al instante sin volver a transcribirlo.
+    """
+
+    def __init__(self, transcribir, workers: int, max_cola: int, max_cache: int, audio_dir: str = "./Audios"):
+        # Funcion bloqueante que recibe la ruta del audio y devuelve el texto
+        self.transcribir = transcribir
+        self.workers = workers
+        self.max_cola = max_cola
+        self.max_cache = max_cache
+        self.audio_dir = audio_dir
+
+        # Transcripciones ya realizadas (LRU) y trabajos pendientes por file_unique_id
+        self.cache = OrderedDict()
+        self.en_curso = {}
+
+        # La cola y los workers se crean en el primer uso, dentro del bucle de eventos del bot
+        self.cola = None
+        self.executor = None
+        self.tareas = []
+
+    def _arrancar(self):
+        # Se crean la cola, el pool de hilos para la transcripcion y las tareas worker
+        self.cola = asyncio.Queue(maxsize=self.max_cola)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="asr")
+        self.tareas = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def get_cached(self, file_unique_id: str):
+        # Se devuelve la transcripcion guardada (o None) y se marca como usada recientemente
+        texto = self.cache.get(file_unique_id)
+        if texto is not None:
+            self.cache.move_to_end(file_unique_id)
+        return texto
+
+    def _guardar_cache(self, file_unique_id: str, texto: str):
+        self.cache[file_unique_id] = texto
+        self.cache.move_to_end(file_unique_id)
+        while len(self.cache) > self.max_cache:
+            self.cache.popitem(last=False)
+
+    async def enviar(self, voice) -> str:
+        """
+        Devuelve la transcripcion de la nota de voz, desde la cache si ya se conoce,
+        esperando al trabajo en curso si el mismo audio ya esta en cola, o encolando uno nuevo.
+        Lanza asyncio.QueueFull si no queda hueco en la cola.
+        """
+        if self.cola is None:
+            self._arrancar()
+
+        file_unique_id = voice.file_unique_id
+
+        # Audio ya transcrito
+        texto = self.get_cached(file_unique_id)
+        if texto is not None:
+            return texto
+
+        # Audio ya en cola: se espera al mismo resultado en lugar de repetir el trabajo
+        futuro = self.en_curso.get(file_unique_id)
+        if futuro is None:
+            futuro = asyncio.get_running_loop().create_future()
+            # put_nowait lanza QueueFull antes de registrar el trabajo si no hay hueco
+            self.cola.put_nowait((file_unique_id, voice, futuro))
+            self.en_curso[file_unique_id] = futuro
+
+        return await asyncio.shield(futuro)
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            file_unique_id, voice, futuro = await self.cola.get()
+            file_path = os.path.join(self.audio_dir, f"audio_{file_unique_id}.ogg")
+            try:
+                # Se descarga el audio recibido de Telegram
+                if not os.path.exists(self.audio_dir):
+                    os.makedirs(self.audio_dir)
+                audio_file = await voice.get_file()
+                await audio_file.download_to_drive(file_path)
+
+                # Se transcribe fuera del bucle de eventos para no bloquear el bot
+                texto = await loop.run_in_executor(self.executor, self.transcribir, file_path)
+
+                # Solo se guardan las transcripciones correctas
+                if not texto.startswith("Error"):
+                    self._guardar_cache(file_unique_id, texto)
+                futuro.set_result(texto)
+            except Exception as e:
+                logging.exception(f"Error en el worker de audio ({file_unique_id})")
+                if not futuro.done():
+                    futuro.set_exception(e)
+            finally:
+                # Se elimina el archivo de audio original y se libera el trabajo
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+                self.en_curso.pop(file_unique_id, None)
+                self.cola.task_done()
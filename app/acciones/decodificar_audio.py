@@ -0,0 +1,69 @@
+# OK
+
+import subprocess
+from math import gcd
+
+import numpy as np
+import soundfile as sf
+
+
+def decodificar_ffmpeg(audio_file: str, sample_rate: int) -> np.ndarray:
+    """
+    Decodifica con ffmpeg directamente a PCM mono de 16 bits a la frecuencia pedida.
+    El remuestreo 48 kHz -> 16 kHz lo hace ffmpeg en el mismo paso de decodificacion.
+    """
+    comando = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-i", audio_file,
+        "-f", "s16le", "-ac", "1", "-ar", str(sample_rate),
+        "-"
+    ]
+    salida = subprocess.run(comando, capture_output=True, check=True).stdout
+    return np.frombuffer(salida, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def filtro_paso_bajo(corte: float, n_coef: int = 63) -> np.ndarray:
+    # Filtro FIR de fase lineal (sinc enventanada con Hamming); corte relativo a la frecuencia de muestreo
+    n = np.arange(n_coef) - (n_coef - 1) / 2
+    coef = 2 * corte * np.sinc(2 * corte * n) * np.hamming(n_coef)
+    return (coef / coef.sum()).astype(np.float32)
+
+
+def remuestrear(audio: np.ndarray, sr_origen: int, sr_destino: int) -> np.ndarray:
+    """
+    Remuestreo ligero sin scipy ni librosa.
+    Las notas de voz de Telegram (48 kHz) bajan a 16 kHz con una decimacion entera (filtro + 1 de cada 3).
+    Para relaciones no enteras se usa interpolacion lineal.
+    """
+    if sr_origen == sr_destino:
+        return audio
+    divisor = gcd(sr_origen, sr_destino)
+    factor_subida, factor_bajada = sr_destino // divisor, sr_origen // divisor
+    if factor_subida == 1:
+        filtrado = np.convolve(audio, filtro_paso_bajo(0.5 / factor_bajada), mode="same")
+        return filtrado[::factor_bajada].astype(np.float32)
+    # Caso general: se filtra si se baja de frecuencia y se interpola linealmente
+    if sr_destino < sr_origen:
+        audio = np.convolve(audio, filtro_paso_bajo(0.5 * sr_destino / sr_origen), mode="same")
+    n_destino = int(round(len(audio) * sr_destino / sr_origen))
+    posiciones = np.arange(n_destino) * (sr_origen / sr_destino)
+    return np.interp(posiciones, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def decodificar_soundfile(audio_file: str, sample_rate: int) -> np.ndarray:
+    # Se decodifica con libsndfile (soporta OGG/Opus) y se remuestrea con numpy
+    audio, sr_origen = sf.read(audio_file, dtype="float32", always_2d=True)
+    audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    return remuestrear(audio, sr_origen, sample_rate)
+
+
+def decodificar_audio(audio_file: str, sample_rate: int = 16000) -> np.ndarray:
+    """
+    Decodifica una nota de voz (OGG/Opus de Telegram) a PCM mono float32 a sample_rate.
+    Se usa ffmpeg si esta instalado y, si no, soundfile.
+    """
+    try:
+        return decodificar_ffmpeg(audio_file, sample_rate)
+    except FileNotFoundError:
+        # No hay binario de ffmpeg en el sistema
+        return decodificar_soundfile(audio_file, sample_rate)
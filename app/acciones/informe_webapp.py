@@ -0,0 +1,250 @@
+# OK
+
+import asyncio
+import gzip
+import hashlib
+import hmac
+import logging
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update, WebAppInfo
+
+from config import (
+    TELEGRAM_TOKEN, INFORME_MODO, INFORME_WEBAPP_URL, INFORME_API_URL, INFORME_API_PUERTO,
+    INFORME_API_SECRETO, INFORME_WEBAPP_VALIDEZ_S, INFORME_WEBAPP_CACHE_MAX
+)
+from BBDD_create.database import SessionLocal
+from BBDD_create.cache_informes import get_version
+from acciones.accion_informe import pool_informes, clave_cache, TEXTOS_INFORME
+
+# ------------------------------------------------------------------------
+# Informes en modo WebApp (INFORME_MODO=webapp)
+#
+# En lugar de renderizar una imagen, "Generar informe" abre la WebApp de informes (GitHub Pages)
+# con un enlace firmado (HMAC) para el usuario. La WebApp pide GET /informe a este servidor y
+# dibuja con plotly.js la figura que recibe en JSON (disposición compacta, comprimida con gzip).
+#   - El JSON se prepara en el pool de informes sin exportar imagen (sin kaleido) y se guarda en
+#     memoria por (usuario, periodo) junto con la clave del periodo y la version de sus datos:
+#     mientras no cambien, cada apertura es una consulta de la version y una búsqueda en la cache.
+#   - Con ETag, una WebApp que ya tiene el informe recibe 304 sin cuerpo.
+#   - Sin INFORME_API_URL, o si la WebApp no puede cargar el informe (envía
+#     {"accion": "informe_png"} con sendData), se usa el informe en imagen de siempre.
+# ------------------------------------------------------------------------
+
+PERIODOS = ("semana", "mes", "anio")
+
+
+def modo_webapp() -> bool:
+    return INFORME_MODO == "webapp" and bool(INFORME_API_URL)
+
+
+def _secreto() -> bytes:
+    if INFORME_API_SECRETO:
+        return INFORME_API_SECRETO.encode("utf-8")
+    return hashlib.sha256(f"informe-webapp:{TELEGRAM_TOKEN}".encode("utf-8")).digest()
+
+
+def firmar(user_id: int, periodo: str, expira: int) -> str:
+    mensaje = f"{user_id}:{periodo}:{expira}".encode("utf-8")
+    return hmac.new(_secreto(), mensaje, hashlib.sha256).hexdigest()
+
+
+def verificar(user_id: int, periodo: str, expira: int, firma: str) -> bool:
+    if expira < time.time():
+        return False
+    return hmac.compare_digest(firmar(user_id, periodo, expira), firma)
+
+
+def url_informe_webapp(user_id: int, periodo: str = "semana") -> str:
+    """
+    Retorna la URL de la WebApp con los parámetros firmados para pedir el informe del usuario.
+    """
+    expira = int(time.time()) + INFORME_WEBAPP_VALIDEZ_S
+    parametros = urllib.parse.urlencode({
+        "api": INFORME_API_URL, "u": user_id, "p": periodo, "exp": expira,
+        "firma": firmar(user_id, periodo, expira),
+    })
+    return f"{INFORME_WEBAPP_URL}?{parametros}"
+
+
+class CacheJSON:
+    """
+    JSON (gzip) de los últimos informes servidos (LRU), por (user_id, periodo).
+    Una entrada solo vale para la misma clave de periodo y version de datos.
+    """
+
+    def __init__(self, max_entradas: int):
+        self.max_entradas = max_entradas
+        self.entradas = OrderedDict()
+        self.lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def buscar(self, user_id: int, periodo: str, clave: str, version: int):
+        with self.lock:
+            entrada = self.entradas.get((user_id, periodo))
+            if entrada is None or entrada[:2] != (clave, version):
+                self.fallos += 1
+                return None
+            self.entradas.move_to_end((user_id, periodo))
+            self.aciertos += 1
+            return entrada[2]
+
+    def guardar(self, user_id: int, periodo: str, clave: str, version: int, contenido: bytes):
+        with self.lock:
+            self.entradas[(user_id, periodo)] = (clave, version, contenido)
+            self.entradas.move_to_end((user_id, periodo))
+            while len(self.entradas) > self.max_entradas:
+                self.entradas.popitem(last=False)
+
+
+cache_json = CacheJSON(INFORME_WEBAPP_CACHE_MAX)
+
+
+def leer_version(user_id: int) -> int:
+    with SessionLocal() as session:
+        return get_version(session, user_id)
+
+
+def obtener_json(user_id: int, periodo: str, loop, timeout: float = 60.0) -> tuple:
+    """
+    Retorna (json gzip o None si no hay datos, etag). Se llama desde los hilos del servidor HTTP:
+    en un fallo de cache el JSON se prepara en el pool de informes a través del bucle del bot.
+    Lanza asyncio.QueueFull si el pool está lleno.
+    """
+    clave = clave_cache(periodo)
+    version = leer_version(user_id)
+    etag = f'"{user_id}-{clave}-{version}"'
+    contenido = cache_json.buscar(user_id, periodo, clave, version)
+    if contenido is None:
+        futuro = asyncio.run_coroutine_threadsafe(pool_informes.generar_json(user_id, periodo), loop)
+        contenido = futuro.result(timeout)
+        if contenido is not None:
+            cache_json.guardar(user_id, periodo, clave, version, contenido)
+    return contenido, etag
+
+
+class ManejadorInformes(BaseHTTPRequestHandler):
+    """
+    GET /informe?u=<user_id>&p=<periodo>&exp=<expira>&firma=<hmac>
+      200 JSON (gzip si el cliente lo acepta), 304 si coincide If-None-Match,
+      204 sin datos en el periodo, 400 parámetros inválidos, 403 firma inválida o caducada,
+      503 pool de informes lleno.
+    """
+
+    # Se asigna al arrancar el servidor: bucle de eventos del bot
+    loop = None
+    server_version = "TrueHabitsInformes/1.0"
+
+    def cabeceras_cors(self):
+        # La WebApp se sirve desde GitHub Pages (otro origen)
+        origen = urllib.parse.urlsplit(INFORME_WEBAPP_URL)
+        self.send_header("Access-Control-Allow-Origin", f"{origen.scheme}://{origen.netloc}")
+        self.send_header("Vary", "Origin, Accept-Encoding")
+
+    def responder(self, estado: int, cuerpo: bytes = b"", cabeceras: dict = None):
+        self.send_response(estado)
+        self.cabeceras_cors()
+        for nombre, valor in (cabeceras or {}).items():
+            self.send_header(nombre, valor)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        if cuerpo:
+            self.wfile.write(cuerpo)
+
+    def do_OPTIONS(self):
+        self.responder(204, cabeceras={"Access-Control-Allow-Methods": "GET", "Access-Control-Max-Age": "86400"})
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path.rstrip("/") != "/informe":
+            self.responder(404)
+            return
+        parametros = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            user_id, expira = int(parametros["u"]), int(parametros["exp"])
+            periodo, firma = parametros.get("p", "semana"), parametros["firma"]
+        except (KeyError, ValueError):
+            self.responder(400)
+            return
+        if periodo not in PERIODOS:
+            self.responder(400)
+            return
+        if not verificar(user_id, periodo, expira, firma):
+            self.responder(403)
+            return
+
+        try:
+            contenido, etag = obtener_json(user_id, periodo, self.loop)
+        except asyncio.QueueFull:
+            self.responder(503, cabeceras={"Retry-After": "30"})
+            return
+        except Exception as e:
+            logging.error(f"Informe WebApp de {user_id}: {e}")
+            self.responder(500)
+            return
+
+        if contenido is None:
+            self.responder(204)
+            return
+        cabeceras = {"ETag": etag, "Cache-Control": "private, no-cache", "Content-Type": "application/json"}
+        if self.headers.get("If-None-Match") == etag:
+            self.responder(304, cabeceras=cabeceras)
+            return
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            self.responder(200, contenido, dict(cabeceras, **{"Content-Encoding": "gzip"}))
+        else:
+            self.responder(200, gzip.decompress(contenido), cabeceras)
+
+    def log_message(self, formato, *args):
+        logging.debug(f"Servidor de informes: {formato % args}")
+
+
+def iniciar_servidor_informes(loop, puerto: int = INFORME_API_PUERTO):
+    """
+    Arranca el servidor HTTP de informes en un hilo aparte (solo en modo WebApp).
+    Retorna el servidor o None.
+    """
+    if INFORME_MODO == "webapp" and not INFORME_API_URL:
+        logging.warning("INFORME_MODO=webapp sin INFORME_API_URL: los informes se envían como imagen")
+    if not modo_webapp():
+        return None
+    ManejadorInformes.loop = loop
+    servidor = ThreadingHTTPServer(("0.0.0.0", puerto), ManejadorInformes)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="servidor-informes", daemon=True).start()
+    logging.info(f"Servidor de informes WebApp escuchando en el puerto {puerto}")
+    return servidor
+
+
+async def enviar_enlace_informe(update: Update, user_id: int, periodo: str = "semana"):
+    """
+    Responde con un botón que abre el informe del periodo en la WebApp.
+    """
+    texto_informe, _ = TEXTOS_INFORME[periodo]
+    boton = InlineKeyboardButton(text="📊 Abrir informe", web_app=WebAppInfo(url=url_informe_webapp(user_id, periodo)))
+    await update.message.reply_text(texto_informe, reply_markup=InlineKeyboardMarkup([[boton]]))
+
+
+async def precalentar_json(user_id: int, periodo: str = "semana") -> str:
+    """
+    Prepara y guarda el JSON del informe si no está en la cache (pre-renderizado programado).
+    Retorna 'cache', 'vacio', 'generado' o 'error'.
+    """
+    clave = clave_cache(periodo)
+    version = await asyncio.to_thread(leer_version, user_id)
+    if cache_json.buscar(user_id, periodo, clave, version) is not None:
+        return "cache"
+    try:
+        contenido = await pool_informes.generar_json(user_id, periodo)
+    except Exception as e:
+        logging.error(f"Pre-renderizado: error en el JSON del informe de {user_id}: {e}")
+        return "error"
+    if contenido is None:
+        return "vacio"
+    cache_json.guardar(user_id, periodo, clave, version, contenido)
+    return "generado"
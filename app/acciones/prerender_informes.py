@@ -0,0 +1,134 @@
+# OK
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+from config import INFORME_WORKERS, INFORME_PRERENDER_CPU, INFORME_PRERENDER_ENVIAR
+from BBDD_create.database import SessionLocal, Accion
+from BBDD_create.cache_informes import get_version, buscar_informe, guardar_informe
+from acciones.accion_informe import pool_informes, clave_cache
+from acciones.informe_webapp import modo_webapp, precalentar_json
+
+ETAPAS = ("cola", "datos", "figura", "png", "guardar")
+
+
+def usuarios_activos_semana(db) -> list:
+    """
+    Usuarios con alguna accion registrada en los ultimos 7 dias.
+    """
+    desde = (datetime.now() - timedelta(days=7)).date()
+    return [
+        fila[0] for fila in
+        db.query(Accion.user_id).filter(Accion.fecha_realizacion >= desde).group_by(Accion.user_id).all()
+    ]
+
+
+def leer_activos() -> list:
+    with SessionLocal() as session:
+        return usuarios_activos_semana(session)
+
+
+def buscar_version(user_id: int, semana: str) -> tuple:
+    # Retorna (version de los datos, True si ya hay un informe valido guardado)
+    with SessionLocal() as session:
+        version = get_version(session, user_id)
+        return version, buscar_informe(session, user_id, semana, version) is not None
+
+
+def guardar_prerenderizado(user_id: int, semana: str, version: int, png: bytes, file_id: str = None):
+    with SessionLocal() as session:
+        if png is None:
+            # Sin datos: se guarda el resultado vacio (sin imagen ni file_id) para no repetirlo
+            guardar_informe(session, user_id, semana, version, 0)
+            return
+        # Con file_id no hace falta guardar los bytes: el siguiente "Generar informe" reenvia la foto
+        guardar_informe(session, user_id, semana, version, len(png), file_id=file_id, png=None if file_id else png)
+
+
+async def prerenderizar_usuario(user_id: int, semana: str, limite: asyncio.Semaphore, tiempos: dict, bot=None) -> str:
+    """
+    Genera y guarda el informe de un usuario si no hay uno valido en cache (tambien si sale vacio,
+    para no volver a generarlo mientras el usuario no registre nada).
+    En modo WebApp se prepara el JSON del informe en lugar de la imagen (y no se envia nada).
+    Retorna 'cache', 'vacio', 'generado', 'enviado' o 'error'.
+    Las consultas a la BBDD se hacen en hilos para no bloquear el bucle de eventos del bot.
+    """
+    if modo_webapp():
+        async with limite:
+            return await precalentar_json(user_id)
+
+    version, guardado = await asyncio.to_thread(buscar_version, user_id, semana)
+    if guardado:
+        return "cache"
+
+    async with limite:
+        try:
+            png, tiempos_informe = await pool_informes.generar_con_tiempos(user_id)
+        except Exception as e:
+            logging.error(f"Pre-renderizado: error en el informe de {user_id}: {e}")
+            return "error"
+    for etapa, segundos in tiempos_informe.items():
+        tiempos[etapa] = tiempos.get(etapa, 0.0) + segundos
+    if png is None:
+        await asyncio.to_thread(guardar_prerenderizado, user_id, semana, version, None)
+        return "vacio"
+
+    inicio = time.perf_counter()
+    file_id = None
+    if bot is not None:
+        # Envio proactivo: en chats privados el chat_id coincide con el user_id
+        try:
+            mensaje = await bot.send_photo(
+                chat_id=user_id, photo=png,
+                caption="📊 Tu informe semanal de hábitos y objetivos ya está listo. 🚀"
+            )
+            file_id = mensaje.photo[-1].file_id
+        except Exception as e:
+            logging.warning(f"Pre-renderizado: no se ha podido enviar el informe a {user_id}: {e}")
+    await asyncio.to_thread(guardar_prerenderizado, user_id, semana, version, png, file_id)
+    tiempos["guardar"] = tiempos.get("guardar", 0.0) + time.perf_counter() - inicio
+    return "enviado" if file_id else "generado"
+
+
+async def prerenderizar_informes(bot=None) -> dict:
+    """
+    Tarea programada: pre-renderiza los informes de los usuarios activos en los ultimos 7 dias
+    (con la clave del dia en que se ejecuta).
+    Usa como mucho INFORME_PRERENDER_CPU de los workers del pool, de modo que los informes
+    pedidos en ese momento siguen teniendo procesos libres.
+    Con INFORME_PRERENDER_ENVIAR los informes se envian tambien de forma proactiva.
+    """
+    inicio = time.perf_counter()
+    semana = clave_cache("semana")
+    user_ids = await asyncio.to_thread(leer_activos)
+
+    plazas = max(1, int(INFORME_WORKERS * INFORME_PRERENDER_CPU))
+    limite = asyncio.Semaphore(plazas)
+    tiempos = {}
+    bot = bot if INFORME_PRERENDER_ENVIAR else None
+    resultados = await asyncio.gather(*[
+        prerenderizar_usuario(user_id, semana, limite, tiempos, bot) for user_id in user_ids
+    ])
+
+    total = time.perf_counter() - inicio
+    resumen = {estado: resultados.count(estado) for estado in set(resultados)}
+    renderizados = sum(resumen.get(estado, 0) for estado in ("generado", "enviado", "vacio"))
+    por_minuto = 60 * renderizados / total if total > 0 else 0.0
+    reparto = ", ".join(
+        f"{etapa} {1000 * tiempos[etapa] / max(renderizados, 1):.0f} ms" for etapa in ETAPAS if etapa in tiempos
+    )
+    logging.info(
+        f"Pre-renderizado de informes: {len(user_ids)} usuarios activos, {resumen} en {total:.1f} s "
+        f"({por_minuto:.1f} informes/min con {plazas} workers). Media por informe: {reparto}"
+    )
+    return {"usuarios": len(user_ids), "resultados": resumen, "segundos": total,
+            "informes_min": por_minuto, "tiempos": tiempos}
+
+
+if __name__ == "__main__":
+    # Ejecucion manual (desde el directorio app): python -m acciones.prerender_informes
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    asyncio.run(prerenderizar_informes())
+    pool_informes.cerrar()
@@ -1,6 +1,7 @@
 # OK
 
 import openai
+from datetime import datetime, timedelta
 from telegram import Update
 from telegram.ext import CallbackContext
 
@@ -9,6 +10,13 @@ from sqlalchemy.orm import Session
 from acciones.accion_add_datos_BBDD import procesar_mensaje_insert
 from acciones.accion_preguntas import procesar_resumen
 from BBDD_create.funciones_informe import get_points_accumulated_all_time, get_points_accumulated_weekly
+from BBDD_create.resumen_semanal import get_serie_puntos, lunes_de
+from BBDD_create.database import SessionLocal
+from BBDD_create.ranking import texto_ranking
+from BBDD_create.comparativa_semanal import get_comparativa_semanal, texto_comparativa_semanal
+from BBDD_create.formato_informe import get_formato_usuario, guardar_formato_usuario, interpretar_formato
+from acciones.accion_informe import enviar_informe
+from acciones.informe_webapp import modo_webapp, enviar_enlace_informe
 
 openai.api_key = OPENAI_API_KEY
 
@@ -44,7 +52,12 @@ def clasificar_accion(user_text: str) -> str:
     2) Solicitar un resumen descriptivo de los hábitos que ha registrado, para conocer detalles o estadísticas de sus actividades. (Respuesta: resumen)
     3) Preguntar cuántos puntos ha acumulado en la semana. (Respuesta: puntos_semana)
     4) Preguntar cuántos puntos ha acumulado en total desde que empezó a usar la aplicación. (Respuesta: puntos_totales)
-    5) Si el mensaje no encaja en ninguno de estos casos. (Respuesta: ninguna)
+    5) Pedir el informe (gráfico) del mes. (Respuesta: informe_mes)
+    6) Pedir el informe (gráfico) del año. (Respuesta: informe_anio)
+    7) Preguntar por su posición en el ranking o compararse con otros usuarios. (Respuesta: ranking)
+    8) Cambiar cómo recibe los informes: formato (png, jpg, webp), calidad, tamaño o versión compacta para el móvil. (Respuesta: formato_informe)
+    9) Comparar esta semana con la semana pasada. (Respuesta: comparar_semanas)
+    10) Si el mensaje no encaja en ninguno de estos casos. (Respuesta: ninguna)
 
     **Reglas importantes:**
     - Si el usuario menciona un número (por ejemplo: "caminé 100 pasos", "corrí 5 km", "nadé 30 minutos"), el número debe **mantenerse EXACTAMENTE como lo escribió el usuario**.
@@ -52,11 +65,16 @@ def clasificar_accion(user_text: str) -> str:
     - Si el mensaje describe una acción realizada **sin incluir un número explícito** (por ejemplo, "hoy comí comida basura"), se debe clasificar como **habito** y registrar la acción como 1 vez.
 
     **Instrucciones:**  
-    Responde **EXACTAMENTE** con una de estas 5 palabras (en minúsculas):
+    Responde **EXACTAMENTE** con una de estas 10 palabras (en minúsculas):
     - habito
     - resumen
     - puntos_semana
     - puntos_totales
+    - informe_mes
+    - informe_anio
+    - ranking
+    - formato_informe
+    - comparar_semanas
     - ninguna
 
     **Casos importantes:**
@@ -65,6 +83,11 @@ def clasificar_accion(user_text: str) -> str:
     - Si el mensaje **menciona la palabra “puntos”** y pregunta de forma general o “en total” → clasificación: **puntos_totales**.
     - Si el mensaje **describe una acción realizada con una cantidad (ejemplo: "camine 10000 pasos", "corrí 5 km", "nadé 30 minutos")** → clasificación: **habito**.
     - Si el mensaje **describe una acción realizada sin una cantidad explícita** (ejemplo: "hoy comí comida basura") → clasificación: **habito**.
+    - Si el mensaje **pide un informe, gráfico o balance del mes** → clasificación: **informe_mes**.
+    - Si el mensaje **pide un informe, gráfico o balance del año** → clasificación: **informe_anio**.
+    - Si el mensaje **pregunta en qué puesto va, por el ranking o la clasificación** → clasificación: **ranking**.
+    - Si el mensaje **pide recibir los informes en otro formato, calidad o tamaño, o en versión compacta/para el móvil** → clasificación: **formato_informe**.
+    - Si el mensaje **pide comparar esta semana con la anterior o saber si va mejor o peor que la semana pasada** → clasificación: **comparar_semanas**.
 
     **Ejemplos:**
     1. "¿Cuántas veces he corrido este mes?"  
@@ -105,6 +128,21 @@ def clasificar_accion(user_text: str) -> str:
     
     13. "Hoy comí comida basura"  
     → Es un registro nuevo de un hábito (sin número, se registra como 1 vez) → **habito**.   
+
+    14. "Quiero el informe de este mes"  
+    → Pide el informe del mes → **informe_mes**.
+
+    15. "Enséñame cómo me ha ido este año"  
+    → Pide el informe del año → **informe_anio**.
+
+    16. "¿En qué puesto voy del ranking?"  
+    → Pregunta por su posición frente a otros usuarios → **ranking**.
+
+    17. "Mándame los informes en jpg y en versión para el móvil"  
+    → Cambia el formato de los informes → **formato_informe**.
+
+    18. "¿Voy mejor que la semana pasada?"  
+    → Compara la semana actual con la anterior → **comparar_semanas**.
     
 
     **Si el usuario dice**: 
@@ -123,7 +161,8 @@ def clasificar_accion(user_text: str) -> str:
                 "role": "system",
                 "content": (
                     "Eres un clasificador que solo responde con una palabra: 'habito', 'resumen', "
-                    "'puntos_semana', 'puntos_totales' o 'ninguna'. "
+                    "'puntos_semana', 'puntos_totales', 'informe_mes', 'informe_anio', 'ranking', "
+                    "'formato_informe', 'comparar_semanas' o 'ninguna'. "
                     "Si el usuario NO menciona la palabra 'puntos', pero pregunta qué tanto o cuánto "
                     "ha realizado de una actividad (caminar, correr, etc.), responde 'resumen'. "
                     "Sin explicaciones, solo la palabra exacta."
@@ -136,7 +175,10 @@ def clasificar_accion(user_text: str) -> str:
     # Se obtiene la clasificacion y se limpia
     classification = response.choices[0].message.content.strip().lower()
     # Se valida que sea una de las tres palabras esperadas, en caso contrario se marca como "ninguna"
-    if classification not in ["habito", "resumen", "puntos_semana", "puntos_totales", "ninguna"]:
+    if classification not in [
+        "habito", "resumen", "puntos_semana", "puntos_totales", "informe_mes", "informe_anio", "ranking",
+        "formato_informe", "comparar_semanas", "ninguna"
+    ]:
         classification = "ninguna"
     return classification
 
@@ -159,10 +201,16 @@ async def procesar_mensaje_principal(
     elif accion == "puntos_semana":
         # 1. Calcular puntos de esta semana
         puntos_semana = get_points_accumulated_weekly(user_id)
-        # 2. Responder al usuario
-        await update.message.reply_text(
-            text=f"Esta semana has acumulado {puntos_semana:.1f} puntos. 🏅"
-        )
+        # 2. Se compara con la ultima semana cerrada (resumen congelado)
+        with SessionLocal() as db:
+            serie = get_serie_puntos(db, user_id, n_semanas=1, incluir_actual=False)
+        texto = f"Esta semana has acumulado {puntos_semana:.1f} puntos. 🏅"
+        # La última semana congelada solo es "la semana pasada" si no hay huecos (sin actividad o
+        # antes de que se ejecute el cierre del lunes)
+        if serie and serie[-1]["semana"] == lunes_de(datetime.now()) - timedelta(days=7):
+            texto += f"\nLa semana pasada conseguiste {serie[-1]['puntos']:.1f} de {serie[-1]['puntos_max']:.0f} puntos."
+        # 3. Responder al usuario
+        await update.message.reply_text(text=texto)
 
     elif accion == "puntos_totales":
         # 1. Calcular puntos históricos
@@ -171,12 +219,48 @@ async def procesar_mensaje_principal(
         await update.message.reply_text(
             text=f"Tienes {puntos_totales:.1f} puntos acumulados. 🏆"
         )
+    elif accion in ("informe_mes", "informe_anio") and modo_webapp():
+        # En modo WebApp se responde con el botón que abre el informe
+        await enviar_enlace_informe(update, user_id, periodo=accion.split("_")[1])
+    elif accion in ("informe_mes", "informe_anio"):
+        # El informe mensual/anual se renderiza en el pool de procesos desde una tarea aparte
+        # (el teclado lo vuelve a mostrar text_menu_handler al terminar)
+        context.application.create_task(
+            enviar_informe(update, context, user_id, periodo=accion.split("_")[1]),
+            update=update
+        )
+    elif accion == "ranking":
+        # Posición, percentil y vecinos salen de las clasificaciones en memoria
+        await update.message.reply_text(text=texto_ranking(user_id))
+    elif accion == "formato_informe":
+        # Los campos que se reconocen en el mensaje se guardan; sin ninguno se muestra el formato actual
+        cambios = interpretar_formato(user_text)
+        with SessionLocal() as db:
+            if cambios:
+                formato = guardar_formato_usuario(db, user_id, cambios)
+                texto = f"✅ A partir de ahora recibirás tus informes en {formato.descripcion()}. 🖼️"
+            else:
+                formato = get_formato_usuario(db, user_id)
+                texto = (
+                    f"🖼️ Ahora recibes tus informes en {formato.descripcion()}.\n"
+                    "Puedes pedir, por ejemplo: \"informes en jpg con calidad 70\", \"versión compacta para el móvil\", "
+                    "\"informes al 75%\" o \"formato por defecto\"."
+                )
+        await update.message.reply_text(text=texto)
+    elif accion == "comparar_semanas":
+        # Totales, puntos y diferencias por hábito de las dos semanas salen de una sola consulta
+        with SessionLocal() as db:
+            texto = texto_comparativa_semanal(get_comparativa_semanal(db, user_id))
+        await update.message.reply_text(text=texto)
     # Si no coincide, se informa al usuario
     else:
         await update.message.reply_text(
         "❌ Lo siento, solo se puede:\n\n"
         "1️⃣ Añadir un hábito ➕\n"
-        "2️⃣ Preguntar por tu progreso 📈\n"
-        "3️⃣ Preguntar por tus puntos acumulados 🏆\n\n"
+        "2️⃣ Preguntar por tu progreso o compararlo con la semana pasada 📈\n"
+        "3️⃣ Preguntar por tus puntos acumulados 🏆\n"
+        "4️⃣ Pedir tu informe del mes o del año 📊\n"
+        "5️⃣ Preguntar por tu puesto en el ranking 🏅\n"
+        "6️⃣ Cambiar el formato de tus informes 🖼️\n\n"
         "🙏 Por favor, vuelve a intentarlo."
     )
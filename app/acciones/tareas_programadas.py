@@ -0,0 +1,82 @@
+# OK
+
+from datetime import datetime
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from BBDD_create.resumen_semanal import cerrar_semanas_pendientes
+from BBDD_create.cache_truefriends import cache_truefriends
+from BBDD_create.ranking import inicializar_ranking
+from BBDD_create.vecinos_truefriends import reconstruir_indice_vecinos
+from acciones.prerender_informes import prerenderizar_informes
+from config import TRUEFRIENDS_REFRESCO_S, TRUEFRIENDS_MODO
+
+# Planificador de tareas periodicas del bot (corre en el bucle de eventos de la aplicacion)
+# Las tareas sincronas (consultas a la BBDD) se ejecutan en el pool de hilos del planificador
+scheduler = AsyncIOScheduler()
+
+
+def registrar_tareas(bot=None):
+    # Se congela la semana anterior cada lunes a las 00:05 y una vez al arrancar por si faltan semanas
+    scheduler.add_job(
+        cerrar_semanas_pendientes,
+        CronTrigger(day_of_week="mon", hour=0, minute=5),
+        id="cierre_semanal",
+        replace_existing=True,
+        coalesce=True,
+        misfire_grace_time=3600,
+        next_run_time=datetime.now()
+    )
+    # Se reconstruye el ranking de puntos al cambiar de día (empieza la semana o cambia el relleno de los 'dejar')
+    scheduler.add_job(
+        inicializar_ranking,
+        CronTrigger(hour=0, minute=0),
+        id="ranking_diario",
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+        misfire_grace_time=3600
+    )
+    # En modo vecinos se reconstruye el índice de vecinos de TrueFriends cada noche y al arrancar
+    # (antes del primer refresco de la cache, que precalcula la media de los vecinos)
+    if TRUEFRIENDS_MODO == "vecinos":
+        scheduler.add_job(
+            reconstruir_indice_vecinos,
+            CronTrigger(hour=3, minute=30),
+            id="indice_vecinos",
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1,
+            misfire_grace_time=3600,
+            next_run_time=datetime.now()
+        )
+    # Se refresca la cache de TrueFriends antes de que caduque para que los informes no la calculen
+    scheduler.add_job(
+        cache_truefriends.refrescar,
+        "interval",
+        seconds=max(30, int(TRUEFRIENDS_REFRESCO_S * 0.9)),
+        id="refresco_truefriends",
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+        next_run_time=datetime.now()
+    )
+    # Se pre-renderizan los informes antes del pico de demanda del domingo por la tarde
+    # (el lunes no: el informe es el de la semana nueva, que aún está vacía)
+    scheduler.add_job(
+        prerenderizar_informes,
+        CronTrigger(day_of_week="sun", hour=17, minute=0),
+        kwargs={"bot": bot},
+        id="prerender_domingo",
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+        misfire_grace_time=3600
+    )
+
+
+async def iniciar_tareas(application):
+    # Se llama desde post_init del bot, cuando ya existe el bucle de eventos
+    registrar_tareas(application.bot)
+    if not scheduler.running:
+        scheduler.start()
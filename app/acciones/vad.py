@@ -0,0 +1,87 @@
+# OK
+
+import numpy as np
+
+
+def energia_tramas(audio: np.ndarray, sample_rate: int, trama_ms: int = 30) -> tuple:
+    """
+    Divide el audio en tramas consecutivas y devuelve (energia en dB por trama, muestras por trama).
+    """
+    muestras_trama = max(1, int(sample_rate * trama_ms / 1000))
+    n_tramas = int(np.ceil(len(audio) / muestras_trama))
+    # Se rellena con ceros la ultima trama incompleta para poder vectorizar
+    relleno = n_tramas * muestras_trama - len(audio)
+    tramas = np.pad(np.asarray(audio, dtype=np.float32), (0, relleno)).reshape(n_tramas, muestras_trama)
+    energia = 10.0 * np.log10(np.mean(tramas ** 2, axis=1) + 1e-10)
+    return energia, muestras_trama
+
+
+def segmentar_por_silencios(
+    audio: np.ndarray,
+    sample_rate: int,
+    trama_ms: int = 30,
+    silencio_min_ms: int = 400,
+    margen_db: float = 12.0,
+    energia_min_db: float = -60.0,
+    max_segmento_s: float = 25.0,
+    relleno_ms: int = 150,
+) -> list:
+    """
+    Detector de actividad de voz por energia.
+    - El umbral de voz se fija a margen_db por encima del ruido de fondo (percentil 10 de la energia),
+      sin pasar de margen_db por debajo del maximo (audios casi sin pausas) ni bajar de energia_min_db.
+    - Se corta en el centro de cada silencio de al menos silencio_min_ms.
+    - Los segmentos sin voz se descartan y ningun segmento supera max_segmento_s
+      (si es necesario se corta en la trama de menor energia).
+    Devuelve una lista ordenada de tuplas (inicio, fin) en muestras.
+    """
+    if len(audio) == 0:
+        return []
+
+    energia, muestras_trama = energia_tramas(audio, sample_rate, trama_ms)
+    n_tramas = len(energia)
+
+    # Se marcan las tramas con voz respecto al ruido de fondo estimado
+    umbral = min(np.percentile(energia, 10) + margen_db, energia.max() - margen_db)
+    umbral = max(umbral, energia_min_db)
+    voz = energia > umbral
+    if not voz.any():
+        return []
+
+    # Se localizan los tramos de silencio (inicio y fin de cada racha de tramas sin voz)
+    cambios = np.diff(np.concatenate(([0], (~voz).astype(np.int8), [0])))
+    inicios_silencio = np.flatnonzero(cambios == 1)
+    fines_silencio = np.flatnonzero(cambios == -1)
+    tramas_silencio_min = max(1, int(silencio_min_ms / trama_ms))
+    largos = fines_silencio - inicios_silencio
+    cortes = ((inicios_silencio + fines_silencio) // 2)[largos >= tramas_silencio_min]
+
+    # Se forman los segmentos entre cortes y se descartan los que no contienen voz
+    limites = np.concatenate(([0], cortes, [n_tramas]))
+    max_tramas = max(1, int(max_segmento_s * 1000 / trama_ms))
+    segmentos_tramas = []
+    for inicio, fin in zip(limites[:-1], limites[1:]):
+        if fin <= inicio or not voz[inicio:fin].any():
+            continue
+        # Se recorta el silencio de los extremos del segmento
+        indices_voz = np.flatnonzero(voz[inicio:fin])
+        inicio, fin = inicio + indices_voz[0], inicio + indices_voz[-1] + 1
+        # Se parten los segmentos demasiado largos por la trama de menor energia
+        while fin - inicio > max_tramas:
+            ventana = energia[inicio + max_tramas // 2:inicio + max_tramas]
+            corte = inicio + max_tramas // 2 + int(np.argmin(ventana))
+            segmentos_tramas.append((inicio, corte))
+            inicio = corte
+        segmentos_tramas.append((inicio, fin))
+
+    # Se pasa a muestras anadiendo un pequeno margen sin solapar segmentos vecinos
+    relleno = int(sample_rate * relleno_ms / 1000)
+    segmentos = []
+    for inicio, fin in segmentos_tramas:
+        inicio_muestra = max(0, inicio * muestras_trama - relleno)
+        fin_muestra = min(len(audio), fin * muestras_trama + relleno)
+        if segmentos and inicio_muestra < segmentos[-1][1]:
+            inicio_muestra = segmentos[-1][1]
+        if fin_muestra > inicio_muestra:
+            segmentos.append((inicio_muestra, fin_muestra))
+    return segmentos
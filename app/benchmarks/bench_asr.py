@@ -0,0 +1,104 @@
+# Benchmark de los motores de transcripcion (ASR)
+#
+# Uso (desde el directorio app):
+#   python -m benchmarks.bench_asr --corpus /data/notas_voz --backends google vosk fake
+#
+# Para cada motor se transcribe todo el corpus de notas de voz en espanol (.ogg/.wav)
+# y se informa del factor de tiempo real (RTF = tiempo de proceso / duracion del audio)
+# y del throughput (notas por segundo y segundos de audio por segundo).
+
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from acciones.accion_audio import cargar_audio
+from acciones.backends_asr import get_backend_asr
+
+
+def cargar_corpus(ruta_corpus: str):
+    # Se decodifican todas las notas antes de medir para que solo cuente el motor ASR
+    rutas = sorted(
+        glob.glob(os.path.join(ruta_corpus, "*.ogg")) + glob.glob(os.path.join(ruta_corpus, "*.wav"))
+    )
+    corpus = []
+    for ruta in rutas:
+        audio, sr_rate = cargar_audio(ruta)
+        corpus.append((os.path.basename(ruta), audio, sr_rate))
+    return corpus
+
+
+def medir_backend(nombre: str, corpus: list, workers: int = 1) -> dict:
+    # Se crea (y se calienta) el motor fuera de la medicion: el modelo se carga una vez por worker
+    t0 = time.perf_counter()
+    backend = get_backend_asr(nombre)
+    carga_s = time.perf_counter() - t0
+
+    def transcribir(item):
+        _, audio, sr_rate = item
+        inicio = time.perf_counter()
+        try:
+            backend.transcribir(audio, sr_rate)
+            ok = True
+        except Exception:
+            ok = False
+        return time.perf_counter() - inicio, len(audio) / sr_rate, ok
+
+    inicio_total = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        resultados = list(pool.map(transcribir, corpus))
+    pared_s = time.perf_counter() - inicio_total
+
+    proceso_s = sum(r[0] for r in resultados)
+    audio_s = sum(r[1] for r in resultados)
+    return {
+        "backend": nombre,
+        "notas": len(resultados),
+        "errores": sum(1 for r in resultados if not r[2]),
+        "carga_modelo_s": round(carga_s, 3),
+        "audio_s": round(audio_s, 2),
+        "proceso_s": round(proceso_s, 3),
+        "rtf": round(proceso_s / audio_s, 4) if audio_s else None,
+        "notas_por_s": round(len(resultados) / pared_s, 3) if pared_s else None,
+        "audio_s_por_s": round(audio_s / pared_s, 3) if pared_s else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de motores de transcripcion")
+    parser.add_argument("--corpus", required=True, help="Directorio con notas de voz en espanol")
+    parser.add_argument("--backends", nargs="+", default=["google", "vosk", "fake"])
+    parser.add_argument("--workers", type=int, default=1, help="Transcripciones concurrentes")
+    parser.add_argument("--json", dest="salida_json", default=None, help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    corpus = cargar_corpus(args.corpus)
+    if not corpus:
+        print(f"No se han encontrado notas de voz en {args.corpus}")
+        return
+
+    resultados = []
+    for nombre in args.backends:
+        try:
+            resultados.append(medir_backend(nombre, corpus, workers=args.workers))
+        except Exception as e:
+            # Un motor no disponible (p. ej. sin modelo local) no impide medir los demas
+            print(f"[{nombre}] no disponible: {e}")
+
+    print(f"{'backend':<10}{'notas':>7}{'errores':>9}{'RTF':>9}{'notas/s':>10}{'audio s/s':>11}")
+    for r in resultados:
+        print(
+            f"{r['backend']:<10}{r['notas']:>7}{r['errores']:>9}"
+            f"{r['rtf'] if r['rtf'] is not None else '-':>9}"
+            f"{r['notas_por_s']:>10}{r['audio_s_por_s']:>11}"
+        )
+
+    if args.salida_json:
+        with open(args.salida_json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Coste de la comparativa de la semana actual con la anterior: consulta con LAG frente a dos pasadas de pandas
+#
+# Uso (desde el directorio app, con DATABASE_URL apuntando a una BBDD Postgres de pruebas):
+#   python -m benchmarks.bench_comparativa_semanal --usuarios 20 --habitos 10 --anios 2
+#
+# Con los usuarios sinteticos de generar_datos se mide, por usuario:
+#   - pandas x2: get_filtered_data + convert_to_dataframe de la semana actual y de la anterior
+#     y totales por hábito de cada una (lo que haría falta sin la consulta nueva),
+#   - sql (LAG): get_comparativa_semanal (totales, puntos y diferencias por hábito y categoría),
+#   - texto: get_comparativa_semanal + texto_comparativa_semanal,
+# y comprueba que los totales por hábito de las dos semanas coinciden con los de pandas.
+
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from BBDD_create.database import SessionLocal
+from BBDD_create.funciones_informe import get_filtered_data, convert_to_dataframe
+from BBDD_create.comparativa_semanal import get_comparativa_semanal, texto_comparativa_semanal
+from benchmarks.generar_datos import generar, borrar_sinteticos
+
+
+def comparativa_pandas(db, user_id: int) -> dict:
+    # Dos pasadas completas del pipeline semanal, una por semana
+    totales = {}
+    for semanas_atras in (0, 1):
+        referencia = datetime.now() - timedelta(days=7 * semanas_atras)
+        df = convert_to_dataframe(get_filtered_data(db, user_id, referencia), referencia)
+        totales[semanas_atras] = df.groupby("habito")["total_acciones"].sum().to_dict() if not df.empty else {}
+    return totales
+
+
+def medir(funcion, user_ids: list, repeticiones: int) -> float:
+    # Mediana (ms) del mejor tiempo de cada usuario
+    mejores = []
+    for user_id in user_ids:
+        mejor = float("inf")
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion(user_id)
+            mejor = min(mejor, time.perf_counter() - inicio)
+        mejores.append(mejor)
+    return 1000 * statistics.median(mejores)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=20)
+    parser.add_argument("--habitos", type=int, default=10)
+    parser.add_argument("--anios", type=float, default=1)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        user_ids = generar(db, args.usuarios, args.habitos, args.anios)
+        try:
+            distintos = 0
+            for user_id in user_ids:
+                totales = comparativa_pandas(db, user_id)
+                for h in get_comparativa_semanal(db, user_id)["habitos"]:
+                    if abs(h["total"] - totales[0].get(h["habito"], 0.0)) > 1e-6:
+                        distintos += 1
+                    if abs(h["total_anterior"] - totales[1].get(h["habito"], 0.0)) > 1e-6:
+                        distintos += 1
+
+            print(f"{'comparativa':<16}{'ms':>9}")
+            for nombre, funcion in (
+                ("pandas x2", lambda u: comparativa_pandas(db, u)),
+                ("sql (LAG)", lambda u: get_comparativa_semanal(db, u)),
+                ("texto", lambda u: texto_comparativa_semanal(get_comparativa_semanal(db, u))),
+            ):
+                print(f"{nombre:<16}{medir(funcion, user_ids, args.repeticiones):>9.2f}")
+            print(f"Totales por hábito distintos de pandas: {distintos}")
+        finally:
+            borrar_sinteticos(db)
+
+
+if __name__ == "__main__":
+    main()
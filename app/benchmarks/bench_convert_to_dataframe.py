@@ -0,0 +1,75 @@
+# Benchmark de convert_to_dataframe
+#
+# Uso (desde el directorio app):
+#   python -m benchmarks.bench_convert_to_dataframe --habitos 8 --dias 90 365 1095
+#
+# Compara la implementacion por columnas de convert_to_dataframe con la implementacion
+# anterior (bucle de diccionarios + iterrows x date_range), comprueba que el resultado es
+# identico y mide el tiempo para usuarios con historiales largos.
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from BBDD_create.funciones_informe import convert_to_dataframe
+from benchmarks.referencia_original import convert_to_dataframe_original
+
+
+# ------------------------------------------------------------------------
+# Datos sinteticos con la forma de get_all_data / get_filtered_data
+# ------------------------------------------------------------------------
+
+CATEGORIAS = ["dejar", "deporte", "caminar", "estilo-vida", "alimentacion", "tiempo"]
+
+
+def generar_filas(n_habitos: int, n_dias: int, prob_accion: float = 0.6, semilla: int = 0) -> list:
+    # Se genera el historial agregado por dia de un usuario: una tupla por (habito, dia con acciones)
+    rng = random.Random(semilla)
+    hoy = datetime.now().date()
+    inicio = hoy - timedelta(days=n_dias)
+    filas = []
+    for h in range(n_habitos):
+        categoria = CATEGORIAS[h % len(CATEGORIAS)]
+        frecuencia = "semanal" if h % 4 == 3 else "diaria"
+        objetivo = float(rng.choice([1, 2, 5, 10]))
+        for d in range(n_dias + 1):
+            if rng.random() < prob_accion:
+                total = float(rng.randint(0, 12))
+                reducir = total if categoria == "dejar" else None
+                filas.append((1, f"Habito {h}", categoria, frecuencia, inicio + timedelta(days=d),
+                              total, objetivo, total, reducir))
+    return filas
+
+
+def medir(funcion, filas, repeticiones: int) -> float:
+    # Se devuelve el mejor tiempo de varias repeticiones
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(filas)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de convert_to_dataframe")
+    parser.add_argument("--habitos", type=int, default=8)
+    parser.add_argument("--dias", type=int, nargs="+", default=[90, 365, 1095])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'dias':>6}{'filas':>8}{'original (s)':>15}{'columnas (s)':>15}{'speedup':>10}")
+    for n_dias in args.dias:
+        filas = generar_filas(args.habitos, n_dias)
+        # El resultado debe ser exactamente el mismo
+        pd.testing.assert_frame_equal(convert_to_dataframe_original(filas), convert_to_dataframe(filas))
+        t_original = medir(convert_to_dataframe_original, filas, args.repeticiones)
+        t_nuevo = medir(convert_to_dataframe, filas, args.repeticiones)
+        print(f"{n_dias:>6}{len(filas):>8}{t_original:>15.4f}{t_nuevo:>15.4f}{t_original / t_nuevo:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Agregados de TrueFriends desde las acciones frente al cubo de categorías
+#
+# Uso (desde el directorio app, con DATABASE_URL apuntando a una BBDD Postgres de pruebas):
+#   python -m benchmarks.bench_cubo_categorias --usuarios 200 --habitos 8 --anios 1
+#
+# Con los usuarios sinteticos de generar_datos se mide:
+#   - acciones: los agregados como antes del cubo (get_all_users_truefriends_data + convert_to_dataframe
+#     de todos los usuarios, solo 'deporte' y 'estilo-vida'),
+#   - cubo: calcular_agregados (celdas de la semana en cubo_categorias y cubo_celdas_usuario, todas las categorías),
+#   - escritura: coste que añade el cubo a cada acción (recalcular las celdas del usuario en ese día),
+# y comprueba que los vectores de 'deporte' y 'estilo-vida' coinciden (de lunes a domingo)
+# y que el cubo coincide con la agregación en vivo tras las escrituras.
+
+import argparse
+import statistics
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from BBDD_create.database import SessionLocal
+from BBDD_create.funciones_informe import get_all_users_truefriends_data, convert_to_dataframe
+from BBDD_create.cache_truefriends import calcular_agregados
+from BBDD_create.cubo_categorias import recalcular_celdas, comprobar_cubo
+from benchmarks.generar_datos import generar, borrar_sinteticos
+
+CATEGORIAS_ANTES = ("deporte", "estilo-vida")
+
+
+def agregados_acciones(db) -> dict:
+    # Cálculo anterior al cubo: todas las acciones de la semana de todos los usuarios por pandas
+    totales = {categoria: np.zeros(7) for categoria in CATEGORIAS_ANTES}
+    df = convert_to_dataframe(get_all_users_truefriends_data(db))
+    if df.empty:
+        return totales
+    df = df[df["categoria"].isin(CATEGORIAS_ANTES)]
+    dia = pd.to_datetime(df["fecha_realizacion"], errors="coerce").dt.weekday
+    for (categoria, d), puntos in df.assign(dia=dia).dropna(subset=["dia"]).groupby(["categoria", "dia"])["puntos"].sum().items():
+        totales[categoria][int(d)] += puntos
+    return totales
+
+
+def medir(funcion, repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return 1000 * statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=200)
+    parser.add_argument("--habitos", type=int, default=8)
+    parser.add_argument("--anios", type=float, default=1)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        user_ids = generar(db, args.usuarios, args.habitos, args.anios)
+        try:
+            antes = agregados_acciones(db)
+            ahora = calcular_agregados(db)
+            distintos = sum(
+                not np.allclose(antes[c], ahora["totales"][c], atol=0.05) for c in CATEGORIAS_ANTES
+            )
+            celdas = sum(len(v) for v in ahora["totales"].values())
+
+            hoy = datetime.now().date()
+
+            def escritura():
+                for user_id in user_ids[:20]:
+                    recalcular_celdas(db, user_id, hoy)
+                db.commit()
+
+            print(f"{'agregados TrueFriends':<24}{'ms':>9}")
+            print(f"{'acciones (2 categorías)':<24}{medir(lambda: agregados_acciones(db), args.repeticiones):>9.1f}")
+            print(f"{'cubo (todas)':<24}{medir(lambda: calcular_agregados(db), args.repeticiones):>9.1f}")
+            print(f"{'escritura (por acción)':<24}{medir(escritura, args.repeticiones) / 20:>9.2f}")
+            print(f"Celdas leídas del cubo: {celdas}; vectores distintos: {distintos}; "
+                  f"celdas del cubo distintas de la agregación en vivo: {len(comprobar_cubo(db))}")
+        finally:
+            borrar_sinteticos(db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# Micro-benchmark de la decodificacion de notas de voz
+#
+# Uso (desde el directorio app):
+#   python -m benchmarks.bench_decodificacion --notas /data/notas_voz --repeticiones 5
+#
+# Compara la ruta anterior (librosa.load(..., sr=16000)) con la decodificacion ligera
+# (ffmpeg y soundfile) en latencia por nota y memoria maxima. El coste de importar
+# cada ruta se mide en un proceso nuevo para que no influya la cache de modulos.
+
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from acciones.decodificar_audio import decodificar_ffmpeg, decodificar_soundfile
+
+SAMPLE_RATE = 16000
+
+
+def decodificar_librosa(audio_file: str, sample_rate: int):
+    import librosa
+    audio, _ = librosa.load(audio_file, sr=sample_rate)
+    return audio
+
+
+RUTAS = {
+    "librosa": decodificar_librosa,
+    "ffmpeg": decodificar_ffmpeg,
+    "soundfile": decodificar_soundfile,
+}
+
+# Modulos que carga cada ruta al arrancar el proceso
+IMPORTS = {
+    "librosa": "import librosa",
+    "ffmpeg": "import numpy",
+    "soundfile": "import numpy, soundfile",
+}
+
+
+def medir_import(ruta: str) -> dict:
+    # Se lanza un interprete nuevo que importa la ruta e informa de su tiempo y RSS maximo (kB)
+    # VmHWM se lee de /proc porque ru_maxrss arrastra la memoria del proceso padre antes del exec
+    codigo = (
+        "import time; t = time.perf_counter(); "
+        f"{IMPORTS[ruta]}; "
+        "s = time.perf_counter() - t; "
+        "hwm = [l.split()[1] for l in open('/proc/self/status') if l.startswith('VmHWM')][0]; "
+        "print(s, hwm)"
+    )
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True).stdout
+    segundos, rss_kb = salida.split()
+    return {"import_s": round(float(segundos), 3), "import_rss_mb": round(int(rss_kb) / 1024, 1)}
+
+
+def medir_ruta(ruta: str, notas: list, repeticiones: int) -> dict:
+    decodificar = RUTAS[ruta]
+    # Primera llamada fuera de la medicion (imports y caches de la ruta)
+    decodificar(notas[0], SAMPLE_RATE)
+
+    latencias = []
+    pico_python = 0
+    rss_hijos_antes = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    for _ in range(repeticiones):
+        for nota in notas:
+            tracemalloc.start()
+            inicio = time.perf_counter()
+            decodificar(nota, SAMPLE_RATE)
+            latencias.append(time.perf_counter() - inicio)
+            pico_python = max(pico_python, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+    latencias.sort()
+    resultado = {
+        "ruta": ruta,
+        "decodificaciones": len(latencias),
+        "latencia_media_ms": round(1000 * sum(latencias) / len(latencias), 2),
+        "latencia_p95_ms": round(1000 * latencias[int(0.95 * (len(latencias) - 1))], 2),
+        "pico_memoria_python_mb": round(pico_python / 2 ** 20, 2),
+    }
+    # ffmpeg decodifica en un proceso hijo: se informa tambien de su RSS maximo
+    rss_hijos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if rss_hijos > rss_hijos_antes:
+        resultado["pico_rss_hijo_mb"] = round(rss_hijos / 1024, 1)
+    resultado.update(medir_import(ruta))
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de decodificacion de notas de voz")
+    parser.add_argument("--notas", required=True, help="Directorio con notas de voz .ogg")
+    parser.add_argument("--rutas", nargs="+", default=["librosa", "ffmpeg", "soundfile"])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--json", dest="salida_json", default=None)
+    args = parser.parse_args()
+
+    notas = sorted(glob.glob(os.path.join(args.notas, "*.ogg")))
+    if not notas:
+        print(f"No se han encontrado notas .ogg en {args.notas}")
+        return
+
+    resultados = []
+    for ruta in args.rutas:
+        try:
+            resultados.append(medir_ruta(ruta, notas, args.repeticiones))
+        except (ImportError, FileNotFoundError, subprocess.CalledProcessError) as e:
+            # Ruta no disponible en este entorno (p. ej. sin ffmpeg o sin librosa)
+            print(f"[{ruta}] no disponible: {e}")
+
+    for r in resultados:
+        print(json.dumps(r, ensure_ascii=False))
+
+    if args.salida_json:
+        with open(args.salida_json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Consultas y tiempo de lectura de los datos del informe semanal
+#
+# Uso (desde el directorio app, con DATABASE_URL apuntando a una BBDD Postgres de pruebas):
+#   python -m benchmarks.bench_entrada_informe --usuarios 50 --semanas 8
+#
+# Compara, para usuarios sinteticos (los de paridad_puntos_sql):
+#   - las lecturas anteriores (get_filtered_data + get_user_habits + get_user_name)
+#     frente a cargar_entrada_informe (una consulta),
+#   - que convert_to_dataframe da el mismo DataFrame con ambas filas y que los hábitos coinciden,
+#   - las consultas de generate_dashboard completo (con la cache de TrueFriends ya cargada).
+
+import argparse
+import time
+
+import pandas as pd
+
+from BBDD_create.database import SessionLocal, ContadorConsultas
+from BBDD_create.funciones_informe import (
+    get_filtered_data, get_user_habits, get_user_name, convert_to_dataframe, generate_dashboard
+)
+from BBDD_create.entrada_informe import cargar_entrada_informe
+from BBDD_create.cache_truefriends import cache_truefriends
+from benchmarks.paridad_puntos_sql import crear_usuarios, borrar_usuarios
+
+
+def lectura_anterior(db, user_id: int):
+    return get_filtered_data(db, user_id), get_user_habits(db, user_id), get_user_name(db, user_id)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=50)
+    parser.add_argument("--semanas", type=int, default=8)
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        user_ids = crear_usuarios(db, args.usuarios, args.semanas, args.semilla)
+        try:
+            cache_truefriends.refrescar()
+            consultas = {"anterior": 0, "entrada": 0, "informe": 0}
+            segundos = {"anterior": 0.0, "entrada": 0.0}
+            diferencias = 0
+            for user_id in user_ids:
+                inicio = time.perf_counter()
+                with ContadorConsultas() as contador:
+                    filas, habitos, nombre = lectura_anterior(db, user_id)
+                segundos["anterior"] += time.perf_counter() - inicio
+                consultas["anterior"] += contador.consultas
+
+                inicio = time.perf_counter()
+                with ContadorConsultas() as contador:
+                    entrada = cargar_entrada_informe(db, user_id)
+                segundos["entrada"] += time.perf_counter() - inicio
+                consultas["entrada"] += contador.consultas
+
+                # Mismo DataFrame (el orden de las filas de la consulta no importa) y mismos hábitos
+                df_anterior = convert_to_dataframe(filas)
+                df_entrada = convert_to_dataframe(entrada.filas)
+                mismos_habitos = (
+                    sorted((h.habito, h.categoria, h.frecuencia_objetivo, h.cantidad_objetivo) for h in habitos)
+                    == sorted((h.habito, h.categoria, h.frecuencia_objetivo, h.cantidad_objetivo) for h in entrada.habitos)
+                )
+                try:
+                    pd.testing.assert_frame_equal(df_anterior, df_entrada)
+                    mismo_df = True
+                except AssertionError:
+                    mismo_df = False
+                if not (mismo_df and mismos_habitos and nombre == entrada.nombre):
+                    diferencias += 1
+                    print(f"Diferencia en el usuario {user_id}")
+
+                with ContadorConsultas() as contador:
+                    try:
+                        generate_dashboard(db, user_id, motor="matplotlib")
+                    except Exception:
+                        # Algunos usuarios sinteticos (categoria None) no tienen informe
+                        pass
+                consultas["informe"] += contador.consultas
+
+            n = len(user_ids)
+            print(f"{n} usuarios, {diferencias} diferencias")
+            print(f"Lectura anterior: {consultas['anterior'] / n:.1f} consultas/informe, "
+                  f"{1000 * segundos['anterior'] / n:.2f} ms")
+            print(f"cargar_entrada_informe: {consultas['entrada'] / n:.1f} consultas/informe, "
+                  f"{1000 * segundos['entrada'] / n:.2f} ms")
+            print(f"generate_dashboard completo: {consultas['informe'] / n:.1f} consultas/informe")
+        finally:
+            borrar_usuarios(db, user_ids)
+
+
+if __name__ == "__main__":
+    main()
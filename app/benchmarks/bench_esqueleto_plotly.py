@@ -0,0 +1,88 @@
+# Tiempo de construir la figura de Plotly con y sin la cache de esqueletos por firma de rejilla
+#
+# Uso (desde el directorio app, con DATABASE_URL apuntando a una BBDD Postgres de pruebas):
+#   python -m benchmarks.bench_esqueleto_plotly --usuarios 20 --repeticiones 5
+#
+# Con los usuarios sinteticos de generar_datos se calculan los datos de sus informes semanal,
+# mensual y anual y se mide RenderPlotly.figura (sin exportar a PNG):
+#   - sin cache: se vacían los esqueletos antes de cada figura (make_subplots + layout + trazas),
+#   - con cache: la figura parte de una copia del esqueleto de su firma,
+#   - esqueleto: solo la copia del esqueleto.
+# Con --png se comprueba además que los PNG con y sin cache son idénticos byte a byte.
+
+import argparse
+import statistics
+import time
+
+from BBDD_create.database import SessionLocal
+from BBDD_create.funciones_informe import datos_dashboard
+from BBDD_create.entrada_informe import cargar_entrada_informe
+from BBDD_create.informe_periodo import datos_informe_periodo
+from BBDD_create.render_dashboard import RenderPlotly
+from benchmarks.generar_datos import generar, borrar_sinteticos
+
+
+def medir(funcion, lista: list, repeticiones: int) -> float:
+    # Mediana (ms) del mejor tiempo de cada elemento de la lista
+    mejores = []
+    for d in lista:
+        mejor = float("inf")
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion(d)
+            mejor = min(mejor, time.perf_counter() - inicio)
+        mejores.append(mejor)
+    return 1000 * statistics.median(mejores)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=20)
+    parser.add_argument("--habitos", type=int, default=6)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--png", action="store_true", help="Compara los PNG con y sin cache")
+    args = parser.parse_args()
+
+    informes = {"semana": [], "mes": [], "anio": []}
+    with SessionLocal() as db:
+        try:
+            user_ids = generar(db, args.usuarios, args.habitos, 1)
+            for user_id in user_ids:
+                datos = datos_dashboard(cargar_entrada_informe(db, user_id))
+                if datos is not None:
+                    informes["semana"].append(datos)
+                informes["mes"].append(datos_informe_periodo(db, user_id, "mes"))
+                informes["anio"].append(datos_informe_periodo(db, user_id, "anio"))
+        finally:
+            borrar_sinteticos(db)
+
+    render = RenderPlotly()
+
+    def sin_cache(datos):
+        render.esqueletos.clear()
+        return render.figura(datos)
+
+    print(f"{'informe':<8}{'informes':>9}{'firmas':>8}{'sin cache ms':>14}{'con cache ms':>14}{'esqueleto ms':>14}")
+    for tipo, lista in informes.items():
+        if not lista:
+            continue
+        firmas = {RenderPlotly.firma(d) for d in lista}
+        t_sin = medir(sin_cache, lista, args.repeticiones)
+        for d in lista:
+            render.figura(d)
+        t_con = medir(render.figura, lista, args.repeticiones)
+        t_esqueleto = medir(render.esqueleto, lista, args.repeticiones)
+        print(f"{tipo:<8}{len(lista):>9}{len(firmas):>8}{t_sin:>14.1f}{t_con:>14.1f}{t_esqueleto:>14.2f}")
+
+    if args.png:
+        distintos = 0
+        for lista in informes.values():
+            for d in lista:
+                con = render.figura(d).to_image(format="png", engine="kaleido")
+                if con != sin_cache(d).to_image(format="png", engine="kaleido"):
+                    distintos += 1
+        print(f"PNG distintos con y sin cache: {distintos}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Tiempo de codificación, tamaño y tiempo de subida del informe según el formato de salida
+#
+# Uso (desde el directorio app, con DATABASE_URL apuntando a una BBDD Postgres de pruebas):
+#   python -m benchmarks.bench_formato_informe --usuarios 10 --motores plotly matplotlib
+#   python -m benchmarks.bench_formato_informe --guardar /tmp/formatos   # guarda una imagen de cada formato
+#
+# Con los informes semanales de los usuarios sinteticos de generar_datos se mide, para cada
+# motor y cada formato (png, jpeg, webp; calidad, escala y disposición compacta):
+#   - figura ms: construcción de la figura (la compacta tiene otra rejilla),
+#   - codificar ms: exportación en el formato pedido (tiempos['png']),
+#   - KB y píxeles de la imagen,
+#   - subida ms: tiempo de transferir los bytes con cada ancho de banda de subida (--mbps).
+# La subida es una estimación (bytes / ancho de banda), sin latencia ni el procesado de Telegram.
+
+import argparse
+import io
+import os
+import statistics
+
+from PIL import Image
+
+from BBDD_create.database import SessionLocal
+from BBDD_create.funciones_informe import datos_dashboard
+from BBDD_create.entrada_informe import cargar_entrada_informe
+from BBDD_create.formato_informe import FormatoInforme
+from BBDD_create.render_dashboard import RENDERS, get_render
+from benchmarks.generar_datos import generar, borrar_sinteticos
+
+FORMATOS = {
+    "png": FormatoInforme(),
+    "jpeg q85": FormatoInforme("jpeg", 85),
+    "jpeg q70": FormatoInforme("jpeg", 70),
+    "webp q80": FormatoInforme("webp", 80),
+    "png x0.6": FormatoInforme(escala=0.6),
+    "jpeg q80 x0.6": FormatoInforme("jpeg", 80, 0.6),
+    "png compacto": FormatoInforme(compacto=True),
+    "jpeg q80 compacto x0.6": FormatoInforme("jpeg", 80, 0.6, True),
+    "webp q75 compacto x0.6": FormatoInforme("webp", 75, 0.6, True),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=10)
+    parser.add_argument("--habitos", type=int, default=8)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--motores", nargs="+", default=list(RENDERS))
+    parser.add_argument("--mbps", type=float, nargs="+", default=[1.0, 5.0, 20.0],
+                        help="Anchos de banda de subida (Mbit/s) para estimar la subida")
+    parser.add_argument("--guardar", default="", help="Directorio donde guardar una imagen de cada formato")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        try:
+            user_ids = generar(db, args.usuarios, args.habitos, 1)
+            datos = [d for d in (datos_dashboard(cargar_entrada_informe(db, u)) for u in user_ids) if d is not None]
+        finally:
+            borrar_sinteticos(db)
+    if not datos:
+        print("Sin informes")
+        return
+
+    subida = "".join(f"{f'subida {m:g}M ms':>16}" for m in args.mbps)
+    for motor in args.motores:
+        render = get_render(motor)
+        render.calentar()
+        print(f"\n[{motor}] {len(datos)} informes")
+        print(f"{'formato':<26}{'figura ms':>10}{'codificar ms':>13}{'KB':>8}{'píxeles':>12}{subida}")
+        for nombre, formato in FORMATOS.items():
+            # Primera pasada sin medir (esqueletos de Plotly y cache de fuentes)
+            imagen = render.renderizar(datos[0], {}, formato)
+            figura, codificar, kb = [], [], []
+            for _ in range(args.repeticiones):
+                for d in datos:
+                    tiempos = {}
+                    imagen = render.renderizar(d, tiempos, formato)
+                    figura.append(tiempos["figura"])
+                    codificar.append(tiempos["png"])
+                    kb.append(len(imagen) / 1024)
+            ancho, alto = Image.open(io.BytesIO(imagen)).size
+            media_kb = statistics.mean(kb)
+            tiempos_subida = "".join(f"{1000 * media_kb * 1024 * 8 / (m * 1e6):>16.0f}" for m in args.mbps)
+            print(f"{nombre:<26}{1000 * statistics.median(figura):>10.1f}{1000 * statistics.median(codificar):>13.1f}"
+                  f"{media_kb:>8.0f}{f'{ancho}x{alto}':>12}{tiempos_subida}")
+            if args.guardar:
+                os.makedirs(args.guardar, exist_ok=True)
+                extension = "jpg" if formato.formato == "jpeg" else formato.formato
+                with open(os.path.join(args.guardar, f"{motor}_{nombre.replace(' ', '_')}.{extension}"), "wb") as f:
+                    f.write(imagen)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# Coste de los informes mensual y anual según el número de acciones
+#
+# Uso (desde el directorio app, con DATABASE_URL apuntando a una BBDD Postgres de pruebas):
+#   python -m benchmarks.bench_informe_periodo --acciones-dia 1 10 50
+#
+# Para cada densidad se crea un usuario sintetico con hábitos diarios, 'dejar' y semanales y
+# N acciones por hábito y día desde el 1 de enero, y se mide:
+#   - filas que llegan a Python con los buckets de date_trunc (mes: día, año: semana),
+#   - tiempo de la consulta de buckets (Postgres recorre las acciones del periodo),
+#   - tiempo en Python de puntuar y preparar los paneles (datos_informe_periodo sin la consulta),
+#   - tiempo de leer las acciones sueltas del periodo (lo que necesitaría agregar en pandas).
+# Las filas de buckets y el tiempo en Python no crecen con las acciones; la lectura de acciones sueltas sí.
+
+import argparse
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+from BBDD_create.database import SessionLocal, ContadorConsultas, Usuario, Habito
+from BBDD_create.informe_periodo import limites_periodo, cargar_buckets, datos_informe_periodo
+from benchmarks.paridad_puntos_sql import ID_BASE, borrar_usuarios
+
+HABITOS = [
+    ("Pasos", "caminar", "diaria", 8000.0),
+    ("Leer", "tiempo", "diaria", 20.0),
+    ("Agua", "alimentacion", "diaria", 8.0),
+    ("Fumar", "dejar", "diaria", 0.0),
+    ("Correr", "deporte", "semanal", 15.0),
+    ("Meditar", "estilo-vida", "semanal", 60.0),
+]
+
+QUERY_INSERTAR_ACCIONES = """
+    INSERT INTO acciones (user_id, habito, fecha_realizacion, cantidad)
+    SELECT :user_id, :habito, d + (n * interval '17 minutes'), (random() * :escala)
+    FROM generate_series(CAST(:inicio AS timestamp), CAST(:fin AS timestamp), interval '1 day') AS d,
+         generate_series(1, :por_dia) AS n
+"""
+
+QUERY_ACCIONES_SUELTAS = """
+    SELECT a.habito, a.fecha_realizacion, a.cantidad, h.categoria, h.frecuencia_objetivo, h.cantidad_objetivo
+    FROM acciones a
+    JOIN habitos h ON h.user_id = a.user_id AND h.habito = a.habito
+    WHERE a.user_id = :user_id AND a.fecha_realizacion >= :inicio AND a.fecha_realizacion < :fin
+"""
+
+
+def crear_usuario(db, user_id: int, por_dia: int) -> int:
+    # Acciones de cada hábito todos los días desde el 1 de enero hasta hoy
+    hoy = datetime.now()
+    db.add(Usuario(user_id=user_id, nombre="sintetico periodo", edad=30, sexo="x"))
+    for habito, categoria, frecuencia, objetivo in HABITOS:
+        db.add(Habito(
+            user_id=user_id, habito=habito, categoria=categoria,
+            frecuencia_objetivo=frecuencia, cantidad_objetivo=objetivo
+        ))
+    db.flush()
+    for habito, _, _, objetivo in HABITOS:
+        db.execute(text(QUERY_INSERTAR_ACCIONES), {
+            "user_id": user_id, "habito": habito, "inicio": datetime(hoy.year, 1, 1), "fin": hoy,
+            "escala": 2 * max(objetivo, 1.0) / por_dia, "por_dia": por_dia,
+        })
+    db.commit()
+    return db.execute(text("SELECT count(*) FROM acciones WHERE user_id = :u"), {"u": user_id}).scalar()
+
+
+def medir(funcion, repeticiones: int) -> float:
+    # Se devuelve el mejor tiempo de varias repeticiones
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--acciones-dia", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'periodo':<8}{'acciones':>10}{'buckets':>9}{'consultas':>11}{'sql ms':>9}{'python ms':>11}"
+          f"{'acciones sueltas ms':>21}")
+    user_ids = []
+    try:
+        for i, por_dia in enumerate(args.acciones_dia):
+            user_id = ID_BASE + 900_000 + i
+            user_ids.append(user_id)
+            with SessionLocal() as db:
+                crear_usuario(db, user_id, por_dia)
+                for periodo in ("mes", "anio"):
+                    limites = limites_periodo(periodo)
+                    buckets, _ = cargar_buckets(db, user_id, limites)
+                    n_acciones = db.execute(text(f"SELECT count(*) FROM ({QUERY_ACCIONES_SUELTAS}) a"), {
+                        "user_id": user_id, "inicio": limites["inicio"], "fin": limites["fin"]
+                    }).scalar()
+                    with ContadorConsultas() as contador:
+                        datos_informe_periodo(db, user_id, periodo)
+                    t_informe = medir(lambda: datos_informe_periodo(db, user_id, periodo), args.repeticiones)
+                    t_sql = medir(lambda: cargar_buckets(db, user_id, limites), args.repeticiones)
+                    t_sueltas = medir(lambda: db.execute(text(QUERY_ACCIONES_SUELTAS), {
+                        "user_id": user_id, "inicio": limites["inicio"], "fin": limites["fin"]
+                    }).fetchall(), args.repeticiones)
+                    print(f"{periodo:<8}{n_acciones:>10}{len(buckets):>9}{contador.consultas:>11}{1000 * t_sql:>9.1f}"
+                          f"{1000 * max(t_informe - t_sql, 0):>11.1f}{1000 * t_sueltas:>21.1f}")
+    finally:
+        with SessionLocal() as db:
+            borrar_usuarios(db, user_ids)
+
+
+if __name__ == "__main__":
+    main()
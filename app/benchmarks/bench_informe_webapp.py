@@ -0,0 +1,129 @@
+# Coste en el servidor del informe en imagen frente al modo WebApp (JSON de la figura)
+#
+# Uso (desde el directorio app, con DATABASE_URL apuntando a una BBDD Postgres de pruebas):
+#   INFORME_MODO=webapp INFORME_API_URL=http://127.0.0.1:8765 \
+#       python -m benchmarks.bench_informe_webapp --usuarios 10 --puerto 8765
+#
+# Con los usuarios sinteticos de generar_datos se mide, por informe semanal:
+#   - imagen: renderizar_informe en el proceso (datos + figura + exportación, formato global),
+#   - json: renderizar_json_informe en el proceso (datos + figura compacta + JSON gzip),
+#   - peticiones HTTP reales al servidor de informes (pool de procesos y bucle asyncio como en el bot):
+#     primera petición (fallo de cache: JSON en el pool), siguientes (acierto) y con If-None-Match (304),
+# y comprueba que las firmas inválidas o caducadas se rechazan.
+
+import argparse
+import asyncio
+import statistics
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from acciones.accion_informe import renderizar_informe, renderizar_json_informe, pool_informes
+from acciones.informe_webapp import iniciar_servidor_informes, url_informe_webapp, firmar, cache_json
+from BBDD_create.database import SessionLocal
+from benchmarks.generar_datos import generar, borrar_sinteticos
+
+
+def peticion(url: str, etag: str = None) -> tuple:
+    # Retorna (estado, bytes recibidos, etag, ms)
+    solicitud = urllib.request.Request(url, headers={"Accept-Encoding": "gzip"})
+    if etag:
+        solicitud.add_header("If-None-Match", etag)
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(solicitud, timeout=120) as respuesta:
+            cuerpo = respuesta.read()
+            return respuesta.status, len(cuerpo), respuesta.headers.get("ETag"), 1000 * (time.perf_counter() - inicio)
+    except urllib.error.HTTPError as e:
+        return e.code, 0, None, 1000 * (time.perf_counter() - inicio)
+
+
+def url_api(url_webapp: str, puerto: int) -> str:
+    # Los mismos parámetros firmados que recibe la WebApp, contra el servidor local
+    parametros = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url_webapp).query))
+    parametros.pop("api")
+    return f"http://127.0.0.1:{puerto}/informe?{urllib.parse.urlencode(parametros)}"
+
+
+def medir_http(user_ids: list, puerto: int, repeticiones: int) -> dict:
+    medidas = {"fallo": [], "acierto": [], "304": [], "kb": []}
+    rechazos = []
+    for user_id in user_ids:
+        url = url_api(url_informe_webapp(user_id), puerto)
+        estado, n_bytes, etag, ms = peticion(url)
+        if estado != 200:
+            continue
+        medidas["fallo"].append(ms)
+        medidas["kb"].append(n_bytes / 1024)
+        for _ in range(repeticiones):
+            medidas["acierto"].append(peticion(url)[3])
+            medidas["304"].append(peticion(url, etag)[3])
+        # Firma de otro usuario y enlace caducado
+        otra = url.replace(f"u={user_id}", f"u={user_id + 1}")
+        expira = int(time.time()) - 10
+        caducada = f"http://127.0.0.1:{puerto}/informe?" + urllib.parse.urlencode({
+            "u": user_id, "p": "semana", "exp": expira, "firma": firmar(user_id, "semana", expira)
+        })
+        rechazos += [peticion(otra)[0], peticion(caducada)[0]]
+    return {
+        "informes": len(medidas["fallo"]),
+        **{k: statistics.median(v) for k, v in medidas.items() if v},
+        "rechazos": rechazos,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=10)
+    parser.add_argument("--habitos", type=int, default=8)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--puerto", type=int, default=8765)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        user_ids = generar(db, args.usuarios, args.habitos, 1)
+    try:
+        # Coste de CPU por informe en un solo proceso (la primera llamada calienta motores y esqueletos)
+        renderizar_informe(user_ids[0], time.time())
+        renderizar_json_informe(user_ids[0], time.time())
+        imagen, json_gzip = [], []
+        for user_id in user_ids:
+            inicio = time.perf_counter()
+            png = renderizar_informe(user_id, time.time())[0]
+            imagen.append((time.perf_counter() - inicio, len(png or b"")))
+            inicio = time.perf_counter()
+            contenido = renderizar_json_informe(user_id, time.time())[0]
+            json_gzip.append((time.perf_counter() - inicio, len(contenido or b"")))
+        print(f"{'entrega':<28}{'ms':>9}{'KB':>8}")
+        for nombre, medidas in (("imagen (renderizar)", imagen), ("json gzip (preparar)", json_gzip)):
+            print(f"{nombre:<28}{1000 * statistics.median(t for t, _ in medidas):>9.1f}"
+                  f"{statistics.mean(b for _, b in medidas) / 1024:>8.0f}")
+
+        async def servir():
+            # Servidor y pool como en el bot: las peticiones HTTP se atienden en hilos aparte
+            servidor = iniciar_servidor_informes(asyncio.get_running_loop(), args.puerto)
+            if servidor is None:
+                print("Modo WebApp desactivado: define INFORME_MODO=webapp e INFORME_API_URL")
+                return None
+            pool_informes.calentar()
+            try:
+                return await asyncio.to_thread(medir_http, user_ids, args.puerto, args.repeticiones)
+            finally:
+                servidor.shutdown()
+                pool_informes.cerrar()
+
+        r = asyncio.run(servir())
+        if r is not None and r["informes"]:
+            print(f"{'GET /informe (fallo, pool)':<28}{r['fallo']:>9.1f}{r['kb']:>8.0f}")
+            print(f"{'GET /informe (cache)':<28}{r['acierto']:>9.2f}")
+            print(f"{'GET /informe (304)':<28}{r['304']:>9.2f}")
+            print(f"Aciertos de cache: {cache_json.aciertos}, fallos: {cache_json.fallos}; "
+                  f"respuestas a firmas inválidas/caducadas: {sorted(set(r['rechazos']))}")
+    finally:
+        with SessionLocal() as db:
+            borrar_sinteticos(db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# Benchmark de las métricas del informe semanal
+#
+# Uso (desde el directorio app):
+#   python -m benchmarks.bench_metricas_informe --habitos 6 30 150
+#
+# Compara calcular_metricas (una pasada) con el cálculo anterior de generate_dashboard
+# (filtros y nunique por categoría, bucle por días, un DataFrame por panel de líneas),
+# comprueba que las métricas coinciden y mide el tiempo con semanas de distinto tamaño.
+
+import argparse
+import math
+import time
+from datetime import datetime, timedelta
+
+from BBDD_create.funciones_informe import convert_to_dataframe
+from BBDD_create.entrada_informe import HabitoInforme
+from BBDD_create.metricas_informe import calcular_metricas
+from benchmarks.bench_convert_to_dataframe import generar_filas
+from benchmarks.referencia_original import metricas_dashboard_original
+
+
+def medir(funcion, repeticiones: int) -> float:
+    # Se devuelve el mejor tiempo de varias repeticiones
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def iguales(metricas, original: dict) -> bool:
+    cercano = lambda a, b: math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+    ceros = (0.0,) * 7
+    return (
+        cercano(metricas.puntos_totales, original["puntos_totales"])
+        and metricas.puntos_objetivo_totales == original["puntos_objetivo_totales"]
+        and metricas.puntos_categoria.keys() == original["puntos_categoria"].keys()
+        and all(cercano(metricas.puntos_categoria[c], p) for c, p in original["puntos_categoria"].items())
+        and all(metricas.dias_cumplidos.get(c, 0) == d for c, d in original["dias_cumplidos"].items())
+        and metricas.dias_reducir == original["dias_reducir"]
+        and all(
+            all(cercano(a, b) for a, b in zip(metricas.puntos_dia.get(c, ceros), p))
+            for c, p in original["puntos_dia"].items()
+        )
+        and len(metricas.hoy) == len(original["hoy"])
+        and all(a[:2] == b[:2] and cercano(a[2], b[2]) for a, b in zip(metricas.hoy, original["hoy"]))
+        and all(getattr(metricas, clave) == original[clave] for clave in (
+            "mostrar_caminar", "mostrar_deporte", "mostrar_estilo_vida", "mostrar_reducir"
+        ))
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las métricas del informe")
+    parser.add_argument("--habitos", type=int, nargs="+", default=[6, 30, 150])
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    hoy = datetime.now()
+    lunes = (hoy - timedelta(days=hoy.weekday())).date()
+    print(f"{'habitos':>8}{'filas':>8}{'anterior ms':>13}{'una pasada ms':>15}{'x':>7}  iguales")
+    for n_habitos in args.habitos:
+        # Semana actual: de lunes a hoy, con todos los días con acciones
+        filas = generar_filas(n_habitos, hoy.weekday(), prob_accion=1.0, semilla=n_habitos)
+        df = convert_to_dataframe(filas)
+        habitos = list({f[1]: HabitoInforme(f[1], f[2], f[3], f[6]) for f in filas}.values())
+
+        metricas = calcular_metricas(df, habitos, lunes)
+        original = metricas_dashboard_original(df, habitos, lunes)
+        t_original = medir(lambda: metricas_dashboard_original(df, habitos, lunes), args.repeticiones)
+        t_nuevo = medir(lambda: calcular_metricas(df, habitos, lunes), args.repeticiones)
+        print(f"{n_habitos:>8}{len(df):>8}{1000 * t_original:>13.2f}{1000 * t_nuevo:>15.2f}"
+              f"{t_original / t_nuevo:>7.1f}  {iguales(metricas, original)}")
+
+
+if __name__ == "__main__":
+    main()
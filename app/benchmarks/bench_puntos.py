@@ -0,0 +1,104 @@
+# Benchmark del calculo de puntos
+#
+# Uso (desde el directorio app):
+#   python -m benchmarks.bench_puntos --semanas 10 100 1000
+#
+# Compara, para usuarios con 10, 100 y 1000 semanas de historial:
+#   - calculate_points / calculate_points_max con DataFrame.apply(axis=1)
+#     frente a calcular_puntos_vectorizado,
+#   - accumulate_weekly_points anterior (bucle por grupos) frente a la version vectorizada,
+#   - convert_to_dataframe completo anterior frente al actual.
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from BBDD_create.funciones_informe import (
+    calculate_points, calculate_points_max, calcular_puntos_vectorizado,
+    accumulate_weekly_points, convert_to_dataframe
+)
+from benchmarks.bench_convert_to_dataframe import generar_filas
+from benchmarks.referencia_original import accumulate_weekly_points_original, convert_to_dataframe_original
+
+
+def medir(funcion, repeticiones: int) -> float:
+    # Se devuelve el mejor tiempo de varias repeticiones
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def frame_base(filas: list) -> pd.DataFrame:
+    # DataFrame con las columnas que reciben las funciones de puntos
+    df = pd.DataFrame(filas, columns=[
+        "id", "habito", "categoria", "frecuencia_objetivo", "fecha_realizacion",
+        "total_acciones", "cantidad_objetivo", "media", "reducir"
+    ])
+    df["id"] = df["id"].astype(str)
+    df["habito"] = df["habito"].str.lower()
+    df["fecha_realizacion"] = pd.to_datetime(df["fecha_realizacion"]).dt.strftime("%Y-%m-%d")
+    df["reducir"] = df["reducir"].fillna(0.0)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del calculo de puntos")
+    parser.add_argument("--semanas", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--habitos", type=int, default=8)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'semanas':>8}{'filas':>8}  {'paso':<28}{'anterior (s)':>14}{'vectorizado (s)':>17}{'speedup':>10}")
+    for semanas in args.semanas:
+        filas = generar_filas(args.habitos, semanas * 7)
+        df = frame_base(filas)
+        df_daily = df[df["frecuencia_objetivo"] == "diaria"]
+        df_weekly = df[df["frecuencia_objetivo"] == "semanal"]
+
+        # Se comprueba que los resultados coinciden antes de medir
+        puntos, puntos_max = calcular_puntos_vectorizado(
+            df_daily["categoria"], df_daily["frecuencia_objetivo"],
+            df_daily["total_acciones"], df_daily["cantidad_objetivo"]
+        )
+        assert np.allclose(puntos, df_daily.apply(calculate_points, axis=1))
+        assert np.allclose(puntos_max, df_daily.apply(calculate_points_max, axis=1))
+        pd.testing.assert_frame_equal(
+            accumulate_weekly_points_original(df_weekly.copy()), accumulate_weekly_points(df_weekly), check_dtype=False
+        )
+
+        pasos = [
+            (
+                "puntos diarios (apply)",
+                lambda: (df_daily.apply(calculate_points, axis=1), df_daily.apply(calculate_points_max, axis=1)),
+                lambda: calcular_puntos_vectorizado(
+                    df_daily["categoria"], df_daily["frecuencia_objetivo"],
+                    df_daily["total_acciones"], df_daily["cantidad_objetivo"]
+                ),
+            ),
+            (
+                "accumulate_weekly_points",
+                lambda: accumulate_weekly_points_original(df_weekly.copy()),
+                lambda: accumulate_weekly_points(df_weekly),
+            ),
+            (
+                "convert_to_dataframe",
+                lambda: convert_to_dataframe_original(filas),
+                lambda: convert_to_dataframe(filas),
+            ),
+        ]
+        for nombre, anterior, vectorizado in pasos:
+            t_anterior = medir(anterior, args.repeticiones)
+            t_vectorizado = medir(vectorizado, args.repeticiones)
+            print(
+                f"{semanas:>8}{len(filas):>8}  {nombre:<28}{t_anterior:>14.4f}"
+                f"{t_vectorizado:>17.4f}{t_anterior / t_vectorizado:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
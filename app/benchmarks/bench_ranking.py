@@ -0,0 +1,110 @@
+# Paridad y tiempos del ranking de puntos
+#
+# Uso (desde el directorio app, con DATABASE_URL apuntando a una BBDD Postgres de pruebas):
+#   python -m benchmarks.bench_ranking --usuarios 200 --semanas 8
+#
+# Con usuarios sinteticos (los de paridad_puntos_sql) y su libro de puntos:
+#   - comprueba que los puntos del ranking coinciden con get_points_weekly_sql y el libro por usuario,
+#   - compara reconstruir el ranking (3 consultas agrupadas) con calcular la semana usuario a usuario,
+#   - mide actualizar_usuario (lo que cuesta cada cambio en el libro) y consultar.
+# Ademas mide las operaciones de Clasificacion en memoria con --tamanos usuarios ficticios.
+
+import argparse
+import random
+import time
+
+from sqlalchemy import text
+
+from BBDD_create.database import SessionLocal, ContadorConsultas
+from BBDD_create.funciones_puntos_sql import get_points_weekly_sql
+from BBDD_create.registro_puntos import get_points_all_time_registro, reconstruir_registro
+from BBDD_create.ranking import Clasificacion, RankingPuntos
+from benchmarks.paridad_puntos_sql import crear_usuarios, borrar_usuarios
+
+
+def medir_clasificacion(n: int, operaciones: int = 2000):
+    # Tiempo medio (µs) de actualizar, posicion+percentil+vecinos con n usuarios
+    r = random.Random(n)
+    tabla = Clasificacion({u: round(r.uniform(0, 500), 1) for u in range(n)})
+    ids = [r.randrange(n) for _ in range(operaciones)]
+
+    inicio = time.perf_counter()
+    for u in ids:
+        tabla.actualizar(u, round(r.uniform(0, 500), 1))
+    t_actualizar = (time.perf_counter() - inicio) / operaciones
+
+    inicio = time.perf_counter()
+    for u in ids:
+        tabla.posicion(u), tabla.percentil(u), tabla.vecinos(u)
+    t_consultar = (time.perf_counter() - inicio) / operaciones
+    return 1e6 * t_actualizar, 1e6 * t_consultar
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=200)
+    parser.add_argument("--semanas", type=int, default=8)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        user_ids = crear_usuarios(db, args.usuarios, args.semanas, args.semilla)
+        try:
+            for user_id in user_ids:
+                reconstruir_registro(db, user_id)
+            ranking = RankingPuntos()
+
+            inicio = time.perf_counter()
+            with ContadorConsultas() as contador:
+                ranking.reconstruir(db)
+            t_reconstruir = time.perf_counter() - inicio
+            consultas_reconstruir = contador.consultas
+
+            # Calculo usuario a usuario (lo que haria falta sin el ranking)
+            inicio = time.perf_counter()
+            semana = {user_id: get_points_weekly_sql(db, user_id) for user_id in user_ids}
+            t_por_usuario = time.perf_counter() - inicio
+
+            diferencias = 0
+            for user_id in user_ids:
+                consulta = ranking.consultar(user_id)
+                if consulta is None:
+                    continue
+                total = get_points_all_time_registro(db, user_id)
+                if (abs(consulta["semana"]["global"]["puntos"] - round(semana[user_id], 1)) > 1e-9
+                        or abs(consulta["total"]["global"]["puntos"] - round(total, 1)) > 1e-9):
+                    diferencias += 1
+                    print(f"Diferencia en {user_id}: {consulta['semana']['global']['puntos']} / {semana[user_id]}, "
+                          f"{consulta['total']['global']['puntos']} / {total}")
+
+            inicio = time.perf_counter()
+            with ContadorConsultas() as contador:
+                for user_id in user_ids:
+                    ranking.actualizar_usuario(db, user_id)
+            t_actualizar = (time.perf_counter() - inicio) / len(user_ids)
+            consultas_actualizar = contador.consultas / len(user_ids)
+
+            inicio = time.perf_counter()
+            for user_id in user_ids:
+                ranking.consultar(user_id)
+            t_consultar = (time.perf_counter() - inicio) / len(user_ids)
+
+            print(f"{len(user_ids)} usuarios, {diferencias} diferencias")
+            print(f"Reconstruir ranking: {1000 * t_reconstruir:.1f} ms ({consultas_reconstruir} consultas)")
+            print(f"Semana usuario a usuario: {1000 * t_por_usuario:.1f} ms ({len(user_ids)} consultas)")
+            print(f"actualizar_usuario: {1000 * t_actualizar:.2f} ms ({consultas_actualizar:.0f} consultas)")
+            print(f"consultar: {1e6 * t_consultar:.1f} µs")
+        finally:
+            borrar_usuarios(db, user_ids)
+            db.execute(text("DELETE FROM puntos_registro WHERE user_id = ANY(:ids)"), {"ids": user_ids})
+            db.commit()
+
+    print(f"\n{'usuarios':>10}{'actualizar µs':>15}{'consultar µs':>14}")
+    for n in args.tamanos:
+        t_actualizar, t_consultar = medir_clasificacion(n)
+        print(f"{n:>10}{t_actualizar:>15.2f}{t_consultar:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# Latencia y memoria de los motores de renderizado del informe semanal
+#
+# Uso (desde el directorio app, con DATABASE_URL apuntando a una BBDD Postgres de pruebas):
+#   python -m benchmarks.bench_render_informe --usuarios 20 --repeticiones 3
+#
+# Se insertan usuarios sinteticos (los de paridad_puntos_sql), se calculan sus datos_dashboard
+# y cada motor (plotly, matplotlib) se mide en un proceso nuevo para que el arranque y la memoria
+# de uno no afecten al otro:
+#   - primer informe (en frio: con plotly incluye arrancar kaleido/Chromium),
+#   - media y p95 de los siguientes informes (figura + PNG),
+#   - pico de memoria Python de un informe (tracemalloc),
+#   - pico de RSS del proceso y sus hijos (VmHWM de /proc; con plotly incluye Chromium).
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from BBDD_create.database import SessionLocal
+from BBDD_create.funciones_informe import datos_dashboard
+from BBDD_create.entrada_informe import cargar_entrada_informe
+from BBDD_create.render_dashboard import RENDERS, get_render
+from benchmarks.paridad_puntos_sql import crear_usuarios, borrar_usuarios
+
+
+def rss_pico_arbol(pid: int = None) -> int:
+    # Suma de VmHWM (pico de RSS, en kB) del proceso y de todos sus descendientes (solo Linux)
+    pid = pid or os.getpid()
+    hijos = {}
+    for entrada in os.listdir("/proc"):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        hijos.setdefault(ppid, []).append(int(entrada))
+
+    total, pendientes = 0, [pid]
+    while pendientes:
+        actual = pendientes.pop()
+        pendientes.extend(hijos.get(actual, []))
+        try:
+            with open(f"/proc/{actual}/status") as f:
+                for linea in f:
+                    if linea.startswith("VmHWM:"):
+                        total += int(linea.split()[1])
+        except OSError:
+            pass
+    return total
+
+
+def medir_motor(motor: str, user_ids: list, repeticiones: int) -> dict:
+    # Se ejecuta en el proceso hijo: los datos se calculan antes y no cuentan en los tiempos
+    datos = []
+    with SessionLocal() as db:
+        for user_id in user_ids:
+            try:
+                d = datos_dashboard(cargar_entrada_informe(db, user_id))
+            except Exception:
+                # Algunos usuarios sinteticos (categoria None) no tienen informe
+                continue
+            if d is not None:
+                datos.append(d)
+    if not datos:
+        return {"motor": motor, "informes": 0}
+
+    render = get_render(motor)
+    inicio = time.perf_counter()
+    render.renderizar(datos[0], {})
+    frio = time.perf_counter() - inicio
+
+    latencias, bytes_png = [], []
+    for _ in range(repeticiones):
+        for d in datos:
+            inicio = time.perf_counter()
+            png = render.renderizar(d, {})
+            latencias.append(time.perf_counter() - inicio)
+            bytes_png.append(len(png))
+
+    tracemalloc.start()
+    render.renderizar(datos[-1], {})
+    _, pico_python = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "motor": motor,
+        "informes": len(latencias),
+        "frio_ms": 1000 * frio,
+        "media_ms": 1000 * float(np.mean(latencias)),
+        "p95_ms": 1000 * float(np.percentile(latencias, 95)),
+        "kb_png": float(np.mean(bytes_png)) / 1024,
+        "pico_python_mb": pico_python / 2 ** 20,
+        "pico_rss_mb": rss_pico_arbol() / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=20)
+    parser.add_argument("--semanas", type=int, default=4)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--motores", nargs="+", default=list(RENDERS))
+    # Uso interno: mide un motor con usuarios ya creados e imprime el resultado en JSON
+    parser.add_argument("--hijo", default="")
+    parser.add_argument("--ids", type=int, nargs="*", default=[])
+    args = parser.parse_args()
+
+    if args.hijo:
+        print(json.dumps(medir_motor(args.hijo, args.ids, args.repeticiones)))
+        return
+
+    with SessionLocal() as db:
+        user_ids = crear_usuarios(db, args.usuarios, args.semanas, args.semilla)
+    try:
+        print(f"{'motor':<12}{'informes':>9}{'frio ms':>10}{'media ms':>10}{'p95 ms':>9}"
+              f"{'KB png':>9}{'pico py MB':>12}{'pico RSS MB':>13}")
+        for motor in args.motores:
+            salida = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_render_informe", "--hijo", motor,
+                 "--repeticiones", str(args.repeticiones), "--ids", *map(str, user_ids)],
+                capture_output=True, text=True, check=True
+            ).stdout
+            r = json.loads(salida.strip().splitlines()[-1])
+            if not r["informes"]:
+                print(f"{motor:<12} sin informes")
+                continue
+            print(f"{motor:<12}{r['informes']:>9}{r['frio_ms']:>10.0f}{r['media_ms']:>10.1f}{r['p95_ms']:>9.1f}"
+                  f"{r['kb_png']:>9.0f}{r['pico_python_mb']:>12.1f}{r['pico_rss_mb']:>13.0f}")
+    finally:
+        with SessionLocal() as db:
+            borrar_usuarios(db, user_ids)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# Índice de vecinos de TrueFriends: construcción, consultas y agregados por vecindario
+#
+# Uso (desde el directorio app, con DATABASE_URL apuntando a una BBDD Postgres de pruebas):
+#   python -m benchmarks.bench_vecinos_truefriends --usuarios 200 --habitos 8 --anios 0.25 --escala 20000
+#
+# Con los usuarios sinteticos de generar_datos se mide:
+#   - construcción: reconstruir el índice desde la tabla habitos,
+#   - consulta: los k vecinos de un usuario (consultar),
+#   - modify_habitos: recalcular el vector y los vecinos de un usuario (actualizar_usuario),
+#   - agregados: media de los vecinos de todos los usuarios (agregados_vecinos, en cada refresco de la cache),
+# y la similitud media con los vecinos frente a la similitud media con todos los usuarios.
+# Con --escala se repiten construcción, consulta y actualización con hábitos aleatorios en memoria
+# (sin BBDD) para ese número de usuarios.
+
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+
+from BBDD_create.database import SessionLocal
+from BBDD_create.cache_truefriends import calcular_agregados
+from BBDD_create.vecinos_truefriends import IndiceVecinos, agregados_vecinos
+from benchmarks.generar_datos import generar, borrar_sinteticos, CATALOGO
+
+
+def medir(funcion, repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return 1000 * statistics.median(tiempos)
+
+
+def habitos_aleatorios(user_id: int, aleatorio: random.Random) -> list:
+    # Entre 2 y 10 hábitos del catálogo con objetivos alrededor de los del catálogo
+    filas = []
+    for nombre, categoria, frecuencia, objetivo, _ in aleatorio.sample(CATALOGO, aleatorio.randint(2, len(CATALOGO))):
+        filas.append((user_id, nombre.lower(), categoria, frecuencia, objetivo * aleatorio.uniform(0.5, 2)))
+    return filas
+
+
+def similitudes(indice: IndiceVecinos) -> tuple:
+    # Similitud media con los k vecinos y con todos los usuarios (sin contarse a sí mismo)
+    n = len(indice)
+    todas = indice.matriz @ indice.matriz.T
+    media_todos = (todas.sum() - np.trace(todas)) / (n * (n - 1))
+    return float(indice.similitudes.mean()), float(media_todos)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=200)
+    parser.add_argument("--habitos", type=int, default=8)
+    parser.add_argument("--anios", type=float, default=0.25)
+    parser.add_argument("--k", type=int, default=25)
+    parser.add_argument("--escala", type=int, default=20000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'índice de vecinos':<32}{'usuarios':>10}{'ms':>10}")
+    with SessionLocal() as db:
+        user_ids = generar(db, args.usuarios, args.habitos, args.anios)
+        try:
+            indice = IndiceVecinos(args.k)
+            construccion = medir(lambda: indice.reconstruir(db), args.repeticiones)
+            n = len(indice)
+            consulta = medir(lambda: indice.consultar(user_ids[0]), args.repeticiones * 100)
+            actualizacion = medir(lambda: indice.actualizar_usuario(db, user_ids[0]), args.repeticiones)
+            agregados = calcular_agregados(db)
+            vecinos = medir(lambda: agregados_vecinos(indice, agregados["por_usuario"]), args.repeticiones)
+            print(f"{'construcción (BBDD)':<32}{n:>10}{construccion:>10.1f}")
+            print(f"{'consulta':<32}{n:>10}{consulta:>10.3f}")
+            print(f"{'modify_habitos (BBDD)':<32}{n:>10}{actualizacion:>10.2f}")
+            print(f"{'agregados de los vecinos':<32}{n:>10}{vecinos:>10.1f}")
+            con_vecinos, con_todos = similitudes(indice)
+        finally:
+            borrar_sinteticos(db)
+
+    if args.escala:
+        aleatorio = random.Random(1)
+        filas = [fila for u in range(args.escala) for fila in habitos_aleatorios(u, aleatorio)]
+        grande = IndiceVecinos(args.k)
+        construccion = medir(lambda: grande.construir(filas), 1)
+        consulta = medir(lambda: grande.consultar(0), args.repeticiones * 100)
+        actualizacion = medir(lambda: grande.actualizar_filas(0, habitos_aleatorios(0, aleatorio)), args.repeticiones)
+        print(f"{'construcción (memoria)':<32}{len(grande):>10}{construccion:>10.1f}")
+        print(f"{'consulta':<32}{len(grande):>10}{consulta:>10.3f}")
+        print(f"{'modify_habitos (memoria)':<32}{len(grande):>10}{actualizacion:>10.2f}")
+
+    print(f"Similitud media con los {args.k} vecinos: {con_vecinos:.3f}; con todos los usuarios: {con_todos:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# Generador de datos sinteticos para benchmarks
+#
+# Uso (desde el directorio app, con DATABASE_URL apuntando a una BBDD Postgres de pruebas):
+#   python -m benchmarks.generar_datos --usuarios 50 --habitos 8 --anios 2
+#   python -m benchmarks.generar_datos --borrar
+#
+# Inserta usuarios (ids a partir de ID_BASE) con hábitos de todas las categorías y frecuencias
+# y años de acciones, y rellena su libro de puntos y sus celdas del cubo de categorías. Las acciones se generan en Postgres con
+# generate_series (con setseed, el resultado es reproducible), así que insertar cientos de
+# miles de filas tarda segundos. Sin --borrar, los usuarios sinteticos anteriores se sustituyen.
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from BBDD_create.database import SessionLocal, Usuario, Habito
+from BBDD_create.registro_puntos import recalcular_buckets
+from BBDD_create.cubo_categorias import recalcular_celdas
+
+ID_BASE = 9_200_000_000
+
+# (habito, categoria, frecuencia, objetivo, unidad): se recorren en orden y con más hábitos se repiten
+# con sufijo, de modo que todas las categorías y frecuencias aparecen con pocos hábitos por usuario
+CATALOGO = [
+    ("Pasos", "caminar", "diaria", 8000.0, "pasos"),
+    ("Correr", "deporte", "semanal", 15.0, "km"),
+    ("Fumar", "dejar", "diaria", 0.0, "veces"),
+    ("Meditar", "estilo-vida", "diaria", 10.0, "minutos"),
+    ("Fruta", "alimentacion", "diaria", 3.0, "piezas"),
+    ("Planificar", "tiempo", "semanal", 2.0, "veces"),
+    ("Gimnasio", "deporte", "diaria", 45.0, "minutos"),
+    ("Azucar", "dejar", "diaria", 1.0, "veces"),
+    ("Leer", "estilo-vida", "semanal", 120.0, "minutos"),
+    ("Agua", "alimentacion", "diaria", 8.0, "vasos"),
+]
+
+# La primera acción de cada hábito y día se registra con probabilidad prob y cada una de las
+# max_por_dia - 1 siguientes con la mitad; la cantidad es aleatoria alrededor del objetivo diario
+# (un tercio del semanal), de modo que hay días cumplidos, a medias y superados
+QUERY_ACCIONES = """
+    INSERT INTO acciones (user_id, habito, fecha_realizacion, texto, cantidad)
+    SELECT
+        h.user_id,
+        h.habito,
+        d + interval '7 hours' + random() * interval '15 hours',
+        NULL,
+        round(CAST(random() * 2 * greatest(
+            CASE WHEN lower(h.frecuencia_objetivo) = 'semanal' THEN h.cantidad_objetivo / 3 ELSE h.cantidad_objetivo END,
+            1
+        ) / (1 + 0.5 * (:max_por_dia - 1)) AS numeric), 1)
+    FROM habitos h
+    CROSS JOIN generate_series(CAST(:inicio AS timestamp), CAST(:fin AS timestamp), interval '1 day') AS d
+    CROSS JOIN generate_series(1, :max_por_dia) AS k
+    WHERE h.user_id BETWEEN :id_min AND :id_max
+      AND random() < CASE WHEN k = 1 THEN :prob ELSE :prob / 2 END
+"""
+
+
+def borrar_sinteticos(db):
+    # Se borran todos los usuarios del rango sintetico (con su libro de puntos, resúmenes y caches)
+    params = {"id_min": ID_BASE, "id_max": ID_BASE + 99_999_999}
+    for tabla in (
+        "puntos_registro", "resumenes_semanales", "versiones_datos", "informes_cache",
+        "acciones", "habitos", "usuarios"
+    ):
+        db.execute(text(f"DELETE FROM {tabla} WHERE user_id BETWEEN :id_min AND :id_max"), params)
+    # Sin acciones, recalcular sus celdas las resta del cubo
+    sinteticos = db.execute(
+        text("SELECT DISTINCT user_id FROM cubo_celdas_usuario WHERE user_id BETWEEN :id_min AND :id_max"), params
+    ).fetchall()
+    for (user_id,) in sinteticos:
+        recalcular_celdas(db, user_id)
+    db.commit()
+
+
+def generar(db, n_usuarios: int, n_habitos: int, n_anios: float, prob: float = 0.6,
+            max_por_dia: int = 3, semilla: int = 1, libro: bool = True) -> list:
+    """
+    Sustituye los usuarios sinteticos por n_usuarios con n_habitos cada uno y n_anios de acciones
+    hasta hoy. Retorna la lista de user_id.
+    """
+    borrar_sinteticos(db)
+    user_ids = [ID_BASE + u for u in range(n_usuarios)]
+    for u, user_id in enumerate(user_ids):
+        db.add(Usuario(user_id=user_id, nombre=f"sintetico {u}", edad=20 + u % 50, sexo="x"))
+    db.flush()
+    for u, user_id in enumerate(user_ids):
+        # Cada usuario empieza el catálogo en un punto distinto para variar las combinaciones de categorías
+        for h in range(n_habitos):
+            nombre, categoria, frecuencia, objetivo, unidad = CATALOGO[(u + h) % len(CATALOGO)]
+            vuelta = h // len(CATALOGO)
+            db.add(Habito(
+                user_id=user_id, habito=nombre if vuelta == 0 else f"{nombre} {vuelta + 1}",
+                categoria=categoria, frecuencia_objetivo=frecuencia, cantidad_objetivo=objetivo,
+                unidad_medida_objetivo=unidad
+            ))
+    db.flush()
+
+    hoy = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    db.execute(text("SELECT setseed(:semilla)"), {"semilla": (semilla % 1000) / 1000})
+    db.execute(text(QUERY_ACCIONES), {
+        "inicio": hoy - timedelta(days=int(365 * n_anios)), "fin": hoy,
+        "id_min": user_ids[0], "id_max": user_ids[-1], "prob": prob, "max_por_dia": max_por_dia,
+    })
+    db.commit()
+    if libro:
+        for user_id in user_ids:
+            recalcular_buckets(db, user_id)
+            recalcular_celdas(db, user_id)
+        db.commit()
+    # Estadísticas al día para que los planes de las consultas no dependan de cuándo pase autovacuum
+    for tabla in ("usuarios", "habitos", "acciones", "puntos_registro", "cubo_celdas_usuario", "cubo_categorias"):
+        db.execute(text(f"ANALYZE {tabla}"))
+    db.commit()
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera datos sinteticos para los benchmarks")
+    parser.add_argument("--usuarios", type=int, default=50)
+    parser.add_argument("--habitos", type=int, default=8)
+    parser.add_argument("--anios", type=float, default=2)
+    parser.add_argument("--prob", type=float, default=0.6, help="Probabilidad de registrar cada hábito cada día")
+    parser.add_argument("--max-por-dia", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--sin-libro", action="store_true", help="No rellena el libro de puntos")
+    parser.add_argument("--borrar", action="store_true", help="Solo borra los usuarios sinteticos")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.borrar:
+            borrar_sinteticos(db)
+            print("Usuarios sinteticos borrados.")
+            return
+        inicio = time.perf_counter()
+        user_ids = generar(
+            db, args.usuarios, args.habitos, args.anios, args.prob, args.max_por_dia, args.semilla,
+            libro=not args.sin_libro
+        )
+        acciones = db.execute(
+            text("SELECT count(*) FROM acciones WHERE user_id BETWEEN :a AND :b"),
+            {"a": user_ids[0], "b": user_ids[-1]}
+        ).scalar()
+    print(f"{len(user_ids)} usuarios, {args.habitos} hábitos por usuario, {acciones} acciones "
+          f"en {time.perf_counter() - inicio:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# Paridad y tiempos del calculo de puntos en SQL frente a pandas
+#
+# Uso (desde el directorio app, con DATABASE_URL apuntando a una BBDD Postgres de pruebas):
+#   python -m benchmarks.paridad_puntos_sql --usuarios 50 --semanas 20
+#
+# Se insertan usuarios sinteticos (ids a partir de ID_BASE) con habitos y acciones aleatorias,
+# se comparan get_points_accumulated_weekly/all_time en pandas y en SQL y se borran al terminar.
+# Las diferencias menores que --tolerancia se atribuyen al redondeo (numeric en Postgres frente a float).
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from BBDD_create.database import SessionLocal, Usuario, Habito, Accion
+from BBDD_create.funciones_informe import (
+    get_points_accumulated_all_time_pandas, get_points_accumulated_weekly_pandas
+)
+from BBDD_create.funciones_puntos_sql import get_points_all_time_sql, get_points_weekly_sql
+
+ID_BASE = 9_100_000_000
+
+# Sin nombres que solo difieran en mayusculas: con dos habitos semanales asi, pandas falla
+# en el reindex (indice no unico) y devuelve 0 puntos, mientras que SQL suma ambos
+NOMBRES = ["Correr", "Fumar", "Leer", "Agua", "Meditar", "Azucar", "Pasos"]
+CATEGORIAS = ["dejar", "dejar", "deporte", "caminar", "estilo-vida", "alimentacion", "tiempo", None]
+FRECUENCIAS = ["diaria", "diaria", "Diaria", "semanal", "mensual", None]
+OBJETIVOS = [None, 0.0, 1.0, 3.0, 10.0, 2.5]
+CANTIDADES = [None, 0.0, 1.0, 2.0, 5.0, 12.0, 1.5]
+
+
+def crear_usuarios(db, n_usuarios: int, n_semanas: int, semilla: int) -> list:
+    # Se generan habitos con combinaciones variadas y acciones repartidas por el historial y la semana actual
+    r = random.Random(semilla)
+    hoy = datetime.now().date()
+    lunes = hoy - timedelta(days=hoy.weekday())
+    inicio = datetime.combine(lunes - timedelta(weeks=n_semanas), datetime.min.time())
+    dias = (hoy - inicio.date()).days + 1
+    user_ids = []
+    for u in range(n_usuarios):
+        user_id = ID_BASE + u
+        user_ids.append(user_id)
+        db.add(Usuario(user_id=user_id, nombre=f"sintetico {u}", edad=30, sexo="x"))
+        for nombre in r.sample(NOMBRES, r.randint(1, len(NOMBRES))):
+            db.add(Habito(
+                user_id=user_id, habito=nombre, categoria=r.choice(CATEGORIAS),
+                frecuencia_objetivo=r.choice(FRECUENCIAS), cantidad_objetivo=r.choice(OBJETIVOS)
+            ))
+            prob = r.choice([0.0, 0.2, 0.6])
+            for d in range(dias):
+                if r.random() < prob:
+                    fecha = inicio + timedelta(days=d, minutes=r.randint(0, 24 * 60 - 1))
+                    for _ in range(r.randint(1, 2)):
+                        db.add(Accion(user_id=user_id, habito=nombre, fecha_realizacion=fecha, cantidad=r.choice(CANTIDADES)))
+    db.commit()
+    return user_ids
+
+
+def borrar_usuarios(db, user_ids: list):
+    db.query(Accion).filter(Accion.user_id.in_(user_ids)).delete(synchronize_session=False)
+    db.query(Habito).filter(Habito.user_id.in_(user_ids)).delete(synchronize_session=False)
+    db.query(Usuario).filter(Usuario.user_id.in_(user_ids)).delete(synchronize_session=False)
+    db.commit()
+
+
+def comparar(nombre: str, user_ids: list, pandas_fn, sql_fn, tolerancia: float) -> int:
+    t_pandas = t_sql = 0.0
+    fallos = 0
+    with SessionLocal() as db:
+        for user_id in user_ids:
+            inicio = time.perf_counter()
+            esperado = float(pandas_fn(user_id))
+            t_pandas += time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            obtenido = sql_fn(db, user_id)
+            t_sql += time.perf_counter() - inicio
+            if abs(esperado - obtenido) > tolerancia:
+                fallos += 1
+                print(f"[{nombre}] user_id={user_id}: pandas={esperado} sql={obtenido}")
+    print(
+        f"[{nombre}] {len(user_ids) - fallos}/{len(user_ids)} usuarios coinciden | "
+        f"pandas {1000 * t_pandas / len(user_ids):.1f} ms/usuario, sql {1000 * t_sql / len(user_ids):.1f} ms/usuario"
+    )
+    return fallos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paridad del calculo de puntos SQL frente a pandas")
+    parser.add_argument("--usuarios", type=int, default=50)
+    parser.add_argument("--semanas", type=int, default=20)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--tolerancia", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        # Se limpian restos de ejecuciones anteriores interrumpidas
+        borrar_usuarios(db, [ID_BASE + u for u in range(args.usuarios)])
+        user_ids = crear_usuarios(db, args.usuarios, args.semanas, args.semilla)
+    try:
+        fallos = comparar("semana", user_ids, get_points_accumulated_weekly_pandas, get_points_weekly_sql, args.tolerancia)
+        fallos += comparar("historico", user_ids, get_points_accumulated_all_time_pandas, get_points_all_time_sql, args.tolerancia)
+    finally:
+        with SessionLocal() as db:
+            borrar_usuarios(db, user_ids)
+    if fallos:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+# Implementaciones anteriores de funciones_informe, conservadas solo como referencia
+# para los benchmarks (comparacion de tiempos y comprobacion de que el resultado no cambia).
+
+import pandas as pd
+from datetime import datetime, timedelta
+
+from BBDD_create.funciones_informe import calculate_points, calculate_points_max
+
+
+def accumulate_weekly_points_original(df_weekly: pd.DataFrame) -> pd.DataFrame:
+    """
+    Para cada hábito semanal (frecuencia_objetivo == "semanal") en df_weekly,
+    se genera un registro diario (de lunes a domingo) y se calcula la cantidad de puntos
+    ganados ese día usando:
+        puntos = min((total_acciones / cantidad_objetivo) * 50, 50)
+    Retorna un DataFrame con columnas: id, habito, fecha_realizacion, total_acciones, puntos_diarios.
+    """
+    df_weekly["fecha_dt"] = pd.to_datetime(df_weekly["fecha_realizacion"], errors="coerce")
+    results = []
+    for (uid, hab), group in df_weekly.groupby(["id", "habito"]):
+        group = group.sort_values("fecha_dt")
+        # Determinar el lunes de la semana usando el primer registro
+        first_date = group["fecha_dt"].min()
+        monday = first_date - pd.Timedelta(days=first_date.weekday())
+        sunday = monday + pd.Timedelta(days=6)
+        # Crear el rango completo de fechas de lunes a domingo
+        full_dates = pd.date_range(start=monday, end=sunday, freq="D")
+        # Reindexar para incluir todos los días de la semana, rellenando con 0 los días sin registro
+        group = group.set_index("fecha_dt").reindex(full_dates, fill_value=0)
+        group = group.rename_axis("fecha_dt").reset_index()
+        group["id"] = uid
+        group["habito"] = hab
+        # Se asume que 'cantidad_objetivo' es constante para este hábito
+        cantidad_objetivo = df_weekly.loc[
+            (df_weekly["id"] == uid) & (df_weekly["habito"] == hab), "cantidad_objetivo"
+        ].iloc[0]
+        group["total_acciones"] = group["total_acciones"].astype(float)
+        # Calcular los puntos diarios (sin acumulación) para cada día
+        group["puntos_diarios"] = group.apply(
+            lambda row: min((row["total_acciones"] / cantidad_objetivo) * 50, 50)
+            if cantidad_objetivo > 0 else 0,
+            axis=1
+        )
+        group["fecha_realizacion"] = group["fecha_dt"].dt.strftime("%Y-%m-%d")
+        results.append(group[["id", "habito", "fecha_realizacion", "total_acciones", "puntos_diarios"]])
+    if results:
+        return pd.concat(results, ignore_index=True)
+    else:
+        return pd.DataFrame()
+
+
+def convert_to_dataframe_original(data) -> pd.DataFrame:
+    """
+    Convierte los datos obtenidos de la base de datos (lista de tuplas)
+    a un DataFrame de pandas. Aplica el cálculo de puntos y puntos máximos.
+    Para hábitos SEMANALES, en lugar de generar una sola fila semanal,
+    se calcula el acumulado diario (de lunes a domingo) para poder graficar el progreso.
+    """
+    today = datetime.now()
+    start_of_week = (today - timedelta(days=today.weekday())).date()
+    end_of_week = start_of_week + timedelta(days=6)
+    
+    try:
+        # -----------------------
+        # 1) Construir un DF base
+        # -----------------------
+        rows = []
+        for row in data:
+            # row = (user_id, habito, categoria, frecuencia_objetivo, fecha_realizacion, total_acciones,
+            #        cantidad_objetivo, media, reducir)
+            user_id        = row[0]
+            habito         = row[1] if row[1] else ""
+            categoria      = row[2] if row[2] else ""
+            freq_obj       = row[3] if row[3] else ""
+            fecha_real     = row[4]  # puede ser None
+            total_acciones = row[5] if row[5] is not None else 0.0
+            cant_objetivo  = row[6] if row[6] is not None else 0.0
+            media          = row[7] if row[7] is not None else 0.0
+            reducir        = row[8] if row[8] is not None else 0.0
+
+            # Si no hay fecha, usar el inicio de semana
+            if fecha_real is None:
+                fecha_str = start_of_week.strftime('%Y-%m-%d')
+            else:
+                fecha_str = fecha_real.strftime('%Y-%m-%d')
+
+            rows.append({
+                "id": str(user_id) if user_id else None,
+                "habito": habito.lower(),
+                "categoria": categoria.lower(),
+                "frecuencia_objetivo": freq_obj.lower(),
+                "fecha_realizacion": fecha_str,
+                "total_acciones": float(total_acciones),
+                "cantidad_objetivo": float(cant_objetivo),
+                "media": float(media),
+                "reducir": float(reducir)
+            })
+
+        df = pd.DataFrame(rows)
+        if df.empty:
+            return df
+
+        # --------------------------------------------------------------------
+        # 2) Para hábitos 'dejar' diarios: rellenar días faltantes (se mantiene la lógica original)
+        # --------------------------------------------------------------------
+        daily_dejar = df[(df["categoria"] == "dejar") & (df["frecuencia_objetivo"] == "diaria")].copy()
+        if not daily_dejar.empty:
+            unique_daily_dejar = daily_dejar[["id", "habito", "categoria", "frecuencia_objetivo", "cantidad_objetivo", "reducir"]].drop_duplicates()
+            start_of_week_plus_one = start_of_week + timedelta(days=1)
+            date_range = pd.date_range(start=start_of_week_plus_one, end=end_of_week)
+            all_new_rows = []
+            for _, habit_row in unique_daily_dejar.iterrows():
+                uid     = habit_row["id"]
+                hab     = habit_row["habito"]
+                cat     = habit_row["categoria"]
+                freq    = habit_row["frecuencia_objetivo"]
+                cantobj = habit_row["cantidad_objetivo"]
+                red     = habit_row["reducir"]
+                for single_date in date_range:
+                    date_str = single_date.strftime("%Y-%m-%d")
+                    mask = ((df["id"] == uid) & (df["habito"] == hab) & (df["fecha_realizacion"] == date_str))
+                    if not mask.any():
+                        all_new_rows.append({
+                            "id": uid,
+                            "habito": hab,
+                            "categoria": cat,
+                            "frecuencia_objetivo": freq,
+                            "fecha_realizacion": date_str,
+                            "total_acciones": 0.0,
+                            "cantidad_objetivo": cantobj,
+                            "media": 0.0,
+                            "reducir": red
+                        })
+            if all_new_rows:
+                df = pd.concat([df, pd.DataFrame(all_new_rows)], ignore_index=True)
+
+        # --------------------------------------------------------------------
+        # 3) Agrupar por día (para evitar duplicados de la misma fecha-hábito)
+        # --------------------------------------------------------------------
+        df = df.groupby(
+            ["id", "habito", "categoria", "frecuencia_objetivo", "fecha_realizacion", "cantidad_objetivo"],
+            dropna=False,
+            as_index=False
+        ).agg({
+            "total_acciones": "sum",
+            "media": "mean",
+            "reducir": "min"
+        })
+
+        # --------------------------------------------------------------------
+        # 4) Separar hábitos diarios y semanales
+        # --------------------------------------------------------------------
+        df_daily = df[df["frecuencia_objetivo"] == "diaria"].copy()
+        df_weekly = df[df["frecuencia_objetivo"] == "semanal"].copy()
+
+        # Para los diarios, calcular puntos con la fórmula ya definida
+        if not df_daily.empty:
+            df_daily["puntos"] = df_daily.apply(calculate_points, axis=1).round(1)
+            df_daily["puntos_obj"] = df_daily.apply(calculate_points_max, axis=1)
+        else:
+            df_daily = pd.DataFrame()
+
+        # Para los semanales, usar la función accumulate_weekly_points para obtener acumulados diarios
+        if not df_weekly.empty:
+            df_weekly_accum = accumulate_weekly_points_original(df_weekly)
+            # Renombrar la columna 'puntos_acumulados' a 'puntos'
+            df_weekly_accum["puntos"] = df_weekly_accum["puntos_diarios"]
+            # Asignar el puntaje máximo teórico de 50 para hábitos semanales
+            df_weekly_accum["puntos_obj"] = 50.0
+            # Agregar la columna 'frecuencia_objetivo' como "semanal"
+            df_weekly_accum["frecuencia_objetivo"] = "semanal"
+            # Para completar la información, agregar la columna 'categoria' desde el df original
+            weekly_info = df_weekly.drop_duplicates(subset=["id", "habito"])[["id", "habito", "categoria", "cantidad_objetivo"]]
+            df_weekly_accum = df_weekly_accum.merge(weekly_info, on=["id", "habito"], how="left")
+        else:
+            df_weekly_accum = pd.DataFrame()
+
+        # --------------------------------------------------------------------
+        # 5) Combinar los DataFrames diarios y semanales
+        # --------------------------------------------------------------------
+        df_final = pd.concat([df_daily, df_weekly_accum], ignore_index=True)
+        df_final.sort_values(by=["id", "habito", "fecha_realizacion"], inplace=True, ignore_index=True)
+        return df_final
+
+    except Exception as e:
+        print(f"Error en convert_to_dataframe: {e}")
+        return pd.DataFrame()
+
+
+def metricas_dashboard_original(df: pd.DataFrame, habitos, lunes) -> dict:
+    """
+    Métricas del informe semanal tal como se calculaban dentro de generate_dashboard:
+    un filtrado + nunique por categoría, df_hoy recalculado, un bucle por los días de la semana
+    para 'dejar' y un DataFrame de días por cada panel de líneas.
+    """
+    from BBDD_create.funciones_informe import calcular_puntos_vectorizado
+    import numpy as np
+
+    habitos_diarios = [h for h in habitos if (h.frecuencia_objetivo or "").lower() == "diaria"]
+    habitos_semanales = [h for h in habitos if (h.frecuencia_objetivo or "").lower() == "semanal"]
+    puntos_objetivo_totales = len(habitos_diarios) * 7 * 10 + len(habitos_semanales) * 50
+
+    df_daily = df[df["frecuencia_objetivo"] == "diaria"]
+    df_weekly = df[df["frecuencia_objetivo"] == "semanal"]
+    daily_sum = df_daily["puntos"].sum()
+    if not df_weekly.empty:
+        weekly_sum = df_weekly.groupby(["id", "habito"], as_index=False)["puntos"].max()["puntos"].sum()
+    else:
+        weekly_sum = 0
+    puntos_totales = daily_sum + weekly_sum
+
+    df_cumplidos = df[df['puntos'] >= df['puntos_obj']]
+    df_cumplidos_dias = df_cumplidos[df_cumplidos['frecuencia_objetivo'] == 'diaria']
+    dias_cumplidos = {
+        categoria: df_cumplidos_dias[df_cumplidos_dias['categoria'] == categoria]['fecha_realizacion'].nunique()
+        for categoria in ("caminar", "deporte", "estilo-vida", "alimentacion", "tiempo")
+    }
+
+    rango_fechas = pd.date_range(start=lunes, end=lunes + timedelta(days=6), freq='D')
+    df_mal_habito = df[
+        (df['categoria'] == 'dejar') & (df['frecuencia_objetivo'] == 'diaria') & (df['total_acciones'] > 0)
+    ].copy()
+    fechas_mal_habito_set = set(df_mal_habito['fecha_realizacion'].unique())
+    dias_reducir = 0
+    for dia in rango_fechas:
+        if dia.strftime('%Y-%m-%d') not in fechas_mal_habito_set:
+            dias_reducir += 1
+
+    if not df_weekly.empty:
+        weekly_summary = df_weekly.groupby(["id", "habito", "categoria"], as_index=False)["puntos"].max()
+    else:
+        weekly_summary = pd.DataFrame()
+    daily_summary = df_daily.copy() if not df_daily.empty else pd.DataFrame()
+    df_summary = pd.concat([daily_summary, weekly_summary], ignore_index=True)
+    resumen_categoria = df_summary.groupby("categoria")["puntos"].sum().reset_index()
+    df_categorias = pd.DataFrame({"categoria": df['categoria'].unique()})
+    resumen_categoria = df_categorias.merge(resumen_categoria, on="categoria", how="left").fillna(0)
+
+    hoy = pd.Timestamp.now().normalize().strftime('%Y-%m-%d')
+    df_hoy = df[df['fecha_realizacion'] == hoy].copy()
+    puntos_hoy, puntos_max_hoy = calcular_puntos_vectorizado(
+        df_hoy["categoria"], df_hoy["frecuencia_objetivo"], df_hoy["total_acciones"], df_hoy["cantidad_objetivo"]
+    )
+    df_hoy["puntos"] = np.round(puntos_hoy, 1)
+    df_hoy["puntos_obj"] = puntos_max_hoy
+    resumen_hoy = df_hoy.groupby(['categoria', 'habito'])['puntos'].sum().reset_index()
+
+    puntos_dia = {}
+    dias_semana_es = ["L", "M", "X", "J", "V", "S", "D"]
+    dias_semana_map = {
+        "Monday": "L", "Tuesday": "M", "Wednesday": "X", "Thursday": "J",
+        "Friday": "V", "Saturday": "S", "Sunday": "D"
+    }
+    for categoria in ("caminar", "deporte", "estilo-vida"):
+        df_categoria = df[df['categoria'] == categoria].copy()
+        df_categoria['fecha_realizacion'] = pd.to_datetime(df_categoria['fecha_realizacion'], errors='coerce')
+        df_categoria['dia_semana'] = df_categoria['fecha_realizacion'].dt.day_name().map(dias_semana_map)
+        df_puntos = df_categoria.groupby('dia_semana')['puntos'].sum().reset_index()
+        df_completo = pd.DataFrame({'dia_semana': dias_semana_es}).merge(df_puntos, on='dia_semana', how='left')
+        df_completo['puntos'] = df_completo['puntos'].fillna(0)
+        puntos_dia[categoria] = tuple(df_completo['puntos'])
+
+    return {
+        "puntos_totales": puntos_totales,
+        "puntos_objetivo_totales": puntos_objetivo_totales,
+        "puntos_categoria": dict(zip(resumen_categoria["categoria"], resumen_categoria["puntos"])),
+        "dias_cumplidos": dias_cumplidos,
+        "dias_reducir": dias_reducir,
+        "puntos_dia": puntos_dia,
+        "hoy": tuple(resumen_hoy.itertuples(index=False, name=None)),
+        "mostrar_caminar": df[(df['habito'] == 'caminar') & (df['puntos'] > 0)].shape[0] > 0,
+        "mostrar_deporte": df[(df['categoria'] == 'deporte') & (df['puntos'] > 0)].shape[0] > 0,
+        "mostrar_estilo_vida": df[(df['categoria'] == 'estilo-vida') & (df['puntos'] > 0)].shape[0] > 0,
+        "mostrar_reducir": any((h.categoria or "").lower() == "dejar" for h in habitos_diarios),
+    }
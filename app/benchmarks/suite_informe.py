@@ -0,0 +1,235 @@
+# Suite de benchmarks de las funciones de informes y puntos
+#
+# Uso (desde el directorio app, con DATABASE_URL apuntando a una BBDD Postgres de pruebas):
+#   python -m benchmarks.suite_informe                       # compara con la línea base
+#   python -m benchmarks.suite_informe --guardar             # guarda la línea base
+#   python -m benchmarks.suite_informe --escalas pequena mediana grande --umbral 0.3
+#
+# Para cada escala se generan los datos sinteticos de generar_datos (usuarios, hábitos por
+# usuario y años de acciones) y se mide cada función con una muestra de usuarios:
+#   - tiempo_ms: mejor tiempo de pared de una llamada (el menos afectado por el ruido de la máquina),
+#   - consultas: consultas SQL por llamada (ContadorConsultas),
+#   - pico_mb:   pico de memoria Python de una llamada (tracemalloc, en una pasada aparte).
+# Los resultados se guardan en JSON (baseline_informe.json) y las ejecuciones siguientes se comparan
+# con él: una función empeora si su tiempo o su memoria crecen más que --umbral (y por encima del
+# ruido) o si hace más consultas. Con alguna regresión el proceso termina con código 1.
+# Antes y después de cada escala se mide una carga fija de CPU (calibración): los tiempos se comparan
+# escalados por calibración actual / calibración base, así que una máquina más lenta o más cargada
+# que la de la línea base no aparece como regresión.
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from BBDD_create.database import SessionLocal, ContadorConsultas
+from BBDD_create.funciones_informe import (
+    get_all_data, convert_to_dataframe, accumulate_weekly_points, generate_dashboard, datos_dashboard,
+    get_points_accumulated_weekly_pandas, get_points_accumulated_all_time_pandas
+)
+from BBDD_create.funciones_puntos_sql import get_points_weekly_sql, get_points_all_time_sql
+from BBDD_create.registro_puntos import get_points_all_time_registro
+from BBDD_create.entrada_informe import cargar_entrada_informe
+from BBDD_create.informe_periodo import datos_informe_periodo
+from BBDD_create.cache_truefriends import cache_truefriends, calcular_agregados
+from BBDD_create.ranking import RankingPuntos
+from benchmarks.generar_datos import generar, borrar_sinteticos
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline_informe.json")
+
+ESCALAS = {
+    "pequena": {"usuarios": 20, "habitos": 6, "anios": 1},
+    "mediana": {"usuarios": 50, "habitos": 8, "anios": 2},
+    "grande": {"usuarios": 100, "habitos": 10, "anios": 3},
+}
+
+# Diferencias por debajo de estos valores se consideran ruido
+RUIDO_MS = 1.0
+RUIDO_MB = 0.5
+
+
+def casos_usuario(motor: str) -> dict:
+    # Funciones que se miden para cada usuario de la muestra: f(db, user_id, contexto)
+    return {
+        "get_all_data": lambda db, u, c: get_all_data(db, u),
+        "convert_to_dataframe": lambda db, u, c: convert_to_dataframe(c["filas"]),
+        "accumulate_weekly_points": lambda db, u, c: accumulate_weekly_points(c["df_semanal"]),
+        "puntos_semana_pandas": lambda db, u, c: get_points_accumulated_weekly_pandas(u),
+        "puntos_total_pandas": lambda db, u, c: get_points_accumulated_all_time_pandas(u),
+        "puntos_semana_sql": lambda db, u, c: get_points_weekly_sql(db, u),
+        "puntos_total_sql": lambda db, u, c: get_points_all_time_sql(db, u),
+        "puntos_total_registro": lambda db, u, c: get_points_all_time_registro(db, u),
+        "datos_dashboard": lambda db, u, c: datos_dashboard(cargar_entrada_informe(db, u)),
+        "generate_dashboard": lambda db, u, c: generate_dashboard(db, u, motor=motor),
+        "informe_mes": lambda db, u, c: datos_informe_periodo(db, u, "mes"),
+        "informe_anio": lambda db, u, c: datos_informe_periodo(db, u, "anio"),
+    }
+
+
+# Funciones que recorren todos los usuarios (se miden una vez por repetición)
+CASOS_GLOBALES = {
+    "truefriends_agregados": lambda db: calcular_agregados(db),
+    "ranking_reconstruir": lambda db: RankingPuntos().reconstruir(db),
+}
+
+
+def calibrar(repeticiones: int = 5) -> float:
+    # Mejor tiempo (ms) de una carga fija de Python, numpy y pandas
+    df = pd.DataFrame({"a": np.arange(200_000) % 97, "b": np.arange(200_000, dtype=float)})
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        sum(i * i for i in range(100_000))
+        df.groupby("a")["b"].sum()
+        np.sort(df["b"].to_numpy()[::-1])
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return 1000 * mejor
+
+
+def medir(funcion, repeticiones: int) -> dict:
+    """
+    Ejecuta funcion() repeticiones veces y retorna los tiempos (s), las consultas de la primera
+    llamada y el pico de memoria de una llamada más con tracemalloc.
+    """
+    tiempos = []
+    with ContadorConsultas() as contador:
+        funcion()
+    consultas = contador.consultas
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"tiempos": tiempos, "consultas": consultas, "pico": pico}
+
+
+def resumir(mediciones: list) -> dict:
+    return {
+        "tiempo_ms": round(1000 * statistics.median(min(m["tiempos"]) for m in mediciones), 3),
+        "consultas": round(statistics.mean(m["consultas"] for m in mediciones), 2),
+        "pico_mb": round(max(m["pico"] for m in mediciones) / 2 ** 20, 3),
+    }
+
+
+def ejecutar_escala(db, nombre: str, escala: dict, muestra: int, repeticiones: int, motor: str) -> dict:
+    inicio = time.perf_counter()
+    user_ids = generar(db, escala["usuarios"], escala["habitos"], escala["anios"])
+    print(f"[{nombre}] datos generados en {time.perf_counter() - inicio:.1f} s", flush=True)
+    cache_truefriends.refrescar()
+
+    # Muestra repartida por todo el rango de usuarios
+    paso = max(1, len(user_ids) // muestra)
+    elegidos = user_ids[::paso][:muestra]
+    resultados = {}
+    calibracion = calibrar()
+    mediciones = {caso: [] for caso in casos_usuario(motor)}
+    for user_id in elegidos:
+        filas = get_all_data(db, user_id)
+        df = convert_to_dataframe(filas)
+        contexto = {"filas": filas, "df_semanal": df[df["frecuencia_objetivo"] == "semanal"]}
+        for caso, funcion in casos_usuario(motor).items():
+            mediciones[caso].append(medir(lambda: funcion(db, user_id, contexto), repeticiones))
+    for caso, lista in mediciones.items():
+        resultados[caso] = resumir(lista)
+    for caso, funcion in CASOS_GLOBALES.items():
+        resultados[caso] = resumir([medir(lambda: funcion(db), repeticiones)])
+    return resultados, round((calibracion + calibrar()) / 2, 3)
+
+
+def comparar(actual: dict, base: dict, umbral: float, calibracion: dict, calibracion_base: dict) -> int:
+    """
+    Imprime la comparación con la línea base y retorna el número de regresiones.
+    Los tiempos base se escalan por la relación entre la calibración actual y la de la línea base.
+    """
+    regresiones = 0
+    for escala, casos in actual.items():
+        factor = calibracion[escala] / calibracion_base[escala] if escala in calibracion_base else 1.0
+        print(f"\n[{escala}] calibración {calibracion[escala]:.1f} ms (factor {factor:.2f} sobre la línea base)")
+        print(f"{'función':<26}{'ms base':>10}{'ms':>10}{'x':>7}{'consultas':>12}{'MB base':>9}{'MB':>8}")
+        for caso, r in casos.items():
+            b = base.get(escala, {}).get(caso)
+            if b is None:
+                print(f"{caso:<26}{'-':>10}{r['tiempo_ms']:>10.2f}{'':>7}{r['consultas']:>12g}"
+                      f"{'-':>9}{r['pico_mb']:>8.2f}  (nueva)")
+                continue
+            tiempo_base = b["tiempo_ms"] * factor
+            ratio = r["tiempo_ms"] / tiempo_base if tiempo_base else 1.0
+            avisos = []
+            if ratio > 1 + umbral and r["tiempo_ms"] - tiempo_base > RUIDO_MS:
+                avisos.append("tiempo")
+            if r["consultas"] > b["consultas"]:
+                avisos.append("consultas")
+            if r["pico_mb"] > b["pico_mb"] * (1 + umbral) and r["pico_mb"] - b["pico_mb"] > RUIDO_MB:
+                avisos.append("memoria")
+            regresiones += bool(avisos)
+            consultas = f"{b['consultas']:g}->{r['consultas']:g}"
+            print(f"{caso:<26}{tiempo_base:>10.2f}{r['tiempo_ms']:>10.2f}{ratio:>7.2f}{consultas:>12}"
+                  f"{b['pico_mb']:>9.2f}{r['pico_mb']:>8.2f}" + (f"  REGRESIÓN ({', '.join(avisos)})" if avisos else ""))
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks de informes y puntos")
+    parser.add_argument("--escalas", nargs="+", default=["pequena", "mediana"], choices=list(ESCALAS))
+    parser.add_argument("--muestra", type=int, default=5, help="Usuarios medidos por escala")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--motor", default="matplotlib", help="Motor de generate_dashboard")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--guardar", action="store_true", help="Guarda los resultados como línea base")
+    parser.add_argument("--umbral", type=float, default=0.5, help="Empeoramiento relativo tolerado")
+    args = parser.parse_args()
+
+    actual, calibracion = {}, {}
+    with SessionLocal() as db:
+        try:
+            for nombre in args.escalas:
+                actual[nombre], calibracion[nombre] = ejecutar_escala(
+                    db, nombre, ESCALAS[nombre], args.muestra, args.repeticiones, args.motor
+                )
+        finally:
+            borrar_sinteticos(db)
+
+    if args.guardar:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "fecha": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "plataforma": platform.platform(),
+                    "motor": args.motor,
+                    "muestra": args.muestra,
+                    "repeticiones": args.repeticiones,
+                    "escalas": {nombre: ESCALAS[nombre] for nombre in args.escalas},
+                    "calibracion_ms": calibracion,
+                },
+                "resultados": actual,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"Línea base guardada en {args.baseline}")
+        comparar(actual, {}, args.umbral, calibracion, {})
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No hay línea base en {args.baseline}: ejecuta con --guardar")
+        comparar(actual, {}, args.umbral, calibracion, {})
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        base = json.load(f)
+    regresiones = comparar(actual, base["resultados"], args.umbral, calibracion, base["meta"]["calibracion_ms"])
+    print(f"\n{regresiones} regresiones")
+    if regresiones:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
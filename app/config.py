@@ -14,6 +14,69 @@ TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Configuracion del motor de transcripcion de audios (google, vosk o fake)
+ASR_BACKEND = os.getenv("ASR_BACKEND", "google").lower()
+ASR_IDIOMA = os.getenv("ASR_IDIOMA", "es-ES")
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "/data/modelos/vosk-model-small-es-0.42")
+ASR_FAKE_TEXTO = os.getenv("ASR_FAKE_TEXTO", "")
+
+# Cola de audios: workers de transcripcion, trabajos en espera y transcripciones en cache
+AUDIO_WORKERS = int(os.getenv("AUDIO_WORKERS", "2"))
+AUDIO_COLA_MAX = int(os.getenv("AUDIO_COLA_MAX", "20"))
+AUDIO_CACHE_MAX = int(os.getenv("AUDIO_CACHE_MAX", "500"))
+
+# Notas largas: duracion maxima aceptada, tamano maximo de cada trozo y trozos en paralelo
+AUDIO_MAX_DURACION_S = int(os.getenv("AUDIO_MAX_DURACION_S", "300"))
+ASR_TROZO_MAX_S = float(os.getenv("ASR_TROZO_MAX_S", "25"))
+ASR_TROZOS_PARALELOS = int(os.getenv("ASR_TROZOS_PARALELOS", "4"))
+
+# Motor de calculo de puntos acumulados: registro (libro de puntos), sql (agregado en Postgres) o pandas
+PUNTOS_MOTOR = os.getenv("PUNTOS_MOTOR", "registro").lower()
+
+# Cache de TrueFriends: segundos entre refrescos y fichero donde persistirla. Los workers del pool de
+# informes leen ese fichero, que refresca la tarea programada del bot (vacio = solo en memoria y cada
+# worker calcula sus propios agregados)
+TRUEFRIENDS_REFRESCO_S = int(os.getenv("TRUEFRIENDS_REFRESCO_S", "300"))
+TRUEFRIENDS_CACHE_RUTA = os.getenv(
+    "TRUEFRIENDS_CACHE_RUTA", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "truefriends.json")
+)
+
+# Con quién se compara a cada usuario en TrueFriends: todos (suma del resto de usuarios) o vecinos
+# (media de los TRUEFRIENDS_VECINOS usuarios con hábitos más parecidos, índice reconstruido cada noche)
+TRUEFRIENDS_MODO = os.getenv("TRUEFRIENDS_MODO", "todos").lower()
+TRUEFRIENDS_VECINOS = int(os.getenv("TRUEFRIENDS_VECINOS", "25"))
+
+# Informes: procesos que renderizan en paralelo e informes que pueden esperar en cola
+INFORME_WORKERS = int(os.getenv("INFORME_WORKERS", "2"))
+INFORME_COLA_MAX = int(os.getenv("INFORME_COLA_MAX", "10"))
+
+# Motor de renderizado del informe semanal: plotly (kaleido) o matplotlib (Agg, sin Chromium)
+INFORME_RENDER = os.getenv("INFORME_RENDER", "plotly").lower()
+
+# Formato por defecto de los informes (cada usuario puede elegir el suyo): png, jpeg o webp,
+# calidad de jpeg/webp (1-95), escala del tamaño en píxeles y disposición compacta de una columna
+INFORME_FORMATO = os.getenv("INFORME_FORMATO", "png").lower()
+INFORME_CALIDAD = int(os.getenv("INFORME_CALIDAD", "85"))
+INFORME_ESCALA = float(os.getenv("INFORME_ESCALA", "1.0"))
+INFORME_COMPACTO = os.getenv("INFORME_COMPACTO", "false").lower() in ("1", "true", "si")
+
+# Modo de entrega de los informes: png (imagen renderizada en el servidor) o webapp (el navegador
+# dibuja la figura que sirve el bot en JSON). El modo webapp necesita INFORME_API_URL (URL pública
+# https del servidor de informes); sin ella se usa png
+INFORME_MODO = os.getenv("INFORME_MODO", "png").lower()
+INFORME_WEBAPP_URL = os.getenv("INFORME_WEBAPP_URL", "https://truehabit.github.io/Informe/")
+INFORME_API_URL = os.getenv("INFORME_API_URL", "").rstrip("/")
+INFORME_API_PUERTO = int(os.getenv("INFORME_API_PUERTO", "8000"))
+# Clave de las firmas de los enlaces (vacia = derivada de TELEGRAM_TOKEN), validez de un enlace
+# y JSON de informes que se guardan en memoria
+INFORME_API_SECRETO = os.getenv("INFORME_API_SECRETO", "")
+INFORME_WEBAPP_VALIDEZ_S = int(os.getenv("INFORME_WEBAPP_VALIDEZ_S", str(7 * 24 * 3600)))
+INFORME_WEBAPP_CACHE_MAX = int(os.getenv("INFORME_WEBAPP_CACHE_MAX", "500"))
+
+# Pre-renderizado programado: fraccion de los workers que puede usar y si se envian los informes sin pedirlos
+INFORME_PRERENDER_CPU = float(os.getenv("INFORME_PRERENDER_CPU", "0.5"))
+INFORME_PRERENDER_ENVIAR = os.getenv("INFORME_PRERENDER_ENVIAR", "false").lower() in ("1", "true", "si")
+
 if not TELEGRAM_TOKEN:
     logging.error("TELEGRAM_TOKEN no está definido en .env")
     raise ValueError("TELEGRAM_TOKEN no está definido")
@@ -1,4 +1,7 @@
 from BBDD_create.database import main_crear_BBDD
+from BBDD_create.registro_puntos import inicializar_registro
+from BBDD_create.cubo_categorias import inicializar_cubo
+from BBDD_create.ranking import inicializar_ranking
 from BOT_create.bot import main_crear_BOT
 from acciones.reminder_scheduler import start_scheduler
 import logging
@@ -23,6 +26,12 @@ if __name__ == "__main__":
     '''
     
     main_crear_BBDD()
+    # Se rellena el libro de puntos si es la primera vez que se crea
+    inicializar_registro()
+    # Se rellena el cubo de categorías (TrueFriends) si es la primera vez que se crea
+    inicializar_cubo()
+    # Se construye el ranking de puntos en memoria
+    inicializar_ranking()
 
     '''
     Como segundo paso hay que levantar el BOT